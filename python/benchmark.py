@@ -0,0 +1,313 @@
+#benchmark.py
+#합성 거래 데이터로 지수 파이프라인 단계별 실행 시간과 최대 메모리(RSS)를 측정하고 JSON 이력에 기록
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import transaction_store
+import utils
+from stage_trace import current_rss_mb, peak_rss_mb
+from resell_market_index import calculate_resell_market_index, calculate_resell_market_index_4h, calculate_resell_market_index_for_alphas
+
+# 벤치마크 이력 저장 경로 (python/output 폴더에 저장)
+BENCHMARK_HISTORY_PATH = os.path.join("output", "benchmark", "history.json")
+
+# 데이터 규모 프리셋: (거래 건수, 상품 수)
+PRESETS = {
+    "small": (50_000, 25),
+    "medium": (1_000_000, 331),
+    "large": (10_000_000, 2_000),
+    "xlarge": (50_000_000, 10_000),
+}
+
+BRANDS = ["nike", "jordan", "new%20balance", "asics", "converse", "adidas", "vans"]
+OPTIONS = ["220", "225", "230", "235", "240", "245", "250", "255", "260", "265", "270", "275", "280", "285", "290", "300", "W240", "245(US 5.5)"]
+
+ALPHAS = [i / 10 for i in range(0, 11, 2)]
+
+# 시작 시간(import 시간)을 측정할 진입 모듈과 허용 시간(초)
+STARTUP_MODULES = ["main", "calculate_single_product", "resell_market_index", "incremental_index"]
+STARTUP_BUDGET = 1.0
+
+def generate_product_meta(n_products, seed=0):
+    """
+    product_meta_data.csv와 같은 구조(product_id, name, original_price, brand)의 합성 상품 메타 데이터를 생성합니다.
+    """
+    rng = np.random.default_rng(seed)
+    product_ids = rng.choice(np.arange(10_000, 10_000 + n_products * 50), size=n_products, replace=False)
+    return pd.DataFrame({
+        "product_id": product_ids.astype("int64"),
+        "name": [f" Synthetic Product {i} " for i in range(n_products)],
+        "original_price": rng.integers(55, 340, size=n_products) * 1000,
+        "brand": rng.choice(BRANDS, size=n_products),
+    })
+
+def generate_transactions(product_meta, n_rows, start, end, seed=0):
+    """
+    product_id,price,option,date_created,is_immediate_delivery_item 구조의 합성 거래 데이터를 생성합니다.
+    - 상품별 거래량은 인기 상품에 몰리도록 Zipf 형태의 가중치를 사용하고,
+    - 가격은 발매가에 로그정규 분포의 프리미엄/할인을 곱해 1000원 단위로 반올림합니다.
+    """
+    rng = np.random.default_rng(seed)
+    n_products = len(product_meta)
+
+    weights = 1 / np.arange(1, n_products + 1)
+    positions = rng.choice(n_products, size=n_rows, p=weights / weights.sum())
+
+    start = pd.Timestamp(start)
+    span_seconds = int((pd.Timestamp(end) - start).total_seconds())
+    seconds = rng.integers(0, span_seconds, size=n_rows)
+
+    original_price = product_meta["original_price"].to_numpy()[positions]
+    price = np.round(original_price * rng.lognormal(0.1, 0.3, size=n_rows), -3).astype("int64")
+
+    return pd.DataFrame({
+        "product_id": product_meta["product_id"].to_numpy()[positions],
+        "price": price,
+        "option": pd.Categorical.from_codes(rng.integers(0, len(OPTIONS), size=n_rows), OPTIONS),
+        "date_created": start + pd.to_timedelta(seconds, unit="s"),
+        "is_immediate_delivery_item": rng.random(n_rows) < 0.3,
+    })
+
+def write_dataset(data_path, transactions, product_meta, source_dir="trading"):
+    """
+    합성 데이터를 source 폴더와 같은 구조(<source_dir>/<product_id>.csv, meta/product_meta_data.csv)로 저장합니다.
+    거래 파일은 실제 데이터와 같이 최신순으로 정렬합니다.
+    """
+    trading_path = os.path.join(data_path, source_dir)
+    meta_path = os.path.join(data_path, "meta")
+    os.makedirs(trading_path, exist_ok=True)
+    os.makedirs(meta_path, exist_ok=True)
+
+    product_meta.to_csv(os.path.join(meta_path, "product_meta_data.csv"), index=False)
+
+    csv_data = transactions.assign(
+        date_created=transactions["date_created"].dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        is_immediate_delivery_item=np.where(transactions["is_immediate_delivery_item"], "true", "false"),
+    ).sort_values(["product_id", "date_created"], ascending=[True, False])
+
+    for product_id, product_data in csv_data.groupby("product_id", sort=False):
+        product_data.to_csv(os.path.join(trading_path, f"{product_id}.csv"), index=False)
+
+def _use_data_path(data_path):
+    # 로더가 합성 데이터 폴더를 읽도록 모듈 경로 변경 (벤치마크 자식 프로세스 안에서만 사용)
+    utils.DATA_PATH = data_path
+    transaction_store.DATA_PATH = data_path
+    transaction_store.STORE_PATH = os.path.join(data_path, "store")
+
+def _run_stage(connection, stage, context):
+    # 단계마다 spawn으로 만든 새 프로세스에서 실행하여 최대 RSS를 단계별로 측정
+    # (fork는 부모의 합성 데이터까지 ru_maxrss에 포함되므로 사용하지 않음)
+    # 입력 데이터는 자식 프로세스에서 같은 시드로 다시 생성하고, rss_delta는 입력 생성 이후 단계 실행으로 늘어난 양
+    _use_data_path(context["data_path"])
+    if stage in INPUT_STAGES:
+        product_meta = generate_product_meta(context["products"], context["seed"])
+        context = {
+            **context,
+            "product_meta": product_meta,
+            "product_ids": product_meta["product_id"].tolist(),
+            "transactions": generate_transactions(product_meta, context["rows"], context["baseline_date"], context["endline_date"], context["seed"]),
+        }
+    start_rss = current_rss_mb()
+
+    started = time.perf_counter()
+    rows_out = STAGES[stage](context)
+    wall_time = time.perf_counter() - started
+
+    peak_rss = peak_rss_mb()
+
+    connection.send({
+        "wall_time": wall_time,
+        "peak_rss_mb": peak_rss,
+        "rss_delta_mb": peak_rss - start_rss if start_rss is not None else None,
+        "rows_out": rows_out,
+    })
+    connection.close()
+
+def _stage_load_csv(context):
+    return len(utils.load_transaction_data(use_store=False))
+
+def _stage_load_store_cold(context):
+    shutil.rmtree(transaction_store.STORE_PATH, ignore_errors=True)
+    return len(utils.load_transaction_data())
+
+def _stage_load_store_warm(context):
+    return len(utils.load_transaction_data())
+
+def _stage_market_index_24h(context):
+    [resell_market_index, _] = calculate_resell_market_index(context["transactions"], context["product_meta"], context["product_ids"], context["baseline_date"])
+    return len(resell_market_index)
+
+def _stage_market_index_4h(context):
+    return len(calculate_resell_market_index_4h(context["transactions"], context["product_meta"], context["product_ids"], context["baseline_date"]))
+
+def _stage_alpha_sweep(context):
+    [data_24h, data_4h] = calculate_resell_market_index_for_alphas(context["transactions"], context["product_meta"], context["product_ids"], context["baseline_date"], ALPHAS)
+    return sum(len(data) for _, data in data_24h + data_4h)
+
+STAGES = {
+    "load_transaction_data (csv)": _stage_load_csv,
+    "load_transaction_data (store, cold)": _stage_load_store_cold,
+    "load_transaction_data (store, warm)": _stage_load_store_warm,
+    "calculate_resell_market_index": _stage_market_index_24h,
+    "calculate_resell_market_index_4h": _stage_market_index_4h,
+    "alpha sweep": _stage_alpha_sweep,
+}
+
+# 합성 거래 데이터(transactions, product_meta)를 입력으로 받는 단계
+INPUT_STAGES = {"calculate_resell_market_index", "calculate_resell_market_index_4h", "alpha sweep"}
+
+def run_benchmark(n_rows, n_products, seed=0, start="2025-01-15T00:00:00Z", end="2025-02-15T00:00:00Z", stages=None):
+    """
+    합성 데이터를 생성하여 각 단계의 실행 시간과 최대 RSS를 측정합니다.
+
+    Returns:
+        dict: 벤치마크 결과 (append_history로 이력에 저장)
+    """
+    stages = stages or list(STAGES)
+    product_meta = generate_product_meta(n_products, seed)
+    transactions = generate_transactions(product_meta, n_rows, start, end, seed)
+
+    data_path = tempfile.mkdtemp(prefix="resell-benchmark-")
+    try:
+        write_dataset(data_path, transactions, product_meta)
+        del transactions
+
+        # 자식 프로세스에는 합성 데이터 대신 생성 조건만 전달
+        context = {
+            "data_path": data_path,
+            "rows": n_rows,
+            "products": n_products,
+            "seed": seed,
+            "baseline_date": start,
+            "endline_date": end,
+        }
+
+        results = {}
+        mp_context = multiprocessing.get_context("spawn")
+        for stage in stages:
+            receiver, sender = mp_context.Pipe(duplex=False)
+            process = mp_context.Process(target=_run_stage, args=(sender, stage, context))
+            process.start()
+            sender.close()
+            results[stage] = receiver.recv()
+            process.join()
+            print(f"{stage:<40} {results[stage]['wall_time']:8.3f}s  peak RSS {results[stage]['peak_rss_mb']:8.1f} MB")
+    finally:
+        shutil.rmtree(data_path, ignore_errors=True)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "cpu_count": os.cpu_count(),
+        "rows": n_rows,
+        "products": n_products,
+        "seed": seed,
+        "stages": results,
+    }
+
+def measure_startup(modules=STARTUP_MODULES, repeat=3):
+    """
+    새 인터프리터에서 각 모듈을 import하는 데 걸리는 시간을 측정합니다. (repeat번 중 최솟값)
+    import만으로 matplotlib이 로드되는지도 함께 기록합니다.
+    """
+    code = "import sys, time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started, 'matplotlib' in sys.modules)"
+    cwd = os.path.dirname(os.path.abspath(__file__))
+
+    results = {}
+    for module in modules:
+        import_times = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "-c", code.format(module=module)], cwd=cwd, capture_output=True, text=True, check=True).stdout.split()
+            import_times.append(float(output[-2]))
+        results[module] = {"import_time": min(import_times), "matplotlib_loaded": output[-1] == "True"}
+        print(f"import {module:<35} {results[module]['import_time']:8.3f}s  matplotlib {'loaded' if results[module]['matplotlib_loaded'] else '-'}")
+
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(history_path=BENCHMARK_HISTORY_PATH):
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path, "r") as f:
+        return json.load(f)
+
+def append_history(result, history_path=BENCHMARK_HISTORY_PATH):
+    history = load_history(history_path)
+    history.append(result)
+    os.makedirs(os.path.dirname(history_path), exist_ok=True)
+    with open(history_path, "w") as f:
+        json.dump(history, f, indent=2, ensure_ascii=False)
+
+def compare_with_previous(result, history, threshold=1.2):
+    """
+    같은 규모(rows, products, seed)의 직전 실행과 비교하여 threshold배 이상 느려진 단계를 반환합니다.
+    """
+    previous = [
+        run for run in history
+        if run["rows"] == result["rows"] and run["products"] == result["products"] and run["seed"] == result["seed"]
+    ]
+    if not previous:
+        return {}
+
+    regressions = {}
+    for stage, stats in result["stages"].items():
+        before = previous[-1]["stages"].get(stage)
+        if before and before["wall_time"] > 0 and stats["wall_time"] / before["wall_time"] >= threshold:
+            regressions[stage] = stats["wall_time"] / before["wall_time"]
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="리셀 지수 파이프라인 벤치마크")
+    parser.add_argument("--preset", choices=PRESETS, default="small", help="데이터 규모 프리셋")
+    parser.add_argument("--rows", type=int, help="거래 건수 (프리셋 대신 지정)")
+    parser.add_argument("--products", type=int, help="상품 수 (프리셋 대신 지정)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stage", action="append", choices=list(STAGES), help="측정할 단계 (여러 번 지정 가능)")
+    parser.add_argument("--startup-only", action="store_true", help="모듈 시작 시간만 측정")
+    parser.add_argument("--no-save", action="store_true", help="결과를 이력 파일에 저장하지 않음")
+    args = parser.parse_args()
+
+    startup = measure_startup()
+    for module, stats in startup.items():
+        if stats["import_time"] > STARTUP_BUDGET:
+            print(f"⚠️ 시작 시간 초과: {module} ({stats['import_time']:.3f}s > {STARTUP_BUDGET}s)")
+        if stats["matplotlib_loaded"]:
+            print(f"⚠️ {module} import 시 matplotlib이 로드됨")
+
+    if args.startup_only:
+        raise SystemExit
+
+    preset_rows, preset_products = PRESETS[args.preset]
+    n_rows = args.rows or preset_rows
+    n_products = args.products or preset_products
+
+    print(f"거래 {n_rows:,}건, 상품 {n_products:,}개")
+    result = run_benchmark(n_rows, n_products, seed=args.seed, stages=args.stage)
+    result["startup"] = startup
+
+    history = load_history()
+    for stage, ratio in compare_with_previous(result, history).items():
+        print(f"⚠️ 성능 저하: {stage} ({ratio:.2f}배)")
+
+    if not args.no_save:
+        append_history(result)
+        print(f"✅ 벤치마크 결과가 {BENCHMARK_HISTORY_PATH} 파일에 저장되었습니다!")
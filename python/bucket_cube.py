@@ -0,0 +1,197 @@
+#bucket_cube.py
+#상품 × 시간 구간 집계 큐브: 원시 거래는 한 번만 집계하고 24시간, 4시간 등 모든 구간은 큐브에서 롤업
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from parallel_utils import run_product_shards
+from product_catalog import ProductCatalog
+from stage_trace import traced
+
+# 큐브의 가장 작은 구간 크기
+CUBE_FREQ = "1h"
+
+CUBE_COLUMNS = ["product_id", "date_created", "count", "price_sum", "price_sumsq", "price_min", "price_max", "discount_count"]
+
+@traced()
+def build_bucket_cube(transactions, product_meta, product_ids=None, freq=CUBE_FREQ, workers=None):
+    """
+    거래 데이터를 (product_id, freq 구간) 단위로 한 번 집계합니다.
+
+    Parameters:
+        transactions (pandas.DataFrame): 거래 데이터 (product_id, price, date_created)
+        product_meta (ProductCatalog | pandas.DataFrame): 상품 메타 데이터 (할인 거래 판단에 original_price 사용)
+        product_ids (list | None): 지정하면 해당 상품만 집계
+        freq (str): 큐브 구간 크기 (기본 1시간)
+        workers (int | None): 2 이상이면 상품을 나누어 프로세스 풀에서 집계
+
+    Returns:
+        pandas.DataFrame: CUBE_COLUMNS 컬럼, (product_id, date_created) 순 정렬
+        - count, price_sum, price_sumsq, price_min, price_max: 구간별 거래 건수와 가격 통계
+        - discount_count: 발매가보다 낮은 가격의 거래 건수 (발매가가 없거나 0 이하인 상품은 0)
+    """
+    if product_ids is not None:
+        transactions = transactions[transactions["product_id"].isin(product_ids)]
+
+    if workers is not None and workers > 1:
+        return _build_bucket_cube_parallel(transactions, product_meta, product_ids, freq, workers)
+
+    date_created = transactions["date_created"]
+    if not pd.api.types.is_datetime64_any_dtype(date_created):
+        date_created = pd.to_datetime(date_created)
+
+    reference_price = ProductCatalog.from_meta(product_meta).lookup_original_price(transactions["product_id"])
+    price = transactions["price"].to_numpy(dtype="int64")
+
+    frame = pd.DataFrame({
+        "product_id": transactions["product_id"].to_numpy(),
+        "date_created": floor_dates(date_created, freq).reset_index(drop=True),
+        "price": price,
+        "price_sq": price.astype(float) ** 2,
+        "is_discount": price < reference_price,
+    })
+
+    cube = frame.groupby(["product_id", "date_created"], sort=True).agg(
+        count=("price", "count"),
+        price_sum=("price", "sum"),
+        price_sumsq=("price_sq", "sum"),
+        price_min=("price", "min"),
+        price_max=("price", "max"),
+        discount_count=("is_discount", "sum")
+    ).reset_index()
+
+    cube.attrs["freq"] = freq
+    return cube
+
+@traced()
+def rollup_bucket_cube(cube, freq, fill_empty=False):
+    """
+    큐브를 더 큰 구간(freq)으로 롤업합니다. (예: "4h", "12h", "D", "W")
+
+    Parameters:
+        cube (pandas.DataFrame): build_bucket_cube 또는 rollup_bucket_cube의 결과
+        freq (str): 롤업할 구간 크기 (큐브 구간 크기의 배수)
+        fill_empty (bool): True면 상품별 첫 구간~마지막 구간 사이의 거래 없는 구간도 count 0으로 포함 (resample과 같음)
+
+    Returns:
+        pandas.DataFrame: CUBE_COLUMNS 컬럼과 avg_price 컬럼 (거래가 없는 구간은 NaN)
+    """
+    cube_freq = cube.attrs.get("freq", CUBE_FREQ)
+    if _is_fixed(freq) and _is_fixed(cube_freq) and pd.Timedelta(to_offset(freq)) % pd.Timedelta(to_offset(cube_freq)) != pd.Timedelta(0):
+        raise ValueError(f"롤업 구간({freq})은 큐브 구간({cube_freq})의 배수여야 합니다.")
+
+    rolled = cube.assign(date_created=floor_dates(cube["date_created"], freq)).groupby(["product_id", "date_created"], sort=True).agg(
+        count=("count", "sum"),
+        price_sum=("price_sum", "sum"),
+        price_sumsq=("price_sumsq", "sum"),
+        price_min=("price_min", "min"),
+        price_max=("price_max", "max"),
+        discount_count=("discount_count", "sum")
+    )
+
+    if fill_empty and not rolled.empty:
+        rolled = rolled.reindex(_full_bucket_index(rolled, freq))
+        rolled[["count", "price_sum", "price_sumsq", "discount_count"]] = rolled[["count", "price_sum", "price_sumsq", "discount_count"]].fillna(0).astype({"count": "int64", "discount_count": "int64"})
+
+    rolled = rolled.reset_index()
+    rolled["avg_price"] = (rolled["price_sum"] / rolled["count"]).where(rolled["count"] > 0)
+    rolled.attrs["freq"] = freq
+    return rolled
+
+def count_discount_trades(transactions, reference_price, freq="D"):
+    """
+    reference_price에 있는 상품의 거래에서 (product_id, freq 구간)별 기준 가격보다 낮은 가격의 거래 건수를 셉니다.
+    큐브의 discount_count는 발매가 기준이므로, 발매가가 없어 보정 가격 등 다른 기준 가격을 쓰는 상품에 사용합니다.
+
+    Parameters:
+        transactions (pandas.DataFrame): 거래 데이터 (product_id, price, date_created)
+        reference_price (pandas.Series): 상품 ID 인덱스, 기준 가격 값
+
+    Returns:
+        pandas.DataFrame: product_id, date_created, discount_count (할인 거래가 있는 구간만)
+    """
+    date_created = transactions["date_created"]
+    if not pd.api.types.is_datetime64_any_dtype(date_created):
+        date_created = pd.to_datetime(date_created)
+
+    price = transactions["price"].to_numpy(dtype=float)
+    is_discount = price < transactions["product_id"].map(reference_price).to_numpy(dtype=float)
+
+    discounts = pd.DataFrame({
+        "product_id": transactions["product_id"].to_numpy()[is_discount],
+        "date_created": floor_dates(date_created[is_discount], freq).to_numpy(),
+    })
+    return discounts.groupby(["product_id", "date_created"], sort=True).size().rename("discount_count").reset_index()
+
+def is_aligned(cube, timestamp):
+    """
+    timestamp가 큐브 구간 경계와 맞는지 확인합니다. 경계가 맞아야 큐브에서 시점 필터를 정확히 적용할 수 있습니다.
+    """
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp == floor_dates(pd.Series([timestamp]), cube.attrs.get("freq", CUBE_FREQ)).iloc[0]
+
+def floor_dates(date_created, freq):
+    """
+    날짜를 freq 구간의 시작 시각으로 내립니다.
+    고정 길이 구간(1h, 4h, D 등)은 dt.floor, 주/월 같은 구간은 기간(period)의 시작 시각을 사용합니다.
+    """
+    if _is_fixed(freq):
+        return date_created.dt.floor(freq)
+
+    tz = date_created.dt.tz
+    naive = date_created.dt.tz_localize(None) if tz is not None else date_created
+    start = naive.dt.to_period(freq).dt.start_time
+    return start.dt.tz_localize(tz) if tz is not None else start
+
+def _is_fixed(freq):
+    return isinstance(to_offset(freq), pd.offsets.Tick)
+
+def _full_bucket_index(rolled, freq):
+    if not _is_fixed(freq):
+        raise ValueError(f"fill_empty는 고정 길이 구간에서만 사용할 수 있습니다: {freq}")
+
+    step = pd.Timedelta(to_offset(freq))
+    dates = rolled.index.get_level_values("date_created")
+    bounds = pd.DataFrame({"product_id": rolled.index.get_level_values("product_id"), "date_created": dates}).groupby("product_id", sort=True)["date_created"].agg(["min", "max"])
+
+    # 상품별 구간 개수만큼 상품 ID와 시작 시각을 반복하고, 구간 번호만큼 더해 전체 구간 생성
+    lengths = ((bounds["max"] - bounds["min"]) // step).astype("int64").to_numpy() + 1
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    starts = pd.DatetimeIndex(bounds["min"]).repeat(lengths)
+
+    return pd.MultiIndex.from_arrays(
+        [np.repeat(bounds.index.to_numpy(), lengths), starts + offsets * step],
+        names=["product_id", "date_created"]
+    )
+
+def _build_bucket_cube_parallel(transactions, product_meta, product_ids, freq, workers):
+    if product_ids is None:
+        product_ids = transactions["product_id"].unique().tolist()
+    product_ids = list(dict.fromkeys(product_ids))
+
+    # 날짜 변환은 부모 프로세스에서 한 번만 수행
+    shared = transactions[["product_id", "price", "date_created"]]
+    if not pd.api.types.is_datetime64_any_dtype(shared["date_created"]):
+        shared = shared.assign(date_created=pd.to_datetime(shared["date_created"]))
+
+    product_meta = ProductCatalog.from_meta(product_meta).subset(product_ids)
+    shard_cubes = run_product_shards(
+        _build_bucket_cube_shard,
+        shared,
+        ["product_id", "price", "date_created"],
+        product_ids,
+        workers,
+        product_meta,
+        freq
+    )
+
+    shard_cubes = [shard_cube for shard_cube in shard_cubes if not shard_cube.empty]
+    if not shard_cubes:
+        return build_bucket_cube(shared.iloc[:0], product_meta, freq=freq)
+
+    cube = pd.concat(shard_cubes, ignore_index=True).sort_values(["product_id", "date_created"], kind="stable", ignore_index=True)
+    cube.attrs["freq"] = freq
+    return cube
+
+def _build_bucket_cube_shard(shard_transactions, shard_product_ids, product_meta, freq):
+    return build_bucket_cube(shard_transactions, product_meta.subset(shard_product_ids), freq=freq)
@@ -1,34 +1,47 @@
 #calculate_single_product.py
 #개별 상품 ID별 리셀 지수 계산
+import argparse
 import os
 from resell_index import calculate_product_resell_index
-from calculate_resell_market import load_transaction_data
-import pandas as pd
+from product_catalog import load_product_catalog
+from utils import load_transaction_data
 
 # 데이터 경로 설정
 DATA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "source"))
 # product_meta_data.csv 경로 설정
 product_meta_path = os.path.join(DATA_PATH, 'meta', "product_meta_data.csv")
 
-# 파일 존재 여부 확인
-if not os.path.exists(product_meta_path):
-    raise FileNotFoundError(f"파일이 존재하지 않습니다: {product_meta_path}")
+def calculate_single_product(product_id, baseline_date, alpha=0.1):
+    """
+    상품 하나의 리셀 지수를 계산합니다.
+    상품 메타 데이터와 거래 데이터는 호출할 때 읽으며, 거래 데이터는 해당 상품의 파일만 읽습니다.
+    """
+    # 파일 존재 여부 확인
+    if not os.path.exists(product_meta_path):
+        raise FileNotFoundError(f"파일이 존재하지 않습니다: {product_meta_path}")
 
-# product_meta 데이터 로드
-product_meta = pd.read_csv(product_meta_path)
+    # product_meta 데이터 로드
+    product_meta = load_product_catalog(product_meta_path)
 
-# 거래 데이터 로드
-transactions = load_transaction_data()
+    # 거래 데이터 로드 (해당 상품만)
+    transactions = load_transaction_data(product_ids=[product_id])
 
+    # 리셀 지수 계산
+    product_resell_data = calculate_product_resell_index(transactions, product_meta, product_id, baseline_date, alpha)
 
-# 특정 상품 ID 및 기준일 설정
-product_id = 36
-baseline_date = "2025-01-31T00:00:00Z"
+    return product_resell_data, product_meta.get_original_price(product_id)
 
-# 리셀 지수 계산
-product_resell_data = calculate_product_resell_index(transactions, product_meta, product_id, baseline_date)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="개별 상품 리셀 지수 계산")
+    # 특정 상품 ID 및 기준일 설정
+    parser.add_argument("product_id", type=int, nargs="?", default=36)
+    parser.add_argument("--baseline-date", default="2025-01-31T00:00:00Z")
+    parser.add_argument("--alpha", type=float, default=0.1)
+    args = parser.parse_args()
 
-# 결과 출력
-print(product_resell_data)
-print(f"product_id: {product_id}")
-print(f"baseline_price: {product_meta[product_meta['product_id'] == product_id]['original_price'].values}")
+    product_resell_data, baseline_price = calculate_single_product(args.product_id, args.baseline_date, args.alpha)
+
+    # 결과 출력
+    print(product_resell_data)
+    print(f"product_id: {args.product_id}")
+    print(f"baseline_price: {baseline_price}")
@@ -0,0 +1,116 @@
+#chart_queue.py
+#그래프 렌더링(savefig)을 별도 프로세스에서 처리하여 지수 계산과 겹쳐 실행하기 위한 큐
+import inspect
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from stage_trace import _row_count, trace_stage, tracer
+
+class ChartQueue:
+    """
+    visualization의 plot 함수 호출을 (함수, 데이터, 옵션) 형태의 작업으로 받아
+    Agg 백엔드를 사용하는 프로세스 풀에서 그립니다.
+
+    - submit은 작업을 넘기고 바로 반환하므로 메인 파이프라인은 렌더링을 기다리지 않고 계속 계산합니다.
+    - 모든 그래프가 저장될 때까지 기다리려면 마지막에 join을 호출합니다.
+    - save, show가 모두 꺼진 호출은 결과물이 없으므로 그리지 않습니다.
+    - show=True인 호출은 화면 창이 필요하므로 메인 프로세스에서 바로 그립니다.
+    - max_workers=0이면 풀을 만들지 않고 모든 작업을 메인 프로세스에서 순서대로 그립니다.
+    - 계측(stage_trace)이 켜져 있으면 워커에서 잰 렌더링 시간을 join에서 plot 함수 이름의 단계로 기록합니다.
+      (start는 작업을 예약한 시각)
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = min(4, os.cpu_count() or 1) if max_workers is None else max_workers
+        self._executor = None
+        self._pending = []
+
+    def submit(self, plot, *args, **kwargs):
+        """
+        plot(*args, **kwargs) 렌더링 작업을 큐에 넣습니다.
+
+        Parameters:
+            plot (function): visualization 모듈의 plot 함수 (모듈 최상위 함수여야 함)
+            args, kwargs: plot 함수에 그대로 전달할 데이터와 옵션
+
+        Returns:
+            bool: 렌더링 작업을 실행(또는 예약)했으면 True
+        """
+        if not kwargs.get("save") and not kwargs.get("show"):
+            return False
+
+        if kwargs.get("show") or self.max_workers == 0:
+            plot(*args, **kwargs)
+            return True
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+
+        self._pending.append((plot.__name__, self._executor.submit(_render, plot, args, kwargs), _trace_info(plot, args, kwargs)))
+        return True
+
+    def join(self):
+        """
+        예약된 렌더링이 모두 끝날 때까지 기다린 뒤 풀을 닫습니다.
+        실패한 작업이 있으면 모든 작업이 끝난 후 첫 번째 예외를 다시 발생시킵니다.
+
+        Returns:
+            int: 프로세스 풀에서 그린 그래프 수
+        """
+        pending, self._pending = self._pending, []
+
+        with trace_stage("chart_queue_join", rows_in=len(pending)):
+            wait([future for _, future, _ in pending])
+
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+        # 워커에서 잰 렌더링 시간을 부모 프로세스의 계측 기록에 추가
+        for name, future, trace_info in pending:
+            if trace_info is not None and future.exception() is None:
+                tracer.record(name, future.result(), **trace_info)
+
+        errors = [(name, future.exception()) for name, future, _ in pending if future.exception() is not None]
+        for name, error in errors:
+            print(f"⚠️ {name} 그래프 렌더링 실패: {error}")
+        if errors:
+            raise errors[0][1]
+
+        return len(pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.join()
+        elif self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._pending = []
+
+def _init_worker():
+    # 워커는 화면 없이 파일로만 저장하므로 pyplot을 불러오기 전에 Agg 백엔드로 고정
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+
+def _trace_info(plot, args, kwargs):
+    # 계측이 켜져 있을 때만 예약 시각, 입력 행 수, 상품 ID를 남김 (traced 데코레이터와 같은 값)
+    if not tracer.enabled:
+        return None
+
+    function = getattr(plot, "__wrapped__", plot)
+    arguments = inspect.signature(function).bind_partial(*args, **kwargs).arguments
+    return {
+        "start": time.perf_counter() - tracer._started,
+        "rows_in": _row_count(args[0]) if args else None,
+        "product_id": arguments.get("product_id"),
+    }
+
+def _render(plot, args, kwargs):
+    # traced 데코레이터의 기록은 워커 안에서 버려지므로 원래 함수를 바로 호출하고, 렌더링 시간을 부모 프로세스로 반환
+    started = time.perf_counter()
+    getattr(plot, "__wrapped__", plot)(*args, **kwargs)
+    return time.perf_counter() - started
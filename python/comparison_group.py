@@ -1,21 +1,131 @@
-import os
+#comparison_group.py
+#리셀 시장 지수와 비교군(KOSPI, S&P 500) 주가 지수를 같은 달력에 맞춰 비교
+import numpy as np
+import pandas as pd
 
 from visualization import plot_stock_index
-from utils import load_csv
+from utils import load_stock_index
+from stage_trace import traced
 
-stock_path = os.path.join('stock-index')
+# 비교군 주가 지수 (source/stock-index/{이름}.csv)
+BENCHMARKS = ("kospi", "snp500")
 
 def comparison_group():
     """
     S&P 500과 KOSPI 주가 그래프 저장
     """
-    snp500_path = os.path.join(stock_path, "snp500.csv")
-    kospi_path = os.path.join(stock_path, "kospi.csv")
-    
-    snp500 = load_csv(snp500_path)
+    # 날짜, 숫자 컬럼을 변환한 데이터 (plot_stock_index는 한글 컬럼명 사용)
+    snp500 = load_stock_index("snp500", english=False)
     plot_stock_index(snp500, "stock-index", "S&P 500", save=True, show=True)
 
-    kospi = load_csv(kospi_path)
+    kospi = load_stock_index("kospi", english=False)
     plot_stock_index(kospi, "stock-index", "KOSPI", save=True, show=True)
 
-comparison_group()
+@traced()
+def align_with_benchmarks(resell_index, benchmarks=BENCHMARKS, index_column="market_resell_index"):
+    """
+    리셀 시장 지수(24시간 또는 4시간 간격)의 시점마다 비교군 종가를 붙입니다.
+
+    - 달력은 리셀 시장 지수의 date_created를 그대로 사용 (리셀 거래는 주말에도 있음)
+    - 각 시점에는 같은 날짜 또는 그 이전 마지막 거래일의 종가를 사용 (주말, 휴장일은 직전 종가로 채움)
+    - 비교군 데이터가 시작되기 전 시점은 NaN
+    - 시간대가 있는 date_created는 UTC 기준 날짜로 맞춤
+
+    Returns:
+        pandas.DataFrame: date_created, resell_index, 비교군 이름별 종가 컬럼
+    """
+    date_created = pd.to_datetime(resell_index["date_created"])
+    if date_created.dt.tz is not None:
+        date_created = date_created.dt.tz_convert("UTC").dt.tz_localize(None)
+    days = date_created.dt.normalize().to_numpy()
+
+    aligned = pd.DataFrame({
+        "date_created": resell_index["date_created"].reset_index(drop=True),
+        "resell_index": pd.to_numeric(resell_index[index_column], errors="coerce").to_numpy(dtype=float),
+    })
+
+    for benchmark in benchmarks:
+        stock_index = load_stock_index(benchmark).dropna(subset=["close"])
+        stock_days = stock_index["date"].to_numpy()
+        closes = np.append(stock_index["close"].to_numpy(dtype=float), np.nan)
+
+        # 날짜 이하인 마지막 거래일 위치 (없으면 -1 → 마지막에 붙인 NaN)
+        positions = np.searchsorted(stock_days, days, side="right") - 1
+        aligned[benchmark] = closes[positions]
+
+    return aligned
+
+@traced()
+def compare_with_benchmarks(resell_index, benchmarks=BENCHMARKS, windows=(5, 10, 20), index_column="market_resell_index"):
+    """
+    리셀 시장 지수와 비교군의 수익률로 구간(window)별 이동 상관계수, 베타, 변동성 비율을 계산합니다.
+
+    - 수익률은 직전 시점 대비 변화율 (지수가 0인 구간 등으로 계산할 수 없는 수익률은 NaN)
+    - 누적합을 한 번만 구해 모든 window와 비교군의 이동 통계를 배열 연산으로 계산
+    - window 안에 NaN 수익률이 하나라도 있거나 비교군 수익률의 분산이 0이면 NaN
+
+    베타는 비교군 수익률에 대한 리셀 지수 수익률의 회귀 기울기,
+    변동성 비율은 (리셀 지수 수익률 표준편차) / (비교군 수익률 표준편차)입니다.
+
+    Returns:
+        [aligned, comparison]
+        - aligned: align_with_benchmarks 결과에 {컬럼}_return 수익률 컬럼을 추가한 DataFrame
+        - comparison: date_created, benchmark, window, correlation, beta, volatility_ratio (window 끝 시점 기준)
+    """
+    benchmarks = list(benchmarks)
+    aligned = align_with_benchmarks(resell_index, benchmarks, index_column)
+
+    levels = aligned[["resell_index"] + benchmarks].to_numpy(dtype=float)
+    returns = np.full_like(levels, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = levels[1:] / levels[:-1] - 1
+    returns[~np.isfinite(returns)] = np.nan
+
+    for position, column in enumerate(["resell_index"] + benchmarks):
+        aligned[f"{column}_return"] = returns[:, position]
+
+    y = returns[:, :1]
+    x = returns[:, 1:]
+    valid = np.isfinite(y) & np.isfinite(x)
+    y = np.where(valid, y, 0.0)
+    x = np.where(valid, x, 0.0)
+
+    # 앞에 0 행을 붙인 누적합: 구간 [i, i + window)의 합 = cumulative[i + window] - cumulative[i]
+    moments = {name: np.vstack([np.zeros((1, x.shape[1])), np.cumsum(values, axis=0)]) for name, values in (
+        ("count", valid.astype(float)), ("x", x), ("y", y), ("xx", x * x), ("yy", y * y), ("xy", x * y),
+    )}
+
+    length = len(aligned)
+    frames = []
+    for window in windows:
+        statistics = np.full((3, length, len(benchmarks)), np.nan)
+
+        if 1 < window <= length:
+            sums = {name: cumulative[window:] - cumulative[:-window] for name, cumulative in moments.items()}
+            mean_x = sums["x"] / window
+            mean_y = sums["y"] / window
+            var_x = sums["xx"] / window - mean_x ** 2
+            var_y = np.clip(sums["yy"] / window - mean_y ** 2, 0, None)
+            cov = sums["xy"] / window - mean_x * mean_y
+
+            usable = (sums["count"] == window) & (var_x > 0)
+            var_x = np.where(usable, var_x, np.nan)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                statistics[0, window - 1:] = cov / np.sqrt(var_x * var_y)
+                statistics[1, window - 1:] = cov / var_x
+                statistics[2, window - 1:] = np.sqrt(var_y / var_x)
+
+        frames.append(pd.DataFrame({
+            "date_created": aligned["date_created"].repeat(len(benchmarks)).reset_index(drop=True),
+            "benchmark": np.tile(benchmarks, length),
+            "window": window,
+            "correlation": statistics[0].ravel(),
+            "beta": statistics[1].ravel(),
+            "volatility_ratio": statistics[2].ravel(),
+        }))
+
+    comparison = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["date_created", "benchmark", "window", "correlation", "beta", "volatility_ratio"])
+    return [aligned, comparison]
+
+if __name__ == "__main__":
+    comparison_group()
@@ -0,0 +1,222 @@
+#constituents.py
+#지수 편입 상품 선정: 상품별 일별 거래량 행렬에서 임의의 날짜의 거래량 상위 K개 상품을 고르고, 주기적으로 재선정(리밸런싱)
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from bucket_cube import rollup_bucket_cube
+from stage_trace import traced
+
+# 거래량이 같은 상품의 순서
+# - baseline: 기존 main.py의 sort_values(by="total_volume", ascending=False) 결과와 같은 순서 (기본값, 발표 지수 유지)
+# - catalog: product_ids 순서가 앞선 상품을 먼저 선택
+TIE_BREAKS = ("baseline", "catalog")
+
+class ConstituentSelector:
+    """
+    (날짜 × 상품) 일별 거래량 행렬을 한 번 만들어 두고, 날짜마다 거래량 상위 K개 상품을 고르는 구조.
+
+    - 거래량이 같은 상품의 순서는 tie_break로 지정 (TIE_BREAKS), 해당 기간 거래가 없는 상품은 선택하지 않음
+    - tie_break="catalog"이면 np.partition으로 K번째 거래량만 찾은 뒤 그 이상인 상품만 정렬 (전체 상품 정렬 없음)
+    - lookback_days를 지정하면 날짜 이전 lookback_days일 거래량 합계로 순위를 매김 (누적합 행렬 사용)
+    - 날짜는 UTC 기준 날짜 (거래 시각의 dt.date와 같음)
+    """
+
+    def __init__(self, product_ids, days, volumes):
+        """
+        Parameters:
+            product_ids (list): 상품 ID 목록 (행렬의 열 순서)
+            days (array): 오름차순 날짜 배열 (datetime64[D], 행렬의 행 순서)
+            volumes (numpy.ndarray): (날짜 수 × 상품 수) 일별 거래량
+        """
+        self.product_ids = np.asarray(product_ids, dtype="int64")
+        self.days = np.asarray(days, dtype="datetime64[D]")
+        self.volumes = np.asarray(volumes, dtype="int64")
+        self._cumulative = None
+
+    @classmethod
+    def from_transactions(cls, transactions, product_ids):
+        """
+        거래 데이터(product_id, date_created)로 일별 거래량 행렬을 만듭니다.
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        date_created = transactions["date_created"]
+        if not pd.api.types.is_datetime64_any_dtype(date_created):
+            date_created = pd.to_datetime(date_created)
+        if date_created.dt.tz is not None:
+            date_created = date_created.dt.tz_localize(None)
+
+        return cls._from_counts(product_ids, transactions["product_id"].to_numpy(), date_created.to_numpy().astype("datetime64[D]"), None)
+
+    @classmethod
+    def from_cube(cls, cube, product_ids):
+        """
+        bucket_cube 집계 큐브를 하루 단위로 롤업하여 일별 거래량 행렬을 만듭니다.
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        daily = rollup_bucket_cube(cube, "D")
+        date_created = daily["date_created"]
+        if date_created.dt.tz is not None:
+            date_created = date_created.dt.tz_localize(None)
+
+        return cls._from_counts(product_ids, daily["product_id"].to_numpy(), date_created.to_numpy().astype("datetime64[D]"), daily["count"].to_numpy())
+
+    @classmethod
+    def _from_counts(cls, product_ids, row_product_ids, row_days, counts):
+        positions = pd.Index(product_ids).get_indexer(row_product_ids)
+        known = positions >= 0
+        positions, row_days = positions[known], row_days[known]
+        weights = counts[known] if counts is not None else None
+
+        days, day_positions = np.unique(row_days, return_inverse=True)
+        volumes = np.bincount(
+            day_positions.ravel() * len(product_ids) + positions,
+            weights=weights,
+            minlength=len(days) * len(product_ids)
+        ).reshape(len(days), len(product_ids))
+
+        return cls(product_ids, days, volumes)
+
+    def __repr__(self):
+        return f"ConstituentSelector({len(self.product_ids)} products, {len(self.days)} days)"
+
+    def volumes_on(self, date, lookback_days=1):
+        """
+        date까지 lookback_days일 동안의 상품별 거래량 합계 배열을 반환합니다. (product_ids 순서)
+        """
+        day = _to_day(date)
+        end = np.searchsorted(self.days, day, side="right")
+        start = np.searchsorted(self.days, day - np.timedelta64(lookback_days, "D"), side="right")
+
+        if lookback_days == 1:
+            if start < end:
+                return self.volumes[start]
+            return np.zeros(len(self.product_ids), dtype="int64")
+
+        if self._cumulative is None:
+            self._cumulative = np.vstack([np.zeros((1, len(self.product_ids)), dtype="int64"), np.cumsum(self.volumes, axis=0)])
+        return self._cumulative[end] - self._cumulative[start]
+
+    def select(self, date, k=25, lookback_days=1, tie_break="baseline"):
+        """
+        date 기준 거래량 상위 k개 상품 ID를 거래량 내림차순으로 반환합니다.
+        """
+        if tie_break not in TIE_BREAKS:
+            raise ValueError(f"tie_break는 {TIE_BREAKS} 중 하나여야 합니다: {tie_break}")
+
+        volumes = self.volumes_on(date, lookback_days)
+        traded = np.flatnonzero(volumes > 0)
+        if tie_break == "baseline":
+            # pandas의 내림차순 정렬(nargsort)과 같은 방법: 뒤집은 배열을 quicksort로 정렬한 뒤 다시 뒤집음
+            reversed_volumes = volumes[traded][::-1]
+            order = (len(traded) - 1 - np.argsort(reversed_volumes, kind="quicksort"))[::-1]
+            return self.product_ids[traded[order[:k]]].tolist()
+
+        if len(traded) <= k:
+            chosen = traded
+        else:
+            # K번째로 큰 거래량보다 큰 상품은 모두, 같은 상품은 앞선 순서대로 남은 자리만큼 선택
+            kth = np.partition(volumes[traded], len(traded) - k)[len(traded) - k]
+            above = traded[volumes[traded] > kth]
+            tied = traded[volumes[traded] == kth][:k - len(above)]
+            chosen = np.concatenate([above, tied])
+
+        chosen = chosen[np.lexsort((chosen, -volumes[chosen]))]
+        return self.product_ids[chosen].tolist()
+
+    def schedule(self, start_date, end_date, freq="W"):
+        """
+        start_date부터 end_date까지 리밸런싱 날짜 목록을 만듭니다.
+        첫 날짜는 항상 start_date이며, 이후는 freq 기간("W" 매주, "M" 매월)이 바뀌는 첫날입니다.
+        """
+        start, end = _to_day(start_date), _to_day(end_date)
+        days = pd.Series(pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq="D"))
+        periods = days.dt.to_period(freq)
+        return [pd.Timestamp(start)] + days[periods != periods.shift()].iloc[1:].tolist()
+
+@traced()
+def calculate_rebalanced_market_index(products_index, selector, rebalance_dates, k=25, lookback_days=1, tie_break="baseline"):
+    """
+    리밸런싱 날짜마다 편입 상품을 다시 선정하여 리셀 시장 지수를 계산하는 함수.
+    상품별 리셀 지수는 한 번만 계산된 products_index를 그대로 사용하고, 재선정 시에는 상품 열만 바꿉니다.
+
+    - 첫 구간은 첫 리밸런싱 날짜(기준일)의 편입 상품 평균 지수가 100이 되도록 정규화 (calculate_resell_market_index와 같음)
+    - 리밸런싱 날짜에는 이전 편입 상품 기준 지수와 새 편입 상품 기준 지수가 같도록 제수(divisor)를 조정하여 지수를 연속으로 유지
+
+    Parameters:
+        products_index (pandas.DataFrame): calculate_products_resell_index 결과 (date_created, resell_index, product_id)
+        selector (ConstituentSelector): 편입 상품 선정에 사용할 거래량 행렬
+        rebalance_dates (list): 리밸런싱 날짜 목록 (ConstituentSelector.schedule)
+        k (int): 편입 상품 수
+        tie_break (str): 거래량이 같은 상품의 순서 (TIE_BREAKS)
+
+    Returns:
+        [resell_market_index, constituents]
+        - resell_market_index: date_created, market_resell_index, divisor
+        - constituents: 리밸런싱 날짜별 [날짜, 편입 상품 ID 목록]
+    """
+    rebalance_days = sorted(_to_day(date) for date in rebalance_dates)
+
+    # (날짜 × 상품) 상품별 리셀 지수 행렬
+    matrix = products_index.assign(
+        date_created=pd.to_datetime(products_index["date_created"]),
+        resell_index=pd.to_numeric(products_index["resell_index"], errors="coerce"),
+    ).pivot_table(index="date_created", columns="product_id", values="resell_index", aggfunc="first")
+    days = matrix.index.to_numpy().astype("datetime64[D]")
+    values = matrix.to_numpy(dtype=float)
+    columns = pd.Index(matrix.columns)
+
+    levels = np.full(len(days), np.nan)
+    divisors = np.full(len(days), np.nan)
+    constituents = []
+    divisor = None
+    previous_positions = None
+
+    for position, rebalance_day in enumerate(rebalance_days):
+        product_ids = selector.select(rebalance_day, k, lookback_days, tie_break)
+        constituents.append([pd.Timestamp(rebalance_day), product_ids])
+        positions = columns.get_indexer(product_ids)
+        positions = positions[positions >= 0]
+
+        start = np.searchsorted(days, rebalance_day)
+        stop = np.searchsorted(days, rebalance_days[position + 1]) if position + 1 < len(rebalance_days) else len(days)
+        if start >= len(days) or len(positions) == 0:
+            continue
+
+        with _ignore_empty_mean():
+            raw = np.nanmean(values[start:stop, positions], axis=1)
+
+        if divisor is None:
+            # 기준일의 편입 상품 평균 지수를 100으로
+            if np.isnan(raw).all():
+                continue
+            divisor = raw[~np.isnan(raw)][0] / 100
+        elif previous_positions is not None:
+            # 리밸런싱 날짜의 이전 편입 상품 지수 수준을 유지하도록 제수 조정
+            with _ignore_empty_mean():
+                previous_raw = np.nanmean(values[start, previous_positions])
+            if not np.isnan(previous_raw) and not np.isnan(raw[0]) and previous_raw != 0:
+                divisor = divisor * raw[0] / previous_raw
+
+        levels[start:stop] = raw / divisor
+        divisors[start:stop] = divisor
+        previous_positions = positions
+
+    resell_market_index = pd.DataFrame({"date_created": matrix.index, "market_resell_index": levels, "divisor": divisors})
+    resell_market_index = resell_market_index.dropna(subset=["market_resell_index"]).reset_index(drop=True)
+    return [resell_market_index, constituents]
+
+def _to_day(date):
+    timestamp = pd.Timestamp(date)
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return np.datetime64(timestamp.normalize().date(), "D")
+
+@contextmanager
+def _ignore_empty_mean():
+    # 편입 상품 모두 거래가 없는 날의 nanmean 경고(Mean of empty slice) 무시
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        yield
@@ -1,10 +1,16 @@
 #기준일 보정
 
+import atexit
 import os
+from bisect import bisect_left
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
-from datetime import date
+from datetime import date, datetime
 #timedelta는 datetime 모듈에서 제공하는 클래스, 날짜와 시간 간의 차이를 표현하는 데 사용,특정 날짜에서 며칠을 더하거나 빼는 계산을 할 때 유용
 
+from stage_trace import traced
+
 #기준일(baseline_date)에 거래가 없으면 하루씩 앞뒤로 이동하여 가장 가까운 거래일의 데이터를 사용
 def get_closest_trading_day(product_data, baseline_date):
     # baseline_date가 datetime 객체가 아니라면 변환
@@ -21,10 +27,8 @@ def get_closest_trading_day(product_data, baseline_date):
             # 이미 datetime 또는 date 객체라면 바로 사용
             available_dates = sorted(product_data["date_created"].unique())
         else:
-            # 그렇지 않으면 문자열 등일 수 있으므로, 명시적으로 변환합니다.
-            product_data = product_data.copy()  # 원본 수정 방지를 위해 복사
-            product_data.loc[:, "date_created"] = pd.to_datetime(product_data["date_created"])
-            available_dates = sorted(product_data["date_created"].dt.date.unique())
+            # 그렇지 않으면 문자열 등일 수 있으므로, 날짜 컬럼만 변환합니다. (DataFrame 전체를 복사하거나 수정하지 않음)
+            available_dates = sorted(pd.to_datetime(product_data["date_created"]).dt.date.unique())
     # 날짜 정렬
     #available_dates = sorted(product_data["date_created"].dt.date.unique())
 
@@ -32,14 +36,22 @@ def get_closest_trading_day(product_data, baseline_date):
     if not available_dates:
         return None
     
+    # 정렬된 날짜에서 기준일 위치를 이분 탐색으로 찾음
+    baseline_day = baseline_date.date()
+    position = bisect_left(available_dates, baseline_day)
+
     # 기준일이 거래 데이터에 있는 경우 그대로 사용
-    if baseline_date.date() in available_dates:
-        return baseline_date.date()
-    
-    # 기준일 이전/이후 데이터 중 가장 가까운 날짜 찾기
-    closest_date = min(available_dates, key=lambda x: abs(x - baseline_date.date()))
+    if position < len(available_dates) and available_dates[position] == baseline_day:
+        return baseline_day
     
-    return closest_date
+    # 기준일 이전/이후 데이터 중 가장 가까운 날짜 찾기 (같은 거리면 이전 날짜)
+    if position == 0:
+        return available_dates[0]
+    if position == len(available_dates):
+        return available_dates[-1]
+
+    before, after = available_dates[position - 1], available_dates[position]
+    return after if after - baseline_day < baseline_day - before else before
 
 def get_adjusted_baseline_price(product_data, baseline_date):
     """
@@ -86,28 +98,222 @@ def get_adjusted_baseline_volume(product_data, baseline_date):
     # 보간법 적용 (앞/뒤 데이터 활용)
     return product_data["total_volume"].interpolate(method="linear").fillna(method="ffill").fillna(method="bfill").mean()
 
+def get_adjusted_baselines(bucket_data, baseline_date, log_columns=("baseline_price", "baseline_volume")):
+    """
+    여러 상품의 기준일(없으면 가장 가까운 거래일, 같은 거리면 이전 날짜) 가격과 거래량을 한 번에 계산합니다.
+    상품마다 get_adjusted_baseline_price, get_adjusted_baseline_volume을 호출한 것과 같은 값을 반환합니다.
+
+    - 상품별로 정렬된 날짜 배열에서 (상품 순위, 날짜) 키로 searchsorted를 한 번 수행하여 모든 상품의 가장 가까운 거래일을 찾고,
+    - 해당 날짜 구간들의 avg_price, total_volume 평균을 기준 가격, 기준 거래량으로 사용합니다.
+
+    Parameters:
+        bucket_data (pandas.DataFrame): 구간별 집계 데이터 (product_id, date_created, avg_price, total_volume)
+        baseline_date (str): 기준 시점
+        log_columns (tuple): 보간 로그를 만들 값 ("baseline_price", "baseline_volume" 중 선택, 빈 튜플이면 로그 없음)
+
+    Returns:
+        (baselines, logs)
+        - baselines: product_id 인덱스, closest_date, baseline_price, baseline_volume 컬럼의 DataFrame
+        - logs: interpolation_logs와 같은 형식의 보간 기록 목록, 가장 가까운 거래일이 기준일과 다른 상품만 (호출한 쪽에서 interpolation_logs에 추가)
+    """
+    date_created = bucket_data["date_created"]
+    if not pd.api.types.is_datetime64_any_dtype(date_created):
+        date_created = pd.to_datetime(date_created)
+    # dt.date와 같이 각 시각이 속한 시간대의 날짜를 사용
+    if date_created.dt.tz is not None:
+        date_created = date_created.dt.tz_localize(None)
+
+    baseline_day = pd.Timestamp(baseline_date)
+    if baseline_day.tz is not None:
+        baseline_day = baseline_day.tz_localize(None)
+    baseline_day = baseline_day.normalize()
+
+    daily = pd.DataFrame({
+        "product_id": bucket_data["product_id"].to_numpy(),
+        "day": date_created.dt.normalize().to_numpy(),
+        "avg_price": bucket_data["avg_price"].to_numpy(dtype=float),
+        "total_volume": bucket_data["total_volume"].to_numpy(dtype=float),
+    }).groupby(["product_id", "day"], sort=True).mean().reset_index()
+
+    if daily.empty:
+        return pd.DataFrame(columns=["closest_date", "baseline_price", "baseline_volume"], index=pd.Index([], name="product_id")), []
+
+    # 상품별 날짜 구간의 시작/끝 위치
+    product_ids = daily["product_id"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, product_ids[1:] != product_ids[:-1]])
+    stops = np.r_[starts[1:], len(daily)]
+
+    # (상품 순위, 일 번호)를 하나의 정수 키로 합쳐 전체 배열에서 한 번에 이분 탐색
+    day_number = daily["day"].to_numpy().astype("datetime64[D]").astype("int64")
+    baseline_number = np.datetime64(baseline_day, "D").astype("int64")
+    base = min(day_number.min(), baseline_number)
+    rank = np.repeat(np.arange(len(starts)), stops - starts)
+    keys = rank * 2**32 + (day_number - base)
+    positions = np.searchsorted(keys, np.arange(len(starts)) * 2**32 + (baseline_number - base))
+
+    # 기준일 이후(같은 날 포함) 가장 가까운 날과 이전 가장 가까운 날 중 가까운 쪽 (같은 거리면 이전 날짜)
+    next_distance = np.where(positions < stops, day_number[np.minimum(positions, len(daily) - 1)] - baseline_number, np.iinfo("int64").max)
+    prev_distance = np.where(positions > starts, baseline_number - day_number[np.maximum(positions - 1, 0)], np.iinfo("int64").max)
+    closest = np.where(next_distance < prev_distance, positions, positions - 1)
+
+    baselines = pd.DataFrame({
+        "closest_date": daily["day"].to_numpy()[closest],
+        "baseline_price": daily["avg_price"].to_numpy()[closest],
+        "baseline_volume": daily["total_volume"].to_numpy()[closest],
+    }, index=pd.Index(product_ids[starts], name="product_id"))
+
+    # 기준일에 거래가 있어 보정하지 않은 상품은 기록하지 않음
+    adjusted = baselines[baselines["closest_date"] != baseline_day]
+    logs = [
+        {
+            "product_id": product_id,
+            "date_created": baseline_date,
+            "column": column,
+            "method": "closest_trading_day",
+            "original_value": None,
+            "new_value": value
+        }
+        for column in log_columns
+        for product_id, value in adjusted[column].items()
+    ]
+
+    return baselines, logs
 
-interpolation_logs = []
 
 # 로그 파일 저장 경로 설정 (python/output 폴더에 저장)
-LOG_DIR = os.path.join("output")  # 로그 파일 저장할 폴더명
-os.makedirs(LOG_DIR, exist_ok=True)  # 폴더가 없으면 생성
+LOG_DIR = os.path.join("output")  # 로그 파일 저장할 폴더명 (저장할 때 생성)
 log_file_path = os.path.join(LOG_DIR, "interpolation_log.csv")
+# 실행마다 별도 파일로 저장할 때의 폴더
+log_segment_dir = os.path.join(LOG_DIR, "interpolation_log")
+
+LOG_COLUMNS = ["product_id", "date_created", "column", "method", "original_value", "new_value"]
+
+class InterpolationLogSink:
+    """
+    보간 기록을 메모리 버퍼에 모았다가 로그 파일 끝에 이어 씁니다. (기존 로그 파일을 다시 읽지 않음)
+
+    - 버퍼에 max_buffer개가 쌓이면 자동으로 flush하고, 프로그램 종료 시에도 남은 기록을 flush합니다.
+    - segment=True면 실행마다 log_segment_dir/<run_id>.csv 파일에 기록합니다.
+    - file_format="parquet"이면 flush마다 log_segment_dir/<run_id>-<번호>.parquet 파일을 만듭니다. (pyarrow 필요)
+    """
 
+    def __init__(self, log_path=log_file_path, max_buffer=10000, segment=False, file_format="csv"):
+        self.log_path = log_path
+        self.max_buffer = max_buffer
+        self.segment = segment or file_format == "parquet"
+        self.file_format = file_format
+        self.run_id = f"{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}-{os.getpid()}"
+        self.buffer = []
+        self.auto_flush = True
+        self.written = 0
+        self._segment_parts = 0
+        self._exit_registered = False
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __iter__(self):
+        return iter(self.buffer)
+
+    def append(self, record):
+        self.buffer.append(record)
+        self._after_add()
+
+    def extend(self, records):
+        self.buffer.extend(records)
+        self._after_add()
+
+    def _after_add(self):
+        if not self._exit_registered:
+            atexit.register(self.flush)
+            self._exit_registered = True
+        if self.auto_flush and len(self.buffer) >= self.max_buffer:
+            self.flush()
+
+    def output_path(self):
+        if not self.segment:
+            return self.log_path
+        if self.file_format == "parquet":
+            return os.path.join(log_segment_dir, f"{self.run_id}-{self._segment_parts}.parquet")
+        return os.path.join(log_segment_dir, f"{self.run_id}.csv")
+
+    def flush(self):
+        """
+        버퍼의 기록을 파일에 추가하고 비웁니다.
+
+        Returns:
+            int: 기록한 건수
+        """
+        if not self.buffer:
+            return 0
+
+        df = pd.DataFrame(self.buffer).reindex(columns=LOG_COLUMNS)
+        path = self.output_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)  # 폴더 없으면 생성
+
+        if self.file_format == "parquet":
+            df.to_parquet(path, index=False)
+            self._segment_parts += 1
+        else:
+            # 파일이 없거나 비어 있을 때만 헤더 작성
+            header = not os.path.exists(path) or os.path.getsize(path) == 0
+            df.to_csv(path, mode="a", header=header, index=False)
+
+        count = len(self.buffer)
+        self.written += count
+        self.buffer = []
+        return count
+
+    @contextmanager
+    def capture(self):
+        """
+        with 블록 안에서 추가된 기록을 파일에 쓰지 않고 별도 목록으로 모읍니다. (프로세스 풀 워커에서 부모로 기록을 돌려줄 때 사용)
+        """
+        buffer, auto_flush = self.buffer, self.auto_flush
+        captured = []
+        self.buffer, self.auto_flush = captured, False
+        try:
+            yield captured
+        finally:
+            self.buffer, self.auto_flush = buffer, auto_flush
+
+interpolation_logs = InterpolationLogSink()
+
+@traced()
 def save_interpolation_log():
     """
-    보간법 사용 내역을 CSV 파일로 저장 (기존 데이터 유지)
+    보간법 사용 내역을 CSV 파일 끝에 추가 (기존 데이터 유지)
     """
-    if interpolation_logs:
-        df = pd.DataFrame(interpolation_logs)
-        os.makedirs("output", exist_ok=True)  # 폴더 없으면 생성
+    interpolation_logs.flush()
 
-        # 기존 파일이 있으면 추가 모드로 저장
-        if os.path.exists(log_file_path):
-            df_existing = pd.read_csv(log_file_path)
-            df = pd.concat([df_existing, df], ignore_index=True)
+    if interpolation_logs.written:
+        print(f"✅ 보간법 사용 내역 {interpolation_logs.written}건이 {interpolation_logs.output_path()} 파일에 저장되었습니다!")
+    else:
+        print("ℹ️ 보간법 사용 내역이 없습니다.")
+
+def count_interpolations(log_path=log_file_path, by=("product_id", "method"), chunksize=100000):
+    """
+    로그 파일(또는 실행별 로그 폴더)에서 필요한 컬럼만 chunk 단위로 읽어 보간 건수를 집계합니다.
+    아직 flush되지 않은 버퍼의 기록은 포함하지 않습니다.
 
-        df.to_csv(log_file_path, index=False)
-        print(f"✅ 보간법 사용 내역이 {log_file_path} 파일에 저장되었습니다!")
+    Returns:
+        pandas.Series: by 컬럼 인덱스별 보간 건수
+    """
+    by = list(by)
+    if os.path.isdir(log_path):
+        paths = sorted(os.path.join(log_path, filename) for filename in os.listdir(log_path) if filename.endswith((".csv", ".parquet")))
     else:
-        print("ℹ️ 보간법 사용 내역이 없습니다.")
\ No newline at end of file
+        paths = [log_path] if os.path.exists(log_path) else []
+
+    counts = pd.Series(dtype="int64", name="count")
+    for path in paths:
+        if path.endswith(".parquet"):
+            chunks = [pd.read_parquet(path, columns=by)]
+        else:
+            chunks = pd.read_csv(path, usecols=by, chunksize=chunksize)
+
+        for chunk in chunks:
+            chunk_counts = chunk.groupby(by).size()
+            counts = chunk_counts if counts.empty else counts.add(chunk_counts, fill_value=0)
+
+    return counts.astype("int64").rename("count")
@@ -0,0 +1,198 @@
+#discount_threshold.py
+#상품별 일별 할인 거래 건수를 유지하면서 할인 거래량 임계값(분위수)을 거래가 들어올 때마다 갱신
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+class _CountQuantile:
+    """
+    일별 할인 거래 건수의 분위수를 구하기 위한 값별 빈도 히스토그램.
+    건수는 정수이므로 메모리는 일 수가 아니라 서로 다른 건수 값의 개수에 비례하며,
+    긴 기간에서도 pandas quantile(선형 보간)과 같은 정확한 값을 반환합니다.
+    """
+
+    def __init__(self):
+        self.frequencies = {}
+        self.values = []
+        self.size = 0
+
+    def add(self, value):
+        if value not in self.frequencies:
+            self.frequencies[value] = 0
+            insort(self.values, value)
+        self.frequencies[value] += 1
+        self.size += 1
+
+    def remove(self, value):
+        self.frequencies[value] -= 1
+        if self.frequencies[value] == 0:
+            del self.frequencies[value]
+            del self.values[bisect_left(self.values, value)]
+        self.size -= 1
+
+    def quantile(self, q):
+        if self.size == 0:
+            return None
+
+        # pandas quantile(interpolation="linear")와 같은 위치의 두 값을 보간
+        position = q * (self.size - 1)
+        lower_rank = int(np.floor(position))
+        upper_rank = int(np.ceil(position))
+
+        lower = upper = None
+        seen = 0
+        for value in self.values:
+            seen += self.frequencies[value]
+            if lower is None and seen > lower_rank:
+                lower = value
+            if seen > upper_rank:
+                upper = value
+                break
+
+        return lower + (upper - lower) * (position - lower_rank)
+
+class DiscountVolumeThreshold:
+    """
+    상품별 할인 거래량 임계값을 유지하는 구조.
+    get_discount_volume_threshold와 같이 기준 가격보다 낮은 가격의 거래를 할인 거래로 보고,
+    할인 거래가 있는 날의 일별 할인 거래 건수 분위수를 임계값으로 사용합니다.
+
+    - 거래를 추가할 때 해당 상품의 임계값만 다시 계산해 두므로 threshold 조회는 O(1)입니다.
+    - window_days를 지정하면 상품별 마지막 거래일(할인 거래가 아닌 거래 포함) 기준 최근 window_days일의 할인 거래만 반영합니다.
+      할인 거래가 아닌 거래만 들어와도 구간이 이동하며, 구간 밖으로 밀려난 날짜에 늦게 도착한 거래는 무시합니다.
+    - 기준 가격이 없거나 0 이하인 상품은 할인 거래를 세지 않아 항상 기본 임계값을 사용합니다.
+    """
+
+    def __init__(self, baseline_prices, quantile=0.5, default_threshold=1, window_days=None):
+        """
+        Parameters:
+            baseline_prices (dict | pandas.Series): 상품 ID → 기준 가격(발매가)
+            quantile (float): 임계값 산출에 사용할 분위수 (기본 0.5는 중앙값)
+            default_threshold (int): 할인 거래가 없을 때의 기본 임계값
+            window_days (int | None): 반영할 최근 일 수 (None이면 전체 기간)
+        """
+        self.baseline_prices = {product_id: float(price) for product_id, price in dict(baseline_prices).items() if pd.notna(price) and price > 0}
+        self.quantile = quantile
+        self.default_threshold = default_threshold
+        self.window_days = window_days
+
+        # 상품 ID → {일 번호: 할인 거래 건수} (일 번호 오름차순)
+        self._daily_counts = {}
+        # 상품 ID → 마지막 거래일 번호 (window_days 구간의 기준)
+        self._last_days = {}
+        self._quantiles = {}
+        self._thresholds = {}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # 마지막 거래일을 저장하지 않던 이전 상태 파일은 마지막 할인 거래일을 기준으로 사용
+        if "_last_days" not in state:
+            self._last_days = {product_id: next(reversed(daily_counts)) for product_id, daily_counts in self._daily_counts.items() if daily_counts}
+
+    def add_trades(self, transactions):
+        """
+        거래 데이터(product_id, price, date_created)를 한 번에 반영합니다.
+        할인 거래를 (상품, 일) 단위로 먼저 센 뒤, 바뀐 상품의 임계값만 다시 계산합니다.
+        """
+        if transactions.empty or not self.baseline_prices:
+            return
+
+        product_ids = transactions["product_id"].to_numpy()
+        days = _day_numbers(transactions["date_created"])
+        baseline_price = transactions["product_id"].map(self.baseline_prices).to_numpy(dtype=float)
+
+        changed = set()
+        if self.window_days is not None:
+            # 할인 여부와 관계없이 상품별 마지막 거래일을 먼저 갱신하고 구간 밖 날짜를 제거
+            known = ~np.isnan(baseline_price)
+            last_days = pd.Series(days[known]).groupby(product_ids[known]).max()
+            for product_id, day in last_days.items():
+                if self._advance(product_id, int(day)):
+                    changed.add(product_id)
+
+        is_discount = transactions["price"].to_numpy(dtype=float) < baseline_price
+        discount_trades = pd.DataFrame({
+            "product_id": product_ids[is_discount],
+            "day": days[is_discount],
+        })
+        counts = discount_trades.groupby(["product_id", "day"], sort=True).size()
+
+        for (product_id, day), count in counts.items():
+            if self._add_count(product_id, int(day), int(count)):
+                changed.add(product_id)
+
+        for product_id in changed:
+            self._refresh(product_id)
+
+    def add_trade(self, product_id, price, date_created):
+        """
+        거래 하나를 반영합니다.
+        """
+        baseline_price = self.baseline_prices.get(product_id)
+        if baseline_price is None:
+            return
+
+        day = int(_day_numbers(pd.Series([date_created]))[0])
+        changed = self.window_days is not None and self._advance(product_id, day)
+        if price < baseline_price and self._add_count(product_id, day, 1):
+            changed = True
+        if changed:
+            self._refresh(product_id)
+
+    def threshold(self, product_id):
+        return self._thresholds.get(product_id, self.default_threshold)
+
+    def thresholds(self, product_ids):
+        return pd.Series([self.threshold(product_id) for product_id in product_ids], index=pd.Index(product_ids, name="product_id"), dtype=float)
+
+    def _add_count(self, product_id, day, count):
+        daily_counts = self._daily_counts.setdefault(product_id, OrderedDict())
+        quantile = self._quantiles.setdefault(product_id, _CountQuantile())
+
+        if self.window_days is not None and day <= self._last_days.get(product_id, day) - self.window_days:
+            return False
+
+        if day in daily_counts:
+            quantile.remove(daily_counts[day])
+            daily_counts[day] += count
+        else:
+            latest_day = next(reversed(daily_counts)) if daily_counts else None
+            daily_counts[day] = count
+            # 늦게 도착한 날짜면 날짜 순서가 유지되도록 다시 정렬 (대부분 최신 날짜가 뒤에 추가됨)
+            if latest_day is not None and day < latest_day:
+                for key in sorted(daily_counts):
+                    daily_counts.move_to_end(key)
+        quantile.add(daily_counts[day])
+        return True
+
+    def _advance(self, product_id, day):
+        """
+        상품의 마지막 거래일을 갱신하고, 구간 밖으로 밀려난 날짜의 할인 거래 건수를 제거합니다.
+        제거한 날짜가 있으면 True를 반환합니다.
+        """
+        last_day = max(self._last_days.get(product_id, day), day)
+        self._last_days[product_id] = last_day
+
+        daily_counts = self._daily_counts.get(product_id)
+        expired_any = False
+        while daily_counts and next(iter(daily_counts)) <= last_day - self.window_days:
+            _, expired = daily_counts.popitem(last=False)
+            self._quantiles[product_id].remove(expired)
+            expired_any = True
+        return expired_any
+
+    def _refresh(self, product_id):
+        threshold = self._quantiles[product_id].quantile(self.quantile)
+        self._thresholds[product_id] = threshold if threshold is not None and threshold > 0 else self.default_threshold
+
+def _day_numbers(date_created):
+    """
+    거래 시각을 dt.date와 같은 날짜의 일 번호(1970-01-01 기준)로 변환합니다.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(date_created):
+        date_created = pd.to_datetime(date_created)
+    if date_created.dt.tz is not None:
+        date_created = date_created.dt.tz_localize(None)
+    return date_created.to_numpy().astype("datetime64[D]").astype("int64")
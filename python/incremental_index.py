@@ -0,0 +1,412 @@
+#incremental_index.py
+#체크포인트(상태 파일)를 이용해 새로 들어온 거래만으로 리셀 시장 지수를 갱신
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_processing import get_adjusted_baselines
+from discount_threshold import DiscountVolumeThreshold
+from resell_index import aggregate_product_daily_data
+from resell_market_index import aggregate_product_4h_data
+from product_catalog import ProductCatalog, load_product_catalog
+from product_matrix import ProductBucketMatrix, fill_within_range
+from resell_utils import compute_resell_index_custom_vectorized
+from stage_trace import traced
+
+# 상태 파일 저장 경로 (python/output 폴더에 저장)
+INDEX_STATE_PATH = os.path.join("output", "index_state.pkl")
+
+# 지수 단위별 구간 크기
+GRANULARITIES = {"24h": "D", "4h": "4h"}
+
+BASELINE_COLUMNS = ["baseline_price", "baseline_volume", "discount_volume_threshold"]
+
+# 이미 반영한 거래를 구분하는 컬럼 (값이 모두 같은 거래가 여러 건이면 건수로 구분)
+TRADE_KEY_COLUMNS = ["product_id", "price", "option", "date_created"]
+
+def create_index_state(product_meta, product_ids, baseline_date, alpha=0.1):
+    """
+    거래가 하나도 반영되지 않은 빈 상태를 생성합니다.
+    이후 update_index_state로 전체 거래를 한 번 반영하면 전체 재계산과 같은 지수가 만들어집니다.
+
+    상태(dict)에는 다음이 저장됩니다.
+    - baselines: 지수 단위별 상품 기준 가격, 기준 거래량, 할인 거래량 임계값
+    - buckets: 지수 단위별 (product_id, 구간) 거래 가격 합계와 거래량
+    - resell_index: 지수 단위별 상품 리셀 지수 (4시간은 결측 구간 보정 및 정규화 후 값)
+    - discount_thresholds: 반영한 거래로 갱신되는 상품별 할인 거래량 임계값 (DiscountVolumeThreshold)
+    - index_base: 정규화 기준값 (24시간은 첫 구간 시장 지수, 4시간은 상품별 첫 구간 지수)
+    - series: 지수 단위별 market_resell_index
+    - ingested: 반영한 거래 키(TRADE_KEY_COLUMNS 해시)별 건수 (select_new_transactions에서 사용)
+    - last_processed: 마지막으로 반영한 거래 시각
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    product_meta = ProductCatalog.from_meta(product_meta).subset(product_ids)
+
+    return {
+        "baseline_date": baseline_date,
+        "alpha": alpha,
+        "product_ids": product_ids,
+        "product_meta": product_meta,
+        "baselines": {
+            granularity: pd.DataFrame(columns=BASELINE_COLUMNS, index=pd.Index([], name="product_id"), dtype=float)
+            for granularity in GRANULARITIES
+        },
+        "buckets": {
+            granularity: pd.DataFrame({"product_id": pd.Series(dtype="int64"), "date_created": pd.Series(dtype="object"), "price_sum": pd.Series(dtype=float), "total_volume": pd.Series(dtype="int64")})
+            for granularity in GRANULARITIES
+        },
+        "resell_index": {
+            granularity: pd.DataFrame({"product_id": pd.Series(dtype="int64"), "date_created": pd.Series(dtype="object"), "resell_index": pd.Series(dtype=float)})
+            for granularity in GRANULARITIES
+        },
+        "discount_thresholds": DiscountVolumeThreshold(dict(zip(product_meta.product_ids.tolist(), product_meta.original_prices))),
+        "index_base": {"24h": None, "4h": {}},
+        "series": {
+            granularity: pd.DataFrame(columns=["date_created", "market_resell_index"])
+            for granularity in GRANULARITIES
+        },
+        "ingested": pd.Series(dtype="int64", index=pd.Index([], dtype="uint64")),
+        "last_processed": None,
+    }
+
+def build_index_state(transactions, product_meta, product_ids, baseline_date, alpha=0.1):
+    """
+    전체 거래 데이터로 상태를 초기화합니다.
+    """
+    state = create_index_state(product_meta, product_ids, baseline_date, alpha)
+    update_index_state(state, transactions)
+    return state
+
+def select_new_transactions(transactions, state):
+    """
+    아직 반영하지 않은 거래만 골라냅니다.
+
+    거래 시각이 아니라 반영한 거래 키(state["ingested"])로 판단하므로,
+    체크포인트(last_processed) 이전 시각으로 늦게 도착한 거래나 체크포인트와 같은 시각의 거래도 선택됩니다.
+    값이 모두 같은 거래가 여러 건이면 이미 반영한 건수를 넘는 만큼만 선택합니다.
+    """
+    keys = _trade_keys(transactions)
+    if "ingested" not in state:
+        # 거래 키가 없는 이전 상태 파일은 체크포인트 시각까지의 거래를 반영한 것으로 보고 키를 만듦
+        processed = _to_datetime(transactions["date_created"]) <= state["last_processed"] if state["last_processed"] is not None else np.zeros(len(transactions), dtype=bool)
+        state["ingested"] = _count_keys(keys[np.asarray(processed)])
+
+    # 같은 키 안에서의 순번이 이미 반영한 건수 이상인 거래만 새 거래
+    occurrence = pd.Series(keys).groupby(keys).cumcount().to_numpy()
+    ingested = state["ingested"].reindex(keys, fill_value=0).to_numpy()
+    return transactions[occurrence >= ingested]
+
+@traced()
+def update_index_state(state, new_transactions):
+    """
+    새로 들어온 거래만 집계하여 상태를 갱신하고, 값이 바뀌거나 새로 생긴 구간의 시장 지수를 반환합니다.
+    체크포인트 이전 시각의 거래(늦게 도착한 거래)는 해당 거래가 영향을 주는 구간만 다시 계산합니다.
+
+    - 기준 가격과 기준 거래량은 상품의 첫 거래일(기준 구간)로 정해지므로, 새 거래가 첫 거래일 또는 그 이전에 들어온 상품은
+      누적된 구간 통계로 기준값을 다시 구하고 전체 구간을 다시 계산합니다. (기준일 도중에 상태를 만든 경우 포함)
+    - 4시간 지수의 상품별 정규화 기준값(첫 구간 지수)은 상품을 다시 계산할 때마다 새로 구합니다.
+    - 기준일이 바뀌면 build_index_state로 상태를 새로 만들어야 합니다.
+    - 24시간 시장 지수의 정규화 기준값(첫 구간 값)은 갱신마다 다시 구하며, 바뀌면 전체 구간을 다시 반환합니다.
+    - 할인 거래량 임계값은 지금까지 반영한 모든 거래로 계속 갱신되며, 임계값이 바뀐 상품은 전체 구간을 다시 계산합니다.
+    - new_transactions에는 이미 반영한 거래가 다시 포함되지 않아야 합니다. (select_new_transactions로 골라냄)
+
+    Parameters:
+        state (dict): create_index_state 또는 load_index_state로 얻은 상태 (제자리에서 갱신)
+        new_transactions (pandas.DataFrame): 새로 들어온 거래 데이터
+
+    Returns:
+        dict: {"24h": DataFrame, "4h": DataFrame} 다시 계산된 구간의 ["date_created", "market_resell_index"]
+    """
+    date_created = _to_datetime(new_transactions["date_created"])
+    mask = new_transactions["product_id"].isin(state["product_ids"]) & (date_created >= state["baseline_date"])
+
+    trades = pd.DataFrame({
+        "product_id": new_transactions["product_id"][mask].reset_index(drop=True),
+        "price": new_transactions["price"][mask].reset_index(drop=True),
+        "date_created": date_created[mask].reset_index(drop=True),
+    })
+
+    if "discount_thresholds" in state:
+        state["discount_thresholds"].add_trades(trades)
+
+    emitted = {}
+    for granularity in GRANULARITIES:
+        emitted[granularity] = _update_granularity(state, trades, granularity)
+
+    # 기준일 이전, 지수에 포함되지 않는 상품의 거래도 다시 선택되지 않도록 모두 반영한 것으로 기록
+    if "ingested" in state and len(new_transactions):
+        state["ingested"] = state["ingested"].add(_count_keys(_trade_keys(new_transactions)), fill_value=0).astype("int64")
+
+    if not trades.empty:
+        latest = trades["date_created"].max()
+        if state["last_processed"] is None or latest > state["last_processed"]:
+            state["last_processed"] = latest
+
+    return emitted
+
+def save_index_state(state, state_path=INDEX_STATE_PATH):
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    tmp_path = state_path + ".tmp"
+    pd.to_pickle(state, tmp_path)
+    os.replace(tmp_path, state_path)
+
+def load_index_state(state_path=INDEX_STATE_PATH):
+    if not os.path.exists(state_path):
+        return None
+    return pd.read_pickle(state_path)
+
+def _to_datetime(date_created):
+    if pd.api.types.is_datetime64_any_dtype(date_created):
+        return date_created
+    return pd.to_datetime(date_created)
+
+def _trade_keys(transactions):
+    """
+    거래마다 TRADE_KEY_COLUMNS 값의 해시(uint64)를 반환합니다.
+    문자열 시각과 datetime, category와 문자열 옵션이 같은 키가 되도록 타입을 맞춘 뒤 해시합니다.
+    """
+    date_created = _to_datetime(transactions["date_created"])
+    if date_created.dt.tz is not None:
+        date_created = date_created.dt.tz_convert("UTC").dt.tz_localize(None)
+
+    columns = pd.DataFrame({
+        "product_id": transactions["product_id"].to_numpy(dtype="int64"),
+        "price": transactions["price"].to_numpy(dtype="int64"),
+        "option": transactions["option"].astype(str).to_numpy() if "option" in transactions.columns else "",
+        "date_created": date_created.to_numpy(),
+    }, columns=TRADE_KEY_COLUMNS)
+    return pd.util.hash_pandas_object(columns, index=False).to_numpy()
+
+def _count_keys(keys):
+    return pd.Series(keys).value_counts(sort=False).astype("int64")
+
+def _to_bucket(date_created, granularity):
+    bucket = date_created.dt.floor(GRANULARITIES[granularity])
+    # 24시간 지수는 calculate_resell_market_index와 같이 시간대 없는 날짜를 사용
+    if granularity == "24h" and bucket.dt.tz is not None:
+        bucket = bucket.dt.tz_localize(None)
+    return bucket
+
+def _update_baselines(state, trades, granularity):
+    """
+    처음 반영되는 상품의 기준값을 전체 재계산과 같은 방식으로 산출합니다.
+    """
+    baselines = state["baselines"][granularity]
+    new_product_ids = [product_id for product_id in trades["product_id"].unique() if product_id not in baselines.index]
+    if not new_product_ids:
+        return
+
+    new_trades = trades[trades["product_id"].isin(new_product_ids)]
+    if granularity == "24h":
+        aggregated = aggregate_product_daily_data(new_trades, state["product_meta"], new_product_ids, state["baseline_date"])
+    else:
+        aggregated = aggregate_product_4h_data(new_trades, state["product_meta"], new_product_ids, state["baseline_date"])
+
+    new_baselines = aggregated.drop_duplicates("product_id").set_index("product_id")[BASELINE_COLUMNS].astype(float)
+    state["baselines"][granularity] = pd.concat([baselines, new_baselines]) if not baselines.empty else new_baselines
+
+def _rebase_baselines(state, product_ids, granularity):
+    """
+    첫 거래일에 거래가 추가된 상품의 기준 거래량과 보정 기준 가격을 누적된 구간 통계로 다시 구합니다.
+    전체 재계산(aggregate_product_daily_data, aggregate_product_4h_data)과 같은 값을 사용합니다.
+
+    - 24시간: 기준 거래량은 가장 가까운 거래일(첫 거래일)의 거래량, 발매가가 없는 상품의 기준 가격은 고정값(10)이므로 그대로
+    - 4시간: 기준 거래량은 첫 4시간 구간의 거래량, 발매가가 없는 상품의 기준 가격은 첫 거래일 구간 평균 가격들의 평균
+    """
+    baselines = state["baselines"][granularity]
+    buckets = state["buckets"][granularity]
+    buckets = buckets[buckets["product_id"].isin(product_ids)].sort_values(["product_id", "date_created"], kind="stable")
+    bucket_data = buckets.assign(avg_price=buckets["price_sum"] / buckets["total_volume"])
+    adjusted = get_adjusted_baselines(bucket_data, state["baseline_date"], log_columns=())[0]
+
+    if granularity == "24h":
+        baselines.loc[adjusted.index, "baseline_volume"] = adjusted["baseline_volume"].astype(float)
+        return
+
+    first = bucket_data.drop_duplicates("product_id").set_index("product_id")
+    baselines.loc[first.index, "baseline_volume"] = first["total_volume"].astype(float)
+
+    original_price = pd.Series(state["product_meta"].lookup_original_price(first.index.to_numpy()), index=first.index)
+    missing_price = original_price.index[original_price.isna() | (original_price == 0)]
+    baselines.loc[missing_price, "baseline_price"] = adjusted.loc[missing_price, "baseline_price"].astype(float)
+
+def _discount_volume_threshold(state, baseline, product_id):
+    # 할인 거래량 임계값 구조가 없는 이전 상태 파일은 처음 반영할 때 고정한 임계값 사용
+    if "discount_thresholds" not in state:
+        return baseline["discount_volume_threshold"]
+    return state["discount_thresholds"].threshold(product_id)
+
+def _compute_products_resell_index(state, buckets, product_ids, granularity):
+    """
+    상품들의 구간별 거래 통계로 리셀 지수를 한 번에 계산합니다.
+    4시간 지수는 calculate_resell_market_index_4h와 같이 상품 × 구간 행렬에서 결측 구간을 앞/뒤 값으로 보정하고 첫 구간 기준으로 정규화합니다.
+
+    Returns:
+        pandas.DataFrame: product_id, date_created, resell_index (product_ids 순서, 상품 내에서는 시간 오름차순)
+    """
+    baselines = state["baselines"][granularity]
+    thresholds = np.array([_discount_volume_threshold(state, baselines.loc[product_id], product_id) for product_id in product_ids], dtype=float)
+    thresholds = pd.Series(thresholds, index=pd.Index(product_ids))
+
+    if granularity == "24h":
+        buckets = buckets.sort_values(["product_id", "date_created"], kind="stable")
+        product_column = buckets["product_id"]
+        total_volume = buckets["total_volume"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg_price = buckets["price_sum"].to_numpy(dtype=float) / total_volume
+
+        resell_index = compute_resell_index_custom_vectorized(
+            avg_price,
+            total_volume,
+            product_column.map(baselines["baseline_price"]).to_numpy(dtype=float),
+            product_column.map(baselines["baseline_volume"]).to_numpy(dtype=float),
+            state["alpha"],
+            product_column.map(thresholds).to_numpy(dtype=float)
+        )
+        resell_index[np.isinf(resell_index)] = np.nan
+        updated = pd.DataFrame({
+            "product_id": product_column.to_numpy(),
+            "date_created": buckets["date_created"].to_numpy(),
+            "resell_index": resell_index,
+        })
+    else:
+        # 상품별 첫 구간~마지막 구간의 모든 구간을 행렬로 펼침 (거래 없는 구간은 거래량 0)
+        matrix = ProductBucketMatrix.from_long(buckets["product_id"].to_numpy(), buckets["date_created"], freq=GRANULARITIES[granularity])
+        in_range = matrix.in_range()
+        total_volume = np.where(in_range, matrix.scatter(buckets["total_volume"].to_numpy(dtype=float), fill_value=0), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg_price = matrix.scatter(buckets["price_sum"].to_numpy(dtype=float)) / total_volume
+
+        product_baselines = baselines.loc[matrix.products]
+        resell_index = compute_resell_index_custom_vectorized(
+            avg_price,
+            total_volume,
+            product_baselines["baseline_price"].to_numpy(dtype=float)[:, None],
+            product_baselines["baseline_volume"].to_numpy(dtype=float)[:, None],
+            state["alpha"],
+            thresholds.reindex(matrix.products).to_numpy(dtype=float)[:, None]
+        )
+        resell_index[np.isinf(resell_index)] = np.nan
+        resell_index = fill_within_range(resell_index, in_range)
+
+        # 첫 구간 지수를 기준으로 정규화 (첫 구간이나 기준값이 바뀌면 기준값도 바뀜)
+        index_base = state["index_base"]["4h"]
+        first_values = resell_index[np.arange(len(matrix.products)), matrix.first]
+        for product_id, base_value in zip(matrix.products.tolist(), first_values.tolist()):
+            index_base[product_id] = 100 if pd.isna(base_value) else base_value
+        base_values = np.array([index_base[product_id] for product_id in matrix.products.tolist()], dtype=float)
+        resell_index = resell_index / base_values[:, None] * 100
+
+        rows, columns = matrix.range_cells()
+        updated = pd.DataFrame({
+            "product_id": matrix.products[rows],
+            "date_created": matrix.buckets[columns],
+            "resell_index": resell_index[rows, columns],
+        })
+
+    # product_ids 순서대로 정렬 (상품 내에서는 시간 오름차순)
+    order = {product_id: position for position, product_id in enumerate(product_ids)}
+    return updated.iloc[updated["product_id"].map(order).argsort(kind="stable")].reset_index(drop=True)
+
+def _update_granularity(state, trades, granularity):
+    empty = pd.DataFrame(columns=["date_created", "market_resell_index"])
+    if trades.empty:
+        return empty
+
+    _update_baselines(state, trades, granularity)
+
+    # 새 거래를 (product_id, 구간) 단위로 집계하여 기존 통계에 더함
+    trades = trades.assign(date_created=_to_bucket(trades["date_created"], granularity))
+    new_buckets = trades.groupby(["product_id", "date_created"]).agg(
+        price_sum=("price", "sum"),
+        total_volume=("price", "count")
+    )
+    # 이미 반영된 상품 중 새 거래가 첫 거래일 또는 그 이전에 들어온 상품은 기준값을 다시 구함
+    rebased_product_ids = []
+    if not state["buckets"][granularity].empty:
+        first_days = state["buckets"][granularity].groupby("product_id")["date_created"].min().dt.floor("D")
+        new_first_days = trades.groupby("product_id")["date_created"].min().dt.floor("D")
+        known = new_first_days.index.intersection(first_days.index)
+        rebased_product_ids = known[new_first_days[known] <= first_days[known]].tolist()
+
+    buckets = state["buckets"][granularity].set_index(["product_id", "date_created"])
+    buckets = buckets.add(new_buckets, fill_value=0) if not buckets.empty else new_buckets.astype({"price_sum": float})
+    buckets = buckets.reset_index()
+    state["buckets"][granularity] = buckets
+
+    if rebased_product_ids:
+        _rebase_baselines(state, rebased_product_ids, granularity)
+
+    # 새 거래가 있는 상품의 지수만 다시 계산하고, 값이 바뀐 구간을 찾음
+    product_index = state["resell_index"][granularity]
+    affected_product_ids = new_buckets.index.get_level_values("product_id").unique()
+
+    updated = _compute_products_resell_index(state, buckets[buckets["product_id"].isin(affected_product_ids)], affected_product_ids.tolist(), granularity)
+
+    previous = product_index[product_index["product_id"].isin(affected_product_ids)]
+    compared = updated.merge(previous, on=["product_id", "date_created"], how="left", suffixes=("", "_previous"))
+    changed = ~np.isclose(compared["resell_index"], compared["resell_index_previous"], rtol=0, atol=0, equal_nan=True)
+    changed |= compared["resell_index_previous"].isna() & compared["resell_index"].notna()
+    affected_buckets = set(compared.loc[changed, "date_created"])
+
+    unchanged = product_index[~product_index["product_id"].isin(affected_product_ids)]
+    product_index = pd.concat([unchanged, updated], ignore_index=True) if not unchanged.empty else updated.reset_index(drop=True)
+    state["resell_index"][granularity] = product_index
+
+    # 시장 지수 구간 범위가 늘어난 경우 새 구간도 다시 계산
+    series = state["series"][granularity].set_index("date_created")["market_resell_index"]
+    if granularity == "4h":
+        intervals = pd.date_range(product_index["date_created"].min(), product_index["date_created"].max(), freq=GRANULARITIES[granularity])
+        affected_buckets |= set(intervals.difference(series.index))
+
+    if granularity == "24h":
+        # 첫 구간의 시장 지수가 100이 되도록 정규화하는 기준값
+        # 할인 거래량 임계값 갱신이나 늦게 도착한 거래로 첫 구간 값이 바뀌면 기준값을 다시 구하고 전체 구간을 다시 계산
+        # (시장 지수와 같은 groupby 평균을 사용해야 첫 구간 값이 정확히 100이 됨)
+        first_index = product_index[product_index["date_created"] == product_index["date_created"].min()]
+        base_value = first_index.groupby("date_created")["resell_index"].mean().iloc[0]
+        base_value = 100 if pd.isna(base_value) else base_value
+        if base_value != state["index_base"]["24h"]:
+            state["index_base"]["24h"] = base_value
+            affected_buckets = set(product_index["date_created"])
+
+    if not affected_buckets:
+        return empty
+
+    # 영향받은 구간의 시장 지수 재계산 (상품 리셀 지수의 평균)
+    affected_buckets = sorted(affected_buckets)
+    affected_index = product_index[product_index["date_created"].isin(affected_buckets)]
+    market = affected_index.groupby("date_created")["resell_index"].mean().reindex(affected_buckets)
+
+    if granularity == "24h":
+        market = market / state["index_base"]["24h"] * 100
+    else:
+        # 상품 데이터가 없는 구간의 시장 지수는 0
+        market[~market.index.isin(affected_index["date_created"])] = 0
+
+    series = market.combine_first(series) if not series.empty else market
+    state["series"][granularity] = pd.DataFrame({"date_created": series.index, "market_resell_index": series.to_numpy()})
+
+    return pd.DataFrame({"date_created": market.index, "market_resell_index": market.to_numpy()})
+
+if __name__ == "__main__":
+    from utils import load_transaction_data
+
+    baseline_date = "2025-01-15T00:00:00Z"
+
+    transactions = load_transaction_data()
+    state = load_index_state()
+
+    if state is None:
+        product_meta = load_product_catalog()
+        state = build_index_state(transactions, product_meta, product_meta.product_ids.tolist(), baseline_date)
+        print("✅ 전체 거래 데이터로 지수 상태를 생성했습니다.")
+    else:
+        emitted = update_index_state(state, select_new_transactions(transactions, state))
+        for granularity, rows in emitted.items():
+            print(f"\n갱신된 리셀 시장 지수 ({granularity}):")
+            print(rows)
+
+    save_index_state(state)
+    print(f"✅ 지수 상태가 {INDEX_STATE_PATH} 파일에 저장되었습니다! (last_processed: {state['last_processed']})")
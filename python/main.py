@@ -1,13 +1,20 @@
+import argparse
 import os
 import random
 import time
 
 import pandas as pd
 
-from resell_market_index import calculate_resell_market_index, calculate_resell_market_index_4h
+from resell_market_index import calculate_resell_market_index, calculate_resell_market_index_4h, calculate_resell_market_index_for_alphas, rebase_market_index, WEIGHTINGS
 from data_processing import save_interpolation_log
-from visualization import plot_resell_index, plot_premium_with_resell_index, plot_resell_index_for_alpha
-from utils import load_transaction_data, save_txt
+from visualization import plot_resell_index, plot_premium_with_resell_index, plot_resell_index_for_alpha, export_single_resell_indexes
+from resell_index import calculate_products_resell_index
+from utils import load_transaction_data_window, save_txt
+from stage_trace import enable_tracing, trace_stage
+from transaction_store import read_only_frame
+from product_catalog import load_product_catalog
+from chart_queue import ChartQueue
+from constituents import ConstituentSelector, calculate_rebalanced_market_index
 
 # javascript/output 폴더 경로 설정
 DATA_PATH = os.path.join("..", "source")
@@ -17,33 +24,29 @@ endline_date    = "2025-02-15T00:00:00Z"
 
 start_time = time.time()
 
-def main():
-    # product_meta_data.csv에서 상품 ID 리스트 불러오기
-    product_meta_path = os.path.join(DATA_PATH, "meta", "product_meta_data.csv")
-    product_meta = pd.read_csv(product_meta_path)
+def main(export_products=False, rebase_dates=None, rebalance=None, weighting="mean"):
+    # product_meta_data.csv에서 상품 색인 불러오기
+    product_meta = load_product_catalog()
     # 전체 상품 목록에서 상품 ID만 리스트로 추출
-    product_ids = product_meta["product_id"].unique().tolist()
+    product_ids = product_meta.product_ids.tolist()
 
-    # 모든 거래 데이터 불러오기
-    transactions = load_transaction_data()
-    # ✅ 거래 데이터와 product_meta 병합 (발매가 추가)
-    #transactions["date_created"] = pd.to_datetime(transactions["date_created"])
-    transactions = transactions.merge(product_meta[["product_id", "original_price"]], on="product_id", how="left")
+    # 그래프는 프로세스 풀에서 그리고, 지수 계산은 기다리지 않고 계속 진행
+    charts = ChartQueue()
 
-    # 기준일 ~ endline_date 이간 데이터만 사용
-    transactions = transactions[transactions["date_created"] >= baseline_date]
-    transactions = transactions[transactions["date_created"] < endline_date]
+    # 기준일 ~ endline_date 기간의 거래 데이터만 compact 스키마로 읽으면서 불러오기
+    # 발매가는 행마다 붙이지 않고 각 단계에서 product_meta.lookup_original_price로 조회
+    # 모든 단계가 복사 없이 같은 거래 데이터를 읽도록 읽기 전용으로 공유 (수정하려는 단계는 ValueError)
+    transactions = read_only_frame(load_transaction_data_window(baseline_date, endline_date, product_ids, compact=True))
 
-    [_, market_data] = calculate_resell_market_index(transactions, product_meta, product_ids, baseline_date)
+    # 상품별 일별 거래량 행렬 (전체 상품의 리셀 지수를 계산하지 않고 편입 상품 선정)
+    selector = ConstituentSelector.from_transactions(transactions, product_ids)
 
-    filtered_data = market_data[market_data["date_created"] == baseline_date.split("T")[0]]
-    sorted_data = filtered_data.sort_values(by="total_volume", ascending=False).head(25)
-
-    # 지수에 사용될 상품 id 목록
-    sorted_product_ids = sorted_data["product_id"].tolist()
+    # 지수에 사용될 상품 id 목록 (기준일 거래량 상위 25개)
+    sorted_product_ids = selector.select(baseline_date, k=25)
 
     # 지수에 편입되지 않은 상품 id 목록
-    non_transfer_product_ids = [id for id in product_ids if id not in sorted_product_ids]
+    transfer_product_ids = set(sorted_product_ids)
+    non_transfer_product_ids = [id for id in product_ids if id not in transfer_product_ids]
 
     # 지수에 사용될 상품 목록 출력
     print(sorted_product_ids)
@@ -57,11 +60,26 @@ def main():
     # save_txt(product_id_raw, f"{product_id_path}/products.txt")
 
     # 24시간 간격 리셀 시장 지수 계산
-    [market_resell_index_24h, _] = calculate_resell_market_index(transactions, product_meta, sorted_product_ids, baseline_date)
+    [market_resell_index_24h, _] = calculate_resell_market_index(transactions, product_meta, sorted_product_ids, baseline_date, weighting=weighting)
     print("\n리셀 시장 지수 (24시간 간격):")
     print(market_resell_index_24h)
 
-    plot_resell_index(
+    # 다른 기준일로 다시 정규화한 지수 (지수를 다시 계산하지 않음)
+    if rebase_dates:
+        for rebase_date, rebased_index in rebase_market_index(market_resell_index_24h, rebase_dates):
+            print(f"\n리셀 시장 지수 (24시간 간격, 기준일 {rebase_date}):")
+            print(rebased_index)
+
+    # 주기적으로 편입 상품을 다시 선정한 지수 (재선정 날짜에 제수를 조정하여 지수 연속성 유지)
+    if rebalance:
+        products_resell_index = calculate_products_resell_index(transactions, product_meta, product_ids, baseline_date, 0.1)
+        rebalance_dates = selector.schedule(baseline_date, endline_date, rebalance)
+        [rebalanced_index, constituents] = calculate_rebalanced_market_index(products_resell_index, selector, rebalance_dates, k=25)
+        print(f"\n리셀 시장 지수 (24시간 간격, {rebalance} 리밸런싱 {len(constituents)}회):")
+        print(rebalanced_index)
+
+    charts.submit(
+        plot_resell_index,
         market_resell_index_24h,
         "resell_index", 
         title="Resell Market Index (24h) - 0115~0215", 
@@ -70,11 +88,12 @@ def main():
     )
 
     # 4시간 간격 리셀 시장 지수 계산
-    market_resell_index_4h = calculate_resell_market_index_4h(transactions, product_meta, sorted_product_ids, baseline_date)
+    market_resell_index_4h = calculate_resell_market_index_4h(transactions, product_meta, sorted_product_ids, baseline_date, weighting=weighting)
     print("\n리셀 시장 지수 (4시간 간격):")
     print(market_resell_index_4h)
 
-    plot_resell_index(
+    charts.submit(
+        plot_resell_index,
         market_resell_index_4h,
         "resell_index",
         title="Resell Market Index (4h) - 0115~0215", 
@@ -82,34 +101,21 @@ def main():
         # show=True
     )
 
-    # alpha값에 따라 resell index 데이터 만들기 (4시간 간격)
-    resell_index_data_with_alpha_4h = []
-    resell_index_data_with_alpha_24h = []
-
-    for i in range(0, 11, 2):
-        alpha = i / 10
-
-        resell_alpha_df_4h = calculate_resell_market_index_4h(
-                transactions, 
-                product_meta, 
-                product_ids, 
-                baseline_date, 
-                alpha
-            )
-        
-        [resell_alpha_df_24h, _] = calculate_resell_market_index(
-                transactions, 
-                product_meta, 
-                product_ids, 
-                baseline_date, 
-                alpha
-            )
-
-
-        resell_index_data_with_alpha_4h.append([alpha, resell_alpha_df_4h])
-        resell_index_data_with_alpha_24h.append([alpha, resell_alpha_df_24h])
+    # alpha값에 따라 resell index 데이터 만들기 (24시간, 4시간 간격)
+    # α와 무관한 집계는 한 번만 수행하고 모든 α를 함께 계산
+    alphas = [i / 10 for i in range(0, 11, 2)]
+
+    [resell_index_data_with_alpha_24h, resell_index_data_with_alpha_4h] = calculate_resell_market_index_for_alphas(
+            transactions, 
+            product_meta, 
+            product_ids, 
+            baseline_date, 
+            alphas,
+            weighting=weighting
+        )
     
-    plot_resell_index_for_alpha(
+    charts.submit(
+        plot_resell_index_for_alpha,
         resell_index_data_with_alpha_4h,
         "alpha",
         title="Resell Market Index (4h) - 0115~0215", 
@@ -117,7 +123,8 @@ def main():
         # show=True
     )
 
-    plot_resell_index_for_alpha(
+    charts.submit(
+        plot_resell_index_for_alpha,
         resell_index_data_with_alpha_24h,
         "alpha",
         title="Resell Market Index (24h) - 0115~0215", 
@@ -163,26 +170,15 @@ def main():
     premium_data = []
     # 지수에 편입되지 않은 상품들
     for product_id in random.sample(non_transfer_product_ids, k = sample_size):
-        data = pd.read_csv(f"{DATA_PATH}/all-trading/{product_id}.csv")
-
-        original_price = product_meta[product_meta["product_id"] == product_id]["original_price"].values[0]
-        data["normalized_premium"] = (data["price"] - original_price) / original_price * 100
-
-        data["name"] = product_meta[product_meta["product_id"] == product_id]["name"].values[0]
-
-        if data["name"].empty:
-            data["name"] = "Unknown"
-
-        data["date_created"] = pd.to_datetime(data["date_created"])
-
-        # baseline_date ~ endline_date 데이터만 선택
-        data = data[data["date_created"] >= baseline_date]
-        data = data[data["date_created"] < endline_date]
+        with trace_stage("premium_sample", product_id=product_id) as stage:
+            data = load_premium_sample(product_meta, product_id)
+            stage.set_rows_out(len(data))
 
         premium_data.append(data)
 
     # 리셀 시장 지수와 상품별 리셀 가격 타임시리즈 그래프 그리기
-    plot_premium_with_resell_index(
+    charts.submit(
+        plot_premium_with_resell_index,
         market_resell_index_4h,
         premium_data,
         output_dir="merged",
@@ -190,7 +186,8 @@ def main():
         # save=True,
         # show=True
     )
-    plot_premium_with_resell_index(
+    charts.submit(
+        plot_premium_with_resell_index,
         market_resell_index_24h,
         premium_data,
         output_dir="merged",
@@ -199,7 +196,51 @@ def main():
         # show=True
     )
 
+    # 전체 상품의 리셀 지수 그래프 저장 (데이터가 바뀐 상품만 다시 그림)
+    if export_products:
+        products_resell_index = calculate_products_resell_index(transactions, product_meta, product_ids, baseline_date, 0.1)
+        export_single_resell_indexes(products_resell_index, "products", product_meta, pdf=True)
+
+    # 예약된 그래프 저장이 모두 끝날 때까지 대기
+    charts.join()
+
     print(f"execution time: {time.time() - start_time}")
 
+def load_premium_sample(product_meta, product_id):
+    """
+    지수에 편입되지 않은 상품의 거래 데이터를 읽어 발매가 대비 프리미엄(%)을 계산합니다.
+    """
+    data = pd.read_csv(f"{DATA_PATH}/all-trading/{product_id}.csv")
+
+    original_price = product_meta.get_original_price(product_id)
+    data["normalized_premium"] = (data["price"] - original_price) / original_price * 100
+
+    data["name"] = product_meta.get_name(product_id, "Unknown")
+
+    data["date_created"] = pd.to_datetime(data["date_created"])
+
+    # baseline_date ~ endline_date 데이터만 선택
+    data = data[data["date_created"] >= baseline_date]
+    data = data[data["date_created"] < endline_date]
+
+    return data
+
 if __name__ == "__main__":
-	main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="리셀 시장 지수 계산")
+    parser.add_argument("--trace", nargs="?", const="", default=None, metavar="PATH", help="단계별 실행 기록을 JSON trace 파일로 저장 (경로 생략 시 output/trace)")
+    parser.add_argument("--profile", metavar="STAGE", help="지정한 단계에 cProfile 적용 (--trace와 함께 사용)")
+    parser.add_argument("--baseline-date", default=baseline_date, help="지수 기준일 (기본값 %(default)s)")
+    parser.add_argument("--endline-date", default=endline_date, help="거래 데이터 종료일 (기본값 %(default)s)")
+    parser.add_argument("--rebase", nargs="+", metavar="DATE", help="24시간 지수를 추가로 다시 정규화할 기준일 목록")
+    parser.add_argument("--rebalance", metavar="FREQ", help="편입 상품 재선정 주기 (W: 매주, M: 매월)로 계산한 24시간 지수 출력")
+    parser.add_argument("--weighting", default="mean", choices=WEIGHTINGS, help="상품 지수를 시장 지수로 묶는 방식 (기본값 %(default)s)")
+    parser.add_argument("--export-products", action="store_true", help="전체 상품의 리셀 지수 그래프와 CSV를 output/products에 저장")
+    args = parser.parse_args()
+
+    baseline_date = args.baseline_date
+    endline_date = args.endline_date
+
+    if args.trace is not None:
+        enable_tracing(args.trace or None, args.profile)
+
+    main(export_products=args.export_products, rebase_dates=args.rebase, rebalance=args.rebalance, weighting=args.weighting)
\ No newline at end of file
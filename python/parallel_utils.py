@@ -0,0 +1,121 @@
+#parallel_utils.py
+#상품별 계산을 프로세스 풀로 나누어 실행하기 위한 공유 메모리 도구
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import data_processing
+
+def share_product_columns(transactions, columns):
+    """
+    거래 데이터를 product_id 기준으로 (안정) 정렬하여 공유 메모리에 올립니다.
+    워커에는 전체 DataFrame 대신 공유 메모리 이름과 상품별 행 범위만 전달합니다.
+
+    Returns:
+        (handle, spans, blocks)
+        - handle: 워커에서 attach_product_columns로 열 수 있는 공유 메모리 정보
+        - spans: {product_id: (start, stop)} 정렬된 배열에서 상품별 행 범위
+        - blocks: 부모 프로세스가 작업 후 release_blocks로 해제해야 하는 SharedMemory 목록
+    """
+    product_ids = transactions["product_id"].to_numpy()
+    order = np.argsort(product_ids, kind="stable")
+    sorted_product_ids = product_ids[order]
+
+    unique_ids, starts = np.unique(sorted_product_ids, return_index=True)
+    stops = np.append(starts[1:], len(sorted_product_ids))
+    spans = {product_id: (int(start), int(stop)) for product_id, start, stop in zip(unique_ids.tolist(), starts, stops)}
+
+    handle = {"length": len(order), "columns": {}}
+    blocks = []
+    try:
+        for column in columns:
+            series = transactions[column]
+            tz = None
+            if isinstance(series.dtype, pd.DatetimeTZDtype):
+                tz = str(series.dtype.tz)
+                values = series.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()
+            else:
+                values = series.to_numpy()
+            values = np.ascontiguousarray(values[order])
+
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+            handle["columns"][column] = {"name": block.name, "dtype": values.dtype.str, "tz": tz}
+    except Exception:
+        release_blocks(blocks)
+        raise
+
+    return handle, spans, blocks
+
+def attach_product_columns(handle, spans):
+    """
+    공유 메모리에서 지정한 행 범위만 복사하여 DataFrame으로 만듭니다.
+    """
+    frame = {}
+    for column, info in handle["columns"].items():
+        block = shared_memory.SharedMemory(name=info["name"])
+        try:
+            values = np.ndarray((handle["length"],), dtype=np.dtype(info["dtype"]), buffer=block.buf)
+            parts = [values[start:stop] for start, stop in spans]
+            column_values = np.concatenate(parts) if parts else values[:0].copy()
+            # 공유 메모리를 닫기 전에 버퍼를 참조하는 뷰를 모두 해제
+            del values, parts
+        finally:
+            block.close()
+
+        series = pd.Series(column_values)
+        if info["tz"] is not None:
+            series = series.dt.tz_localize("UTC").dt.tz_convert(info["tz"])
+        frame[column] = series
+
+    return pd.DataFrame(frame)
+
+def release_blocks(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+def shard_product_ids(product_ids, workers):
+    """
+    상품 ID 목록을 순서를 유지한 채 연속 구간으로 나눕니다.
+    워커 간 부하 편차를 줄이기 위해 워커 수보다 잘게(워커당 4개) 나눕니다.
+    """
+    product_ids = list(product_ids)
+    shard_count = min(len(product_ids), workers * 4)
+    if shard_count == 0:
+        return []
+    return [shard.tolist() for shard in np.array_split(np.array(product_ids, dtype=object), shard_count)]
+
+def run_product_shards(worker, transactions, columns, product_ids, workers, *args):
+    """
+    product_ids를 나누어 프로세스 풀에서 worker(shard_transactions, shard_product_ids, *args)를 실행합니다.
+    결과는 product_ids 순서대로 반환하며, 워커에서 추가된 보간 로그는 data_processing.interpolation_logs에 합칩니다.
+    """
+    handle, spans, blocks = share_product_columns(transactions, columns)
+    try:
+        tasks = []
+        for shard in shard_product_ids(product_ids, workers):
+            shard_spans = [spans[product_id] for product_id in shard if product_id in spans]
+            tasks.append((worker, handle, shard_spans, shard, args))
+
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result, logs in executor.map(_run_shard, tasks):
+                data_processing.interpolation_logs.extend(logs)
+                results.append(result)
+        return results
+    finally:
+        release_blocks(blocks)
+
+def _run_shard(task):
+    worker, handle, shard_spans, shard, args = task
+
+    # 워커에서 추가된 보간 로그는 파일에 쓰지 않고 모아서 부모 프로세스로 반환
+    with data_processing.interpolation_logs.capture() as new_logs:
+        shard_transactions = attach_product_columns(handle, shard_spans)
+        result = worker(shard_transactions, shard, *args)
+
+    return result, new_logs
@@ -0,0 +1,141 @@
+#product_catalog.py
+#상품 메타 데이터(meta/product_meta_data.csv)를 한 번 읽어 상품 ID, 브랜드로 바로 찾을 수 있게 색인
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 데이터 경로 설정
+DATA_PATH = os.path.join('..', 'source')
+PRODUCT_META_PATH = os.path.join(DATA_PATH, 'meta', 'product_meta_data.csv')
+
+# {경로: (mtime, ProductCatalog)} 파일이 바뀌지 않았으면 다시 읽지 않음
+_catalog_cache = {}
+
+class ProductCatalog:
+    """
+    상품 메타 데이터 색인.
+
+    - product_ids, original_prices, brands: 행 순서대로의 배열 (original_prices는 float, 없으면 NaN)
+    - names: 앞뒤 공백을 제거하고 intern한 상품명 목록
+    - 상품 ID → 행 위치, 브랜드 → 행 위치 목록을 미리 만들어 두어 조회 시 DataFrame 전체를 훑지 않음
+    - 같은 상품 ID가 여러 행이면 첫 번째 행을 사용 (기존 drop_duplicates("product_id")와 같음)
+    """
+
+    def __init__(self, product_ids, names, original_prices, brands):
+        self.product_ids = np.asarray(product_ids, dtype="int64")
+        self.names = [sys.intern(str(name).strip()) if pd.notna(name) else None for name in names]
+        self.original_prices = pd.to_numeric(pd.Series(original_prices), errors="coerce").to_numpy(dtype=float)
+        self.brands = [sys.intern(str(brand)) if pd.notna(brand) else None for brand in brands]
+
+        self._index = pd.Index(self.product_ids)
+        self._positions = {product_id: position for position, product_id in enumerate(self.product_ids.tolist())}
+        self._brand_positions = {}
+        for position, brand in enumerate(self.brands):
+            self._brand_positions.setdefault(brand, []).append(position)
+
+    @classmethod
+    def from_frame(cls, product_meta):
+        product_meta = product_meta.drop_duplicates("product_id")
+        return cls(
+            product_meta["product_id"].to_numpy(),
+            product_meta["name"].tolist() if "name" in product_meta.columns else [None] * len(product_meta),
+            product_meta["original_price"].to_numpy() if "original_price" in product_meta.columns else np.full(len(product_meta), np.nan),
+            product_meta["brand"].tolist() if "brand" in product_meta.columns else [None] * len(product_meta),
+        )
+
+    @classmethod
+    def from_meta(cls, product_meta):
+        """
+        ProductCatalog는 그대로, product_meta DataFrame은 색인으로 변환하여 반환합니다.
+        product_meta 인자를 받는 함수들은 두 형태를 모두 받을 수 있습니다.
+        """
+        if isinstance(product_meta, cls):
+            return product_meta
+        return cls.from_frame(product_meta)
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def __contains__(self, product_id):
+        return product_id in self._positions
+
+    def __repr__(self):
+        return f"ProductCatalog({len(self)} products, {len(self._brand_positions)} brands)"
+
+    def position(self, product_id):
+        return self._positions.get(product_id)
+
+    def get_name(self, product_id, default=None):
+        position = self._positions.get(product_id)
+        return self.names[position] if position is not None else default
+
+    def get_original_price(self, product_id, default=np.nan):
+        position = self._positions.get(product_id)
+        return self.original_prices[position] if position is not None else default
+
+    def get_brand(self, product_id, default=None):
+        position = self._positions.get(product_id)
+        return self.brands[position] if position is not None else default
+
+    def positions(self, product_ids):
+        """
+        상품 ID 배열의 행 위치 배열을 반환합니다. (없는 상품은 -1)
+        """
+        return self._index.get_indexer(np.asarray(product_ids))
+
+    def lookup_original_price(self, product_ids):
+        """
+        상품 ID 배열에 대응하는 발매가 배열을 반환합니다. (없는 상품은 NaN)
+        """
+        # 마지막에 NaN을 붙여 -1(없는 상품) 위치가 NaN을 가리키도록 함
+        return np.append(self.original_prices, np.nan)[self.positions(product_ids)]
+
+    def lookup_name(self, product_ids):
+        """
+        상품 ID 배열에 대응하는 상품명 배열을 반환합니다. (없는 상품은 None)
+        """
+        names = np.array(self.names + [None], dtype=object)
+        return names[self.positions(product_ids)]
+
+    def brand_names(self):
+        return [brand for brand in self._brand_positions if brand is not None]
+
+    def product_ids_for_brand(self, brand):
+        return self.product_ids[self._brand_positions.get(brand, [])].tolist()
+
+    def subset(self, product_ids):
+        """
+        지정한 상품만 담은 색인을 반환합니다. (행 순서 유지)
+        """
+        positions = np.unique(self.positions(list(product_ids)))
+        positions = positions[positions >= 0]
+        return ProductCatalog(
+            self.product_ids[positions],
+            [self.names[position] for position in positions],
+            self.original_prices[positions],
+            [self.brands[position] for position in positions],
+        )
+
+    def to_frame(self):
+        return pd.DataFrame({
+            "product_id": self.product_ids,
+            "name": self.names,
+            "original_price": self.original_prices,
+            "brand": self.brands,
+        })
+
+def load_product_catalog(path=PRODUCT_META_PATH):
+    """
+    상품 메타 데이터 CSV를 읽어 ProductCatalog를 반환합니다.
+    파일의 mtime이 바뀌지 않았으면 이전에 만든 색인을 그대로 반환합니다.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    cached = _catalog_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    catalog = ProductCatalog.from_frame(pd.read_csv(path))
+    _catalog_cache[path] = (mtime, catalog)
+    return catalog
@@ -0,0 +1,128 @@
+#product_matrix.py
+#(상품, 시간 구간) 행 단위 데이터를 상품 × 구간 float64 행렬로 펼쳐, 결측 보정과 구간별 집계를 배열 연산으로 처리
+import numpy as np
+import pandas as pd
+
+class ProductBucketMatrix:
+    """
+    (product_id, date_created) 행 목록과 상품 × 구간 행렬 사이의 위치 대응.
+
+    - products: 행렬의 행 순서 (오름차순 상품 ID)
+    - buckets: 행렬의 열 순서 (오름차순 구간 시작 시각, freq를 지정하면 빈 구간도 포함)
+    - rows, columns: 원래 행마다 행렬에서의 위치
+    - first, last: 상품별 첫/마지막 구간의 열 위치 (상품의 구간 범위)
+
+    행렬에서 데이터가 없는 칸은 NaN이며, DataFrame은 gather로 원래 행 순서로 되돌릴 때만 만듭니다.
+    """
+
+    def __init__(self, products, buckets, rows, columns):
+        self.products = products
+        self.buckets = buckets
+        self.rows = rows
+        self.columns = columns
+
+        self.first = np.full(len(products), len(buckets), dtype="int64")
+        self.last = np.full(len(products), -1, dtype="int64")
+        np.minimum.at(self.first, rows, columns)
+        np.maximum.at(self.last, rows, columns)
+
+    @classmethod
+    def from_long(cls, product_ids, date_created, freq=None):
+        """
+        Parameters:
+            product_ids (array): 행마다 상품 ID
+            date_created (array): 행마다 구간 시작 시각
+            freq (str | None): 지정하면 첫 구간~마지막 구간 사이의 모든 구간을 열로 사용
+        """
+        products, rows = np.unique(np.asarray(product_ids), return_inverse=True)
+        dates = pd.DatetimeIndex(date_created)
+
+        if freq is not None and len(dates):
+            buckets = pd.date_range(dates.min(), dates.max(), freq=freq)
+        else:
+            buckets = dates.unique().sort_values()
+
+        columns = buckets.get_indexer(dates)
+        if (columns < 0).any():
+            raise ValueError(f"구간 경계({freq})와 맞지 않는 시각이 있습니다.")
+
+        return cls(products, buckets, rows.ravel().astype("int64"), columns.astype("int64"))
+
+    @property
+    def shape(self):
+        return (len(self.products), len(self.buckets))
+
+    def scatter(self, values, fill_value=np.nan):
+        """
+        행 단위 값을 행렬로 펼칩니다.
+        values가 (행 수,)면 (상품 수, 구간 수), (행 수, k)면 (k, 상품 수, 구간 수) 행렬을 반환합니다.
+        """
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 1:
+            matrix = np.full(self.shape, fill_value)
+            matrix[self.rows, self.columns] = values
+            return matrix
+
+        matrix = np.full((values.shape[1],) + self.shape, fill_value)
+        matrix[:, self.rows, self.columns] = values.T
+        return matrix
+
+    def gather(self, matrix):
+        """
+        행렬에서 원래 행 순서의 값을 꺼냅니다. (scatter의 역)
+        """
+        if matrix.ndim == 2:
+            return matrix[self.rows, self.columns]
+        return matrix[:, self.rows, self.columns].T
+
+    def in_range(self):
+        """
+        상품별 첫 구간~마지막 구간 범위 안에 있는 칸이면 True인 (상품 수, 구간 수) 배열.
+        """
+        positions = np.arange(len(self.buckets))
+        return (positions[None, :] >= self.first[:, None]) & (positions[None, :] <= self.last[:, None])
+
+    def range_cells(self):
+        """
+        상품별 구간 범위 안의 모든 칸 위치를 (상품, 구간) 순서로 반환합니다. (빈 구간 포함 행 목록)
+
+        Returns:
+            (rows, columns)
+        """
+        lengths = np.clip(self.last - self.first + 1, 0, None)
+        rows = np.repeat(np.arange(len(self.products)), lengths)
+        columns = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(self.first, lengths)
+        return rows, columns
+
+def forward_fill(matrix):
+    """
+    마지막 축(구간)을 따라 NaN을 직전 값으로 채웁니다. (행마다 Series.ffill과 같음)
+    """
+    positions = np.where(np.isnan(matrix), 0, np.arange(matrix.shape[-1]))
+    np.maximum.accumulate(positions, axis=-1, out=positions)
+    return np.take_along_axis(matrix, positions, axis=-1)
+
+def backward_fill(matrix):
+    """
+    마지막 축(구간)을 따라 NaN을 다음 값으로 채웁니다. (행마다 Series.bfill과 같음)
+    """
+    return forward_fill(matrix[..., ::-1])[..., ::-1]
+
+def fill_within_range(matrix, in_range):
+    """
+    상품별 구간 범위 안에서만 앞/뒤 값으로 결측을 보정합니다. (상품별 groupby().ffill().bfill()과 같음)
+    범위 밖의 칸은 NaN으로 둡니다.
+    """
+    matrix = np.where(in_range, matrix, np.nan)
+    return np.where(in_range, backward_fill(forward_fill(matrix)), np.nan)
+
+def nanmean_over_products(matrix):
+    """
+    구간마다 NaN이 아닌 상품 값의 평균을 구합니다. 값이 하나도 없는 구간은 NaN입니다.
+    (k, 상품 수, 구간 수) 행렬이면 (k, 구간 수)를 반환합니다.
+    """
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=-2)
+    totals = np.where(valid, matrix, 0.0).sum(axis=-2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts > 0, totals / counts, np.nan)
@@ -1,15 +1,20 @@
 #개별 상품 리셀 지수 계산 함수 정의
 import pandas as pd
-from data_processing import get_adjusted_baseline_price, get_adjusted_baseline_volume, save_interpolation_log, interpolation_logs
-from resell_utils import compute_resell_index_custom, get_discount_volume_threshold
+from data_processing import get_adjusted_baseline_price, get_adjusted_baseline_volume, get_adjusted_baselines, save_interpolation_log, interpolation_logs
+from bucket_cube import build_bucket_cube, count_discount_trades, is_aligned, rollup_bucket_cube
+from product_catalog import ProductCatalog
+from resell_utils import compute_resell_index_custom_vectorized, get_discount_volume_threshold
+from stage_trace import traced
+from transaction_store import as_datetime
 
+@traced()
 def calculate_product_resell_index(transactions: pd.DataFrame, product_meta: pd.DataFrame, product_id: int, baseline_date: str, alpha: float, discount_volume_quantile: float = 0.5, default_discount_threshold: float = 1):
     """    
     특정 상품 ID에 대해 할인 및 거래량을 반영한 리셀 지수를 계산하는 함수.
 
     Parameters:
         transactions (pandas.DataFrame): 거래 데이터
-        product_meta (pandas.DataFrame): 상품 메타 데이터
+        product_meta (ProductCatalog | pandas.DataFrame): 상품 메타 데이터
         product_id (int): 상품 ID
         baseline_date (str): 기준 시점
         alpha (float): 약성값
@@ -19,21 +24,23 @@ def calculate_product_resell_index(transactions: pd.DataFrame, product_meta: pd.
     Returns:
         pandas.DataFrame: 리셀 지수를 담은 DataFrame
     """
-    transactions["date_created"] = pd.to_datetime(transactions["date_created"])
-    product_data = transactions[(transactions["product_id"] == product_id) & (transactions["date_created"] >= baseline_date)]
+    # 거래 데이터(공유, 읽기 전용)의 컬럼을 다시 쓰지 않고, 문자열 날짜일 때만 이 함수 안에서 변환
+    date_created = as_datetime(transactions["date_created"])
+    selected = (transactions["product_id"] == product_id) & (date_created >= baseline_date)
+    product_data = transactions[selected]
     
     if product_data.empty:
         return pd.DataFrame(columns=["date_created", "avg_price", "resell_index"])
     
     # 날짜별 평균 가격 및 거래량 계산
-    product_resell_index = product_data.groupby(product_data["date_created"].dt.date).agg(
+    product_resell_index = product_data.groupby(date_created[selected].dt.date.rename("date_created")).agg(
         avg_price=("price", "mean"),
         total_volume=("price", "count")
     ).reset_index()
     
     # 기준 시점 가격 설정
-    baseline_price = product_meta.loc[product_meta["product_id"] == product_id, "original_price"].values
-    baseline_price = baseline_price[0] if len(baseline_price) > 0 else get_adjusted_baseline_price(product_resell_index, baseline_date, product_id)
+    catalog = ProductCatalog.from_meta(product_meta)
+    baseline_price = catalog.get_original_price(product_id) if product_id in catalog else get_adjusted_baseline_price(product_resell_index, baseline_date, product_id)
     
     if pd.isna(baseline_price) or baseline_price <= 0:
         baseline_price = 10  # 기본값 설정하여 0 나누기 방지
@@ -56,19 +63,129 @@ def calculate_product_resell_index(transactions: pd.DataFrame, product_meta: pd.
     # 할인 거래량 임계값 산출
     discount_volume_threshold = get_discount_volume_threshold(product_data, baseline_price, quantile=discount_volume_quantile, default_threshold=default_discount_threshold)
     
-    # compute_resell_index_custom 호출 시 discount_volume_threshold 인자 추가
-    product_resell_index["resell_index"] = product_resell_index.apply(
-        lambda row: compute_resell_index_custom(
-            row["avg_price"], 
-            row["total_volume"], 
-            baseline_price, 
-            baseline_volume, 
-            alpha, 
-            discount_volume_threshold
-        ),
-        axis=1
+    # 배열 단위로 리셀 지수 계산 (discount_volume_threshold 반영)
+    product_resell_index["resell_index"] = compute_resell_index_custom_vectorized(
+        product_resell_index["avg_price"].to_numpy(),
+        product_resell_index["total_volume"].to_numpy(),
+        baseline_price,
+        baseline_volume,
+        alpha,
+        discount_volume_threshold
     )
     
     product_resell_index["resell_index"] = product_resell_index["resell_index"].replace([float("inf"), -float("inf")], None)
     
     return product_resell_index
+
+@traced()
+def aggregate_product_daily_data(transactions: pd.DataFrame, product_meta: pd.DataFrame, product_ids: list, baseline_date: str, discount_volume_quantile: float = 0.5, default_discount_threshold: float = 1, cube: pd.DataFrame = None):
+    """
+    여러 상품의 날짜별 평균 가격, 거래량과 기준 가격, 기준 거래량, 할인 거래량 임계값을
+    상품 × 시간 구간 집계 큐브(bucket_cube)를 날짜 단위로 롤업하여 계산하는 함수.
+    상품마다 calculate_product_resell_index를 호출하는 것과 같은 값을 반환합니다.
+
+    Parameters:
+        transactions (pandas.DataFrame): 거래 데이터 (변경하지 않음)
+        product_meta (ProductCatalog | pandas.DataFrame): 상품 메타 데이터
+        product_ids (list): 상품 ID 목록
+        baseline_date (str): 기준 시점
+        discount_volume_quantile (float): 할인 거래량 임계값 산출에 사용할 분위수 (기본 0.5)
+        default_discount_threshold (int): 할인 거래 데이터가 없거나 계산 결과가 0일 경우 사용할 기본 임계값 (기본 1)
+        cube (pandas.DataFrame): 미리 만든 build_bucket_cube 결과 (없으면 transactions로 생성)
+                                 baseline_date는 큐브 구간 경계와 맞아야 합니다.
+
+    Returns:
+        pandas.DataFrame: product_id, date_created(날짜), avg_price, total_volume,
+                          baseline_price, baseline_volume, discount_volume_threshold 컬럼
+    """
+    product_meta = ProductCatalog.from_meta(product_meta)
+
+    if cube is None:
+        # 기준일 이후 거래만으로 큐브를 만들어, 기준일이 큐브 구간 경계와 맞지 않아도 같은 결과가 되도록 함
+        date_created = transactions["date_created"]
+        if not pd.api.types.is_datetime64_any_dtype(date_created):
+            date_created = pd.to_datetime(date_created)
+
+        mask = transactions["product_id"].isin(product_ids) & (date_created >= baseline_date)
+        cube = build_bucket_cube(transactions[mask].assign(date_created=date_created[mask]), product_meta)
+    else:
+        if not is_aligned(cube, baseline_date):
+            raise ValueError(f"기준일({baseline_date})이 큐브 구간({cube.attrs.get('freq')}) 경계와 맞지 않습니다.")
+        cube = cube[cube["product_id"].isin(product_ids) & (cube["date_created"] >= baseline_date)]
+
+    # 날짜별 평균 가격 및 거래량 계산 (시간대 정보는 제거하여 dt.date와 같은 날짜를 사용)
+    daily_cube = rollup_bucket_cube(cube, "D")
+    if daily_cube["date_created"].dt.tz is not None:
+        daily_cube["date_created"] = daily_cube["date_created"].dt.tz_localize(None)
+
+    daily = daily_cube[["product_id", "date_created", "avg_price", "count"]].rename(columns={"count": "total_volume"})
+
+    # 기준 시점 가격 설정: 메타 데이터의 첫 번째 값 사용
+    daily_product_ids = daily["product_id"].unique()
+    baseline_price = pd.Series(product_meta.lookup_original_price(daily_product_ids), index=daily_product_ids)
+
+    invalid_price = baseline_price.isna() | (baseline_price <= 0)
+    for product_id in baseline_price.index[invalid_price]:
+        interpolation_logs.append({
+            "product_id": product_id,
+            "date_created": baseline_date,
+            "column": "original_price",
+            "method": "adjusted_price",
+            "original_value": None,
+            "new_value": 10
+        })
+    baseline_price[invalid_price] = 10  # 기본값 설정하여 0 나누기 방지
+
+    # 기준 거래량: 기준일(없으면 가장 가까운 거래일, 같은 거리면 이전 날짜)의 거래량
+    baseline_volume = get_adjusted_baselines(daily, baseline_date, log_columns=())[0]["baseline_volume"]
+
+    # 할인 거래량 임계값: 할인 거래가 있는 날의 할인 거래 건수 분위수
+    discount_days = daily_cube.loc[daily_cube["discount_count"] > 0, ["product_id", "date_created", "discount_count"]]
+    if invalid_price.any():
+        # 큐브는 발매가 기준으로 할인 거래를 세므로, 기본값 10을 쓰는 상품은 기준일 이후 거래에서 직접 셈
+        date_created = as_datetime(transactions["date_created"])
+        recent = transactions[date_created >= baseline_date]
+        adjusted_days = count_discount_trades(recent, baseline_price[invalid_price], "D")
+        discount_days = discount_days[~discount_days["product_id"].isin(baseline_price.index[invalid_price])]
+        if not adjusted_days.empty:
+            discount_days = pd.concat([discount_days, adjusted_days], ignore_index=True)
+    threshold = discount_days.groupby("product_id")["discount_count"].quantile(discount_volume_quantile)
+    threshold = threshold.where(threshold > 0, default_discount_threshold)
+    threshold = threshold.reindex(baseline_price.index, fill_value=default_discount_threshold)
+
+    daily["baseline_price"] = daily["product_id"].map(baseline_price)
+    daily["baseline_volume"] = daily["product_id"].map(baseline_volume)
+    daily["discount_volume_threshold"] = daily["product_id"].map(threshold)
+
+    return daily
+
+@traced()
+def calculate_products_resell_index(transactions: pd.DataFrame, product_meta: pd.DataFrame, product_ids: list, baseline_date: str, alpha: float, discount_volume_quantile: float = 0.5, default_discount_threshold: float = 1, with_baselines: bool = False):
+    """
+    여러 상품의 날짜별 리셀 지수를 한 번에 계산하는 함수.
+    calculate_product_resell_index를 상품마다 호출한 결과를 product_ids 순서대로 이어 붙인 것과 같습니다.
+
+    Returns:
+        pandas.DataFrame: date_created, avg_price, total_volume, resell_index, product_id 컬럼
+        (with_baselines가 True면 baseline_price, baseline_volume 컬럼 추가)
+    """
+    daily = aggregate_product_daily_data(transactions, product_meta, product_ids, baseline_date, discount_volume_quantile, default_discount_threshold)
+
+    daily["resell_index"] = compute_resell_index_custom_vectorized(
+        daily["avg_price"].to_numpy(),
+        daily["total_volume"].to_numpy(),
+        daily["baseline_price"].to_numpy(),
+        daily["baseline_volume"].to_numpy(),
+        alpha,
+        daily["discount_volume_threshold"].to_numpy()
+    )
+    daily["resell_index"] = daily["resell_index"].replace([float("inf"), -float("inf")], None)
+
+    # product_ids 순서대로 정렬 (상품 내에서는 날짜 오름차순)
+    order = {product_id: position for position, product_id in enumerate(dict.fromkeys(product_ids))}
+    daily = daily.iloc[daily["product_id"].map(order).argsort(kind="stable")]
+
+    columns = ["date_created", "avg_price", "total_volume", "resell_index", "product_id"]
+    if with_baselines:
+        columns += ["baseline_price", "baseline_volume"]
+    return daily[columns].reset_index(drop=True)
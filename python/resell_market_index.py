@@ -1,163 +1,456 @@
 #전체 리셀 시장 지수를 계산
+import numpy as np
 import pandas as pd
-from resell_index import calculate_product_resell_index
-from data_processing import get_adjusted_baseline_price, get_adjusted_baseline_volume
-from resell_utils import normalize_index, compute_resell_index_custom, get_discount_volume_threshold
+from resell_index import aggregate_product_daily_data, calculate_products_resell_index
+from bucket_cube import build_bucket_cube, count_discount_trades, is_aligned, rollup_bucket_cube
+from data_processing import get_adjusted_baselines, interpolation_logs
+from parallel_utils import run_product_shards
+from product_catalog import ProductCatalog
+from resell_utils import normalize_index, compute_resell_index_custom_vectorized
+from product_matrix import ProductBucketMatrix, fill_within_range, nanmean_over_products
+from stage_trace import traced
 
-def calculate_resell_market_index(transactions, product_meta, product_ids, baseline_date, alpha = 0.1):
+# 시장 지수 산출 시 상품 지수를 묶는 방식 (구간 t, 상품 i의 가중치)
+# - mean: 단순 평균 (가중치 1)
+# - volume: 구간 거래량 q_it
+# - laspeyres: 기준 시점 거래 금액 p_i0 * q_i0 (기준 가격 × 기준 거래량, 구간마다 고정)
+# - paasche: 기준 가격 × 구간 거래량 p_i0 * q_it
+WEIGHTINGS = ("mean", "volume", "laspeyres", "paasche")
+
+@traced()
+def calculate_resell_market_index(transactions, product_meta, product_ids, baseline_date, alpha = 0.1, weighting="mean"):
     """
     여러 상품의 리셀 지수를 기반으로 전체 리셀 시장의 대표 지수를 계산하는 함수
+    weighting으로 상품 지수를 묶는 방식을 선택합니다. (WEIGHTINGS 참고, 기본은 단순 평균)
     """
-    resell_indices = []
+    _check_weighting(weighting)
+    product_meta = ProductCatalog.from_meta(product_meta)
 
-    for product_id in product_ids:
-        product_index = calculate_product_resell_index(transactions, product_meta, product_id, baseline_date, alpha)
+    # 모든 상품의 날짜별 리셀 지수를 (product_id, 날짜) 단위 groupby 한 번으로 계산
+    market_data = calculate_products_resell_index(transactions, product_meta, product_ids, baseline_date, alpha, with_baselines=weighting != "mean")
 
-        '''if product_index.empty:
-            continue  # 거래 데이터가 없는 경우 스킵'''
-        # 빈 데이터 또는 resell_index 누락 시 스킵
-        if product_index.empty or "resell_index" not in product_index.columns:
+    # 빈 데이터 또는 resell_index 누락 시 스킵
+    computed_product_ids = set(market_data["product_id"].unique())
+    for product_id in product_ids:
+        if product_id not in computed_product_ids:
             print(f"⚠️ 상품 ID {product_id}의 리셀 지수 데이터 없음, 스킵")
-            continue
 
-        product_index["product_id"] = product_id
-        product_index["name"] = product_meta[product_meta["product_id"] == product_id]["name"].values[0]
-
-        resell_indices.append(product_index)
-
-    if not resell_indices:
+    if market_data.empty:
         print("⚠️ 모든 상품의 데이터가 없음 → 빈 데이터프레임 반환")
         return pd.DataFrame(columns=["date_created", "market_resell_index"])
 
-    market_data = pd.concat(resell_indices, ignore_index=True)
+    market_data["name"] = product_meta.lookup_name(market_data["product_id"])
+
     # 24시간 단위로 그룹화 (날짜만 사용)
     market_data["date_created"] = pd.to_datetime(market_data["date_created"])
     market_data["date_only"] = market_data["date_created"].dt.date
 
-    resell_market_index = market_data.groupby("date_created").agg(
-        market_resell_index=("resell_index", "mean")
-    ).reset_index().rename(columns={"date_only": "date_created"})
+    if weighting == "mean":
+        resell_market_index = market_data.groupby("date_created").agg(
+            market_resell_index=("resell_index", "mean")
+        ).reset_index().rename(columns={"date_only": "date_created"})
+    else:
+        resell_index = pd.to_numeric(market_data["resell_index"], errors="coerce").to_frame()
+        market = aggregate_weighted_market_index(market_data, resell_index, weighting)
+        resell_market_index = pd.DataFrame({"date_created": market.index, "market_resell_index": market["resell_index"].to_numpy()})
+        market_data = market_data.drop(columns=["baseline_price", "baseline_volume"])
 
      # 기준일(예: baseline_date)에 해당하는 값이 100이 되도록 정규화
     resell_market_index = normalize_index(resell_market_index, index_column="market_resell_index", baseline_date=baseline_date)
 
     return [resell_market_index, market_data]
 
-def calculate_resell_market_index_4h(transactions, product_meta, product_ids, baseline_date, alpha=0.1):
+@traced()
+def aggregate_weighted_market_index(product_data, resell_index, weighting):
+    """
+    (구간, 상품) 행 단위의 상품 리셀 지수를 구간별 가중 평균으로 묶는 함수.
+    행마다 가중치를 배열로 계산한 뒤, 구간 번호 기준 np.bincount로 (가중치 × 지수) 합계와 가중치 합계를 한 번에 구합니다.
+    지수가 NaN인 행은 가중치 합계에서도 제외합니다.
+    가중치 합이 0인 구간(예: 편입 상품 모두 거래가 없는 구간의 거래량 가중)은 단순 평균(mean)과 같이 지수가 있는 상품의 평균을 사용합니다.
+
+    Parameters:
+        product_data (pandas.DataFrame): date_created, total_volume, baseline_price, baseline_volume 컬럼
+        resell_index (pandas.DataFrame): product_data와 같은 행 순서의 상품 지수 (열마다 α 등 다른 지수)
+        weighting (str): WEIGHTINGS 중 하나
+
+    Returns:
+        pandas.DataFrame: 행은 오름차순 구간, 열은 resell_index와 같음 (지수가 있는 상품이 없는 구간은 NaN)
+    """
+    _check_weighting(weighting)
+
+    dates, date_positions = np.unique(product_data["date_created"].to_numpy(), return_inverse=True)
+    date_positions = date_positions.ravel()
+    volume = product_data["total_volume"].to_numpy(dtype=float)
+
+    if weighting == "mean":
+        weights = np.ones(len(product_data))
+    elif weighting == "volume":
+        weights = volume
+    elif weighting == "laspeyres":
+        weights = product_data["baseline_price"].to_numpy(dtype=float) * product_data["baseline_volume"].to_numpy(dtype=float)
+    else:
+        weights = product_data["baseline_price"].to_numpy(dtype=float) * volume
+    weights = np.nan_to_num(weights, nan=0.0)
+
+    values = resell_index.to_numpy(dtype=float)
+    valid = np.isfinite(values)
+    weighted_values = np.where(valid, values * weights[:, None], 0.0)
+    valid_weights = np.where(valid, weights[:, None], 0.0)
+
+    market = np.empty((len(dates), values.shape[1]))
+    for column in range(values.shape[1]):
+        numerator = np.bincount(date_positions, weights=weighted_values[:, column], minlength=len(dates))
+        denominator = np.bincount(date_positions, weights=valid_weights[:, column], minlength=len(dates))
+        value_sum = np.bincount(date_positions, weights=np.where(valid[:, column], values[:, column], 0.0), minlength=len(dates))
+        value_count = np.bincount(date_positions, weights=valid[:, column], minlength=len(dates))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            market[:, column] = np.where(denominator > 0, numerator / denominator, value_sum / value_count)
+
+    return pd.DataFrame(market, index=pd.Index(dates), columns=resell_index.columns)
+
+def _check_weighting(weighting):
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"지원하지 않는 가중 방식입니다: {weighting} (가능한 값: {', '.join(WEIGHTINGS)})")
+
+@traced()
+def calculate_resell_market_index_4h(transactions, product_meta, product_ids, baseline_date, alpha=0.1, workers=None, weighting="mean"):
     """
     여러 상품의 리셀 지수를 기반으로 전체 리셀 시장의 대표 지수를 4시간 단위로 계산하는 함수.
     - 각 4시간 구간에 데이터가 있으면 해당 데이터를 이용해 인덱스를 산출하고,
-    - 데이터가 없으면 data_processing.py 내 보정 함수들(get_adjusted_baseline_price, get_adjusted_baseline_volume 등)을
+    - 데이터가 없으면 data_processing.py 내 보정 함수(get_adjusted_baselines)를
       필요에 따라 호출하여 인덱스 값을 추정하는 방식으로 처리합니다.
+    - workers가 2 이상이면 상품을 나누어 프로세스 풀에서 상품별 집계, 기준값, 할인 거래량 임계값, 상품 지수 계산과
+      정규화까지 실행하고, 부모 프로세스는 상품 지수를 구간별로 묶는 시장 지수 계산만 합니다.
+    - weighting으로 상품 지수를 묶는 방식을 선택합니다. (WEIGHTINGS 참고, 기본은 단순 평균)
     """
+    _check_weighting(weighting)
 
-    # 4시간 단위로 그룹화
-    step = "4h"
+    if workers is not None and workers > 1:
+        shards = _run_product_4h_shards(_product_resell_index_4h_shard, transactions, product_meta, product_ids, workers, baseline_date, [alpha])
+        shards = [shard for shard in shards if not shard[0].empty]
+        if not shards:
+            print("⚠️ 모든 상품의 4시간 데이터가 없음 → 빈 데이터프레임 반환")
+            return pd.DataFrame(columns=["date_created", "market_resell_index"])
 
-    resell_indices = []
+        product_data_4h = pd.concat([product_data for product_data, _ in shards], ignore_index=True)
+        resell_index = pd.concat([product_index for _, product_index in shards], ignore_index=True)
+        return aggregate_market_resell_index_4h(product_data_4h, resell_index, weighting=weighting)[0]
 
-    # 우선 각 상품별로 4시간 단위 리셀 지수를 계산
-    # 기존 함수와 동일한 calculate_product_resell_index를 사용하면 날짜 단위로 그룹화되므로, 여기서는 직접 4시간 단위로 재계산합니다.
-    for product_id in product_ids:
-        # 해당 상품의 거래 데이터 필터링 및 날짜 변환
-        product_data = transactions[(transactions["product_id"] == product_id)].copy()
+    product_data_4h = aggregate_product_4h_data(transactions, product_meta, product_ids, baseline_date)
+
+    if product_data_4h.empty:
+        print("⚠️ 모든 상품의 4시간 데이터가 없음 → 빈 데이터프레임 반환")
+        return pd.DataFrame(columns=["date_created", "market_resell_index"])
+
+    return _market_resell_index_4h(product_data_4h, [alpha], weighting=weighting)[0]
+
+@traced()
+def aggregate_product_4h_data(transactions, product_meta, product_ids, baseline_date, step="4h", workers=None, cube=None):
+    """
+    α와 무관한 상품별 4시간 단위 집계를 계산하는 함수.
+    구간별 평균 가격과 거래량, 상품별 기준 가격, 기준 거래량, 할인 거래량 임계값을 담은 DataFrame을 반환합니다.
+
+    - 상품 × 시간 구간 집계 큐브(bucket_cube)를 step 단위로 롤업하며, 거래가 없는 구간도 포함합니다. (resample과 같음)
+    - cube가 없으면 transactions로 만들며, workers가 2 이상이면 상품을 나누어 프로세스 풀에서 이 함수 전체(큐브, 기준값, 임계값)를 실행합니다.
+    - 발매가가 없는 상품은 보정 가격을 기준 가격으로 쓰고, 할인 거래 건수도 거래에서 보정 가격 기준으로 셉니다.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    product_meta = ProductCatalog.from_meta(product_meta)
+    columns = ["date_created", "avg_price", "total_volume", "baseline_price", "baseline_volume", "discount_volume_threshold", "product_id"]
 
-        if product_data.empty:
+    if cube is None and workers is not None and workers > 1:
+        shards = _run_product_4h_shards(_aggregate_product_4h_shard, transactions, product_meta, product_ids, workers, baseline_date, step)
+        shards = [shard for shard in shards if not shard.empty]
+        return pd.concat(shards, ignore_index=True) if shards else pd.DataFrame(columns=columns)
+
+    if cube is None:
+        cube = build_bucket_cube(transactions, product_meta, product_ids)
+    else:
+        cube = cube[cube["product_id"].isin(product_ids)]
+
+    computed_product_ids = set(cube["product_id"].unique())
+    for product_id in product_ids:
+        if product_id not in computed_product_ids:
             print(f"⚠️ 상품 ID {product_id}의 거래 데이터 없음, 스킵")
-            continue
-    
-        product_data["date_created"] = pd.to_datetime(product_data["date_created"])
-        product_data = product_data.set_index("date_created")
-
-        # 4시간 단위로 그룹화하여 평균 가격과 거래 건수(거래량)를 계산
-        grp = product_data.resample(step).agg(
-            avg_price=("price", "mean"),
-            total_volume=("price", "count")
-        ).reset_index()
-        
-        # 보정이 필요한 경우 (예: 그룹 내에 데이터가 전혀 없는 구간은 NaN으로 남을 수 있으므로)
-        # 4시간 그룹 중 NaN이 존재하면, 가장 가까운 거래일의 보정값을 가져오는 방식으로 처리할 수 있습니다.
-        # 아래는 예시로 첫 그룹의 값을 기준으로 보정하는 간단한 로직입니다.
-        if grp.empty:
-            print(f"⚠️ 상품 ID {product_id}의 4시간 그룹 데이터 없음, 스킵")
-            continue
-
-        # 기준 가격은 product_meta에서 가져오거나, 없으면 보정 함수 사용
-        baseline_price_arr = product_meta.loc[product_meta["product_id"] == product_id, "original_price"].values
-        baseline_price = baseline_price_arr[0] if len(baseline_price_arr) > 0 else get_adjusted_baseline_price(grp, baseline_date)
-
-        if baseline_price is None or pd.isna(baseline_price) or baseline_price == 0:
-            # 필요 시 보정 함수 호출
-            baseline_price = get_adjusted_baseline_price(grp, baseline_date)
-
-        # 기준 거래량: 첫 구간의 거래량 또는 보정 값
-        #baseline_volume = grp["total_volume"].iloc[0] if not grp["total_volume"].isna().all() else get_adjusted_baseline_volume(grp, baseline_date)
-
-        '''
-        # resell_index.py와 동일한 계산 방식 적용
-        grp["price_premium"] = grp["avg_price"] - baseline_price
-        grp["normalized_premium"] = grp["price_premium"] / baseline_price
-        grp["adjusted_weight"] = alpha * grp["total_volume"] + (1 - alpha) * grp["normalized_premium"]
-        grp["resell_index"] = (grp["avg_price"] * grp["adjusted_weight"]) / (baseline_price * baseline_volume) * 100
-        '''
-
-        # 지수 계산: (평균가격 * 거래량) / (기준가격 * 기준거래량) * 100
-        #grp["resell_index"] = (grp["avg_price"] * grp["total_volume"]) / (baseline_price * baseline_volume) * 100
-        '''
-
-        # 결측치나 Inf 값에 대해서는 전/후 값 보간 혹은 fallback 처리
-        grp["resell_index"] = grp["resell_index"].replace([float("inf"), -float("inf")], None)
-        grp["resell_index"] = grp["resell_index"].ffill().bfill().interpolate(method="linear")
-        '''
-         # 각 4시간 구간별로 resell index 계산 (공통 함수 사용)
-        #grp["resell_index"] = grp.apply(
-        #    lambda row: compute_resell_index_custom(row["avg_price"], row["total_volume"], baseline_price, baseline_volume, alpha), axis=1
-        #)
-        # 기준 거래량: 첫 4시간 그룹의 거래량 또는 보정 값
-        if not grp["total_volume"].isna().all():
-            baseline_volume = grp["total_volume"].iloc[0]
-        else:
-            baseline_volume = get_adjusted_baseline_volume(grp, baseline_date)
-        
-        # 할인 거래량 임계값 산출: 그룹 데이터를 대상으로 get_discount_volume_threshold 함수 사용
-        discount_volume_threshold = get_discount_volume_threshold(product_data.reset_index(), baseline_price, quantile=0.5, default_threshold=1)
-
-        # compute_resell_index_custom 호출 시 discount_volume_threshold 인자 추가
-        grp["resell_index"] = grp.apply(
-            lambda row: compute_resell_index_custom(
-                row["avg_price"], 
-                row["total_volume"], 
-                baseline_price, 
-                baseline_volume, 
-                alpha,
-                discount_volume_threshold
-            ), 
-            axis=1
+
+    if cube.empty:
+        return pd.DataFrame(columns=columns)
+
+    # 4시간 단위로 롤업하여 평균 가격과 거래 건수(거래량)를 계산
+    grp = rollup_bucket_cube(cube, step, fill_empty=True).rename(columns={"count": "total_volume"})
+
+    # 기준 가격은 product_meta에서 가져오거나, 없으면 보정 함수 사용
+    grp_product_ids = grp["product_id"].unique()
+    baseline_price = pd.Series(product_meta.lookup_original_price(grp_product_ids), index=grp_product_ids)
+    missing_price = baseline_price.isna() | (baseline_price == 0)
+    if missing_price.any():
+        # 발매가가 없는 상품은 모두 한 번에 가장 가까운 거래일의 평균 가격으로 보정
+        adjusted, logs = get_adjusted_baselines(grp[grp["product_id"].isin(baseline_price.index[missing_price])], baseline_date, log_columns=("baseline_price",))
+        baseline_price[missing_price] = adjusted["baseline_price"].reindex(baseline_price.index[missing_price]).to_numpy()
+        interpolation_logs.extend(logs)
+
+    # 기준 거래량: 첫 4시간 그룹의 거래량
+    baseline_volume = grp.groupby("product_id")["total_volume"].first()
+
+    # 할인 거래량 임계값: 할인 거래가 있는 날의 할인 거래 건수 중앙값 (get_discount_volume_threshold와 같음)
+    daily_cube = rollup_bucket_cube(cube, "D")
+    discount_days = daily_cube.loc[daily_cube["discount_count"] > 0, ["product_id", "date_created", "discount_count"]]
+    if missing_price.any():
+        # 큐브는 발매가 기준으로 할인 거래를 세므로, 보정 가격을 쓰는 상품은 거래에서 보정 가격 기준으로 셈
+        adjusted_days = count_discount_trades(transactions, baseline_price[missing_price], "D")
+        discount_days = discount_days[~discount_days["product_id"].isin(baseline_price.index[missing_price])]
+        if not adjusted_days.empty:
+            discount_days = pd.concat([discount_days, adjusted_days], ignore_index=True)
+    threshold = discount_days.groupby("product_id")["discount_count"].quantile(0.5)
+    threshold = threshold.where(threshold > 0, 1).reindex(baseline_price.index, fill_value=1)
+
+    grp["baseline_price"] = grp["product_id"].map(baseline_price)
+    grp["baseline_volume"] = grp["product_id"].map(baseline_volume)
+    grp["discount_volume_threshold"] = grp["product_id"].map(threshold)
+
+    # product_ids 순서대로 정렬 (상품 내에서는 시간 오름차순)
+    order = {product_id: position for position, product_id in enumerate(product_ids)}
+    grp = grp.iloc[grp["product_id"].map(order).argsort(kind="stable")]
+
+    return grp[columns].reset_index(drop=True)
+
+def _run_product_4h_shards(worker, transactions, product_meta, product_ids, workers, *args):
+    # 날짜 변환은 부모 프로세스에서 한 번만 하고, 워커에는 공유 메모리의 상품별 행 범위만 전달
+    product_ids = list(dict.fromkeys(product_ids))
+    shared = transactions[["product_id", "price", "date_created"]]
+    if not pd.api.types.is_datetime64_any_dtype(shared["date_created"]):
+        shared = shared.assign(date_created=pd.to_datetime(shared["date_created"]))
+
+    product_meta = ProductCatalog.from_meta(product_meta).subset(product_ids)
+    return run_product_shards(worker, shared, ["product_id", "price", "date_created"], product_ids, workers, product_meta, *args)
+
+def _aggregate_product_4h_shard(shard_transactions, shard_product_ids, product_meta, baseline_date, step):
+    return aggregate_product_4h_data(shard_transactions, product_meta.subset(shard_product_ids), shard_product_ids, baseline_date, step)
+
+def _product_resell_index_4h_shard(shard_transactions, shard_product_ids, product_meta, baseline_date, alphas):
+    product_data_4h = aggregate_product_4h_data(shard_transactions, product_meta.subset(shard_product_ids), shard_product_ids, baseline_date)
+    if product_data_4h.empty:
+        return [product_data_4h, pd.DataFrame(columns=range(len(alphas)), dtype=float)]
+    return [product_data_4h, compute_product_resell_index_4h(product_data_4h, alphas)]
+
+@traced()
+def compute_product_resell_index_4h(product_data_4h, alphas):
+    """
+    aggregate_product_4h_data의 결과에 대해 여러 α 값의 상품별 리셀 지수를 한 번에 계산하는 함수.
+    - 결측 구간은 상품별로 앞/뒤 값으로 보정하고,
+    - 상품별 첫 4시간 구간을 기준(100)으로 정규화합니다.
+
+    Returns:
+        pandas.DataFrame: 행은 product_data_4h와 같고, 열은 alphas의 순서(0, 1, ...)
+    """
+    matrix = ProductBucketMatrix.from_long(product_data_4h["product_id"].to_numpy(), product_data_4h["date_created"])
+    resell_index = _product_resell_index_4h_matrix(product_data_4h, matrix, alphas)
+    return pd.DataFrame(matrix.gather(resell_index), index=product_data_4h.index)
+
+@traced()
+def aggregate_market_resell_index_4h(product_data_4h, resell_index, step="4h", weighting="mean"):
+    """
+    상품별 4시간 리셀 지수를 구간별 평균(weighting이 mean이 아니면 가중 평균)으로 묶어 시장 지수를 계산하는 함수.
+    상품 데이터가 없는(행이 없는) 구간의 시장 지수는 0으로 둡니다. (단순 평균과 같음)
+
+    Returns:
+        list: resell_index의 열마다 ["date_created", "market_resell_index"] DataFrame
+    """
+    if weighting != "mean":
+        market = aggregate_weighted_market_index(product_data_4h, resell_index, weighting)
+        intervals = pd.date_range(market.index.min(), market.index.max(), freq=step)
+        market = market.reindex(intervals, fill_value=0)
+        return [
+            pd.DataFrame({"date_created": intervals, "market_resell_index": market[column].to_numpy()})
+            for column in market.columns
+        ]
+
+    matrix = ProductBucketMatrix.from_long(product_data_4h["product_id"].to_numpy(), product_data_4h["date_created"], freq=step)
+    return _market_resell_index_4h_frames(matrix, matrix.scatter(resell_index.to_numpy(dtype=float)))
+
+def _product_resell_index_4h_matrix(product_data_4h, matrix, alphas):
+    """
+    상품별 4시간 리셀 지수를 (α 수, 상품 수, 구간 수) 행렬로 계산합니다.
+    상품의 구간 범위 밖의 칸은 NaN입니다.
+    """
+    alpha_axis = np.asarray(alphas, dtype=float)[:, None]
+
+    resell_index = compute_resell_index_custom_vectorized(
+        product_data_4h["avg_price"].to_numpy(dtype=float),
+        product_data_4h["total_volume"].to_numpy(dtype=float),
+        product_data_4h["baseline_price"].to_numpy(dtype=float),
+        product_data_4h["baseline_volume"].to_numpy(dtype=float),
+        alpha_axis,
+        product_data_4h["discount_volume_threshold"].to_numpy(dtype=float)
+    )
+    resell_index = matrix.scatter(resell_index.T)
+    resell_index[np.isinf(resell_index)] = np.nan
+
+    # 상품별로 결측 구간을 앞/뒤 값으로 보정
+    resell_index = fill_within_range(resell_index, matrix.in_range())
+
+    # 첫 4시간 구간을 기준으로 정규화
+    base_value = resell_index[:, np.arange(len(matrix.products)), matrix.first]
+    return resell_index / base_value[:, :, None] * 100
+
+def _market_resell_index_4h_frames(matrix, resell_index):
+    # 행이 있는 구간은 상품 지수 평균, 행이 없는 구간은 0
+    market = nanmean_over_products(resell_index)
+    has_rows = np.bincount(matrix.columns, minlength=len(matrix.buckets)) > 0
+    market = np.where(has_rows, market, 0.0)
+
+    return [
+        pd.DataFrame({"date_created": matrix.buckets, "market_resell_index": values})
+        for values in market
+    ]
+
+def _market_resell_index_4h(product_data_4h, alphas, step="4h", weighting="mean"):
+    """
+    aggregate_product_4h_data 결과로 α마다 4시간 시장 지수를 계산합니다.
+    단순 평균은 상품 × 구간 행렬에서 바로 묶고, 가중 평균만 행 단위로 되돌려 계산합니다.
+    """
+    matrix = ProductBucketMatrix.from_long(product_data_4h["product_id"].to_numpy(), product_data_4h["date_created"], freq=step)
+    resell_index = _product_resell_index_4h_matrix(product_data_4h, matrix, alphas)
+
+    if weighting == "mean":
+        return _market_resell_index_4h_frames(matrix, resell_index)
+
+    return aggregate_market_resell_index_4h(product_data_4h, pd.DataFrame(matrix.gather(resell_index), index=product_data_4h.index), step, weighting)
+
+@traced()
+def calculate_resell_market_index_for_alphas(transactions, product_meta, product_ids, baseline_date, alphas, workers=None, weighting="mean"):
+    """
+    여러 α 값에 대한 리셀 시장 지수를 24시간/4시간 단위로 한 번에 계산하는 함수.
+    - 필터링, 날짜 변환, 리샘플링, 기준값 및 할인 거래량 임계값 산출은 한 번만 수행하고,
+    - α 축은 브로드캐스트하여 모든 α의 지수를 함께 계산합니다.
+    - workers가 2 이상이면 24시간/4시간이 함께 쓰는 큐브 집계만 프로세스 풀에서 나누어 실행합니다.
+    결과는 α마다 calculate_resell_market_index, calculate_resell_market_index_4h를 호출한 것과 같습니다.
+
+    Returns:
+        [resell_index_data_with_alpha_24h, resell_index_data_with_alpha_4h]
+        각 원소는 [alpha, resell_market_index] 의 리스트
+    """
+    _check_weighting(weighting)
+    alphas = list(alphas)
+    alpha_axis = np.asarray(alphas, dtype=float)[:, None]
+    product_meta = ProductCatalog.from_meta(product_meta)
+
+    # 원시 거래는 한 번만 집계하고 24시간/4시간 모두 큐브에서 롤업
+    cube = build_bucket_cube(transactions, product_meta, product_ids, workers=workers)
+
+    # 24시간 단위 (기준일이 큐브 구간 경계와 맞지 않으면 거래 데이터에서 직접 집계)
+    resell_index_data_with_alpha_24h = []
+    daily_cube = cube if is_aligned(cube, baseline_date) else None
+    daily = aggregate_product_daily_data(transactions, product_meta, product_ids, baseline_date, cube=daily_cube)
+
+    if daily.empty:
+        print("⚠️ 모든 상품의 데이터가 없음 → 빈 데이터프레임 반환")
+        for alpha in alphas:
+            resell_index_data_with_alpha_24h.append([alpha, pd.DataFrame(columns=["date_created", "market_resell_index"])])
+    else:
+        daily_index = compute_resell_index_custom_vectorized(
+            daily["avg_price"].to_numpy(),
+            daily["total_volume"].to_numpy(),
+            daily["baseline_price"].to_numpy(),
+            daily["baseline_volume"].to_numpy(),
+            alpha_axis,
+            daily["discount_volume_threshold"].to_numpy()
         )
-        grp["resell_index"] = grp["resell_index"].replace([float("inf"), -float("inf")], None)
-        grp["resell_index"] = grp["resell_index"].ffill().bfill().interpolate(method="linear")
-        
-        # 첫 4시간 구간을 기준으로 정규화
-        grp = normalize_index(grp, "resell_index", grp["date_created"].iloc[0])
+        daily_index[np.isinf(daily_index)] = np.nan
+        if weighting == "mean":
+            market = pd.DataFrame(daily_index.T).groupby(daily["date_created"].to_numpy()).mean()
+        else:
+            market = aggregate_weighted_market_index(daily, pd.DataFrame(daily_index.T, index=daily.index), weighting)
+
+        for position, alpha in enumerate(alphas):
+            resell_market_index = pd.DataFrame({"date_created": market.index, "market_resell_index": market[position].to_numpy()})
+            resell_market_index = normalize_index(resell_market_index, index_column="market_resell_index", baseline_date=baseline_date)
+            resell_index_data_with_alpha_24h.append([alpha, resell_market_index])
 
-        grp["product_id"] = product_id
-        resell_indices.append(grp)
+    # 4시간 단위
+    resell_index_data_with_alpha_4h = []
+    product_data_4h = aggregate_product_4h_data(transactions, product_meta, product_ids, baseline_date, cube=cube)
 
-    if not resell_indices:
+    if product_data_4h.empty:
         print("⚠️ 모든 상품의 4시간 데이터가 없음 → 빈 데이터프레임 반환")
-        return pd.DataFrame(columns=["date_created", "market_resell_index"])
+        for alpha in alphas:
+            resell_index_data_with_alpha_4h.append([alpha, pd.DataFrame(columns=["date_created", "market_resell_index"])])
+    else:
+        market_indices = _market_resell_index_4h(product_data_4h, alphas, weighting=weighting)
+        resell_index_data_with_alpha_4h = [[alpha, market_index] for alpha, market_index in zip(alphas, market_indices)]
+
+    return [resell_index_data_with_alpha_24h, resell_index_data_with_alpha_4h]
+
+@traced()
+def rebase_market_index(resell_market_index, baseline_dates, index_column="market_resell_index"):
+    """
+    이미 계산한 리셀 시장 지수를 여러 기준일로 다시 정규화하는 함수.
+    지수를 다시 계산하지 않고, 기준일마다 기준일 시점의 값으로 나누는 배열 연산만 수행합니다.
+
+    - 기준일과 같은 시점이 있으면 그 값을, 없으면 기준일 이전 마지막 시점의 값을 기준(100)으로 사용
+      (기준일이 첫 시점보다 이르면 첫 시점의 값 사용)
+    - 기준값이 NaN 또는 0이면 normalize_index와 같이 100을 기준값으로 사용
+
+    Returns:
+        list: baseline_dates 순서대로 [baseline_date, 정규화된 리셀 시장 지수 DataFrame]
+    """
+    baseline_dates = list(baseline_dates)
+    if resell_market_index.empty:
+        return [[baseline_date, resell_market_index.copy()] for baseline_date in baseline_dates]
+
+    date_created = pd.to_datetime(resell_market_index["date_created"])
+    values = resell_market_index[index_column].to_numpy(dtype=float)
+
+    baselines = pd.to_datetime(pd.Series(baseline_dates), utc=True, format="ISO8601")
+    if date_created.dt.tz is None:
+        baselines = baselines.dt.tz_localize(None)
+    else:
+        baselines = baselines.dt.tz_convert(date_created.dt.tz)
 
-    market_data = pd.concat(resell_indices, ignore_index=True)
-    market_data = market_data.sort_values("date_created")
-    market_data = market_data.set_index("date_created")
+    # 시점 순서로 정렬한 위치에서 기준일 이하 마지막 시점을 찾음
+    order = np.argsort(date_created.to_numpy(), kind="stable")
+    positions = np.searchsorted(date_created.to_numpy()[order], baselines.to_numpy(), side="right") - 1
+    base_values = values[order][np.clip(positions, 0, None)]
+    base_values = np.where(np.isnan(base_values) | (base_values == 0), 100, base_values)
 
-    # 4시간 단위로 그룹화하여 시장 지수 산출 (평균값)
-    results = []
-    grouped = market_data.resample(step)
-    for interval, group in grouped:
-        idx_value = group["resell_index"].mean() if not group.empty else 0
-        results.append({"date_created": interval, "market_resell_index": idx_value})
+    # (기준일 수 × 시점 수) 한 번의 나눗셈
+    rebased = values[None, :] / base_values[:, None] * 100
 
+    result = []
+    for baseline_date, rebased_values in zip(baseline_dates, rebased):
+        rebased_index = resell_market_index.copy()
+        rebased_index[index_column] = rebased_values
+        result.append([baseline_date, rebased_index])
+    return result
+
+def rebase_schedule(start_date, end_date, freq="7D"):
+    """
+    start_date부터 end_date까지 freq 간격의 기준일 목록을 만듭니다. (예: "7D" 매주, "MS" 매월 1일)
+    """
+    return [timestamp.isoformat() for timestamp in pd.date_range(pd.Timestamp(start_date), pd.Timestamp(end_date), freq=freq)]
+
+@traced()
+def calculate_resell_market_index_for_baselines(transactions, product_meta, product_ids, baseline_dates, alpha=0.1, step="24h"):
+    """
+    여러 기준일에 대한 리셀 시장 지수를 계산하는 함수.
+    가장 이른 기준일로 리셀 시장 지수를 한 번만 계산한 뒤(거래 집계, 상품별 기준 가격, 기준 거래량, 할인 거래량 임계값 모두 한 번),
+    rebase_market_index로 기준일마다 다시 정규화합니다.
+
+    Parameters:
+        baseline_dates (list): 기준일 목록 (rebase_schedule로 만든 주기적 기준일도 사용 가능)
+        step (str): "24h" 또는 "4h"
+
+    Returns:
+        list: baseline_dates 순서대로 [baseline_date, resell_market_index]
+    """
+    baseline_dates = list(baseline_dates)
+    anchor_date = min(baseline_dates, key=lambda baseline_date: pd.Timestamp(baseline_date))
 
-    return pd.DataFrame(results).reset_index(drop=True)
+    if step == "24h":
+        resell_market_index = calculate_resell_market_index(transactions, product_meta, product_ids, anchor_date, alpha)[0]
+    elif step == "4h":
+        resell_market_index = calculate_resell_market_index_4h(transactions, product_meta, product_ids, anchor_date, alpha)
+    else:
+        raise ValueError(f"지원하지 않는 간격입니다: {step}")
 
+    return rebase_market_index(resell_market_index, baseline_dates)
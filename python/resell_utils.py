@@ -2,6 +2,9 @@ import pandas as pd
 import numpy as np
 
 from data_processing import get_adjusted_baseline_price, interpolation_logs, get_adjusted_baseline_volume
+from product_catalog import ProductCatalog, load_product_catalog
+from stage_trace import traced
+from transaction_store import as_datetime
 
 def compute_resell_index(avg_price, total_volume, baseline_price, baseline_volume, alpha):
     '''
@@ -68,6 +71,45 @@ def compute_resell_index_custom(avg_price, total_volume, baseline_price, baselin
     index = (avg_price / baseline_price) * (1 + combined_factor) * 100
     return index
 
+def compute_resell_index_custom_vectorized(avg_price, total_volume, baseline_price, baseline_volume, alpha, discount_volume_threshold):
+    """
+    compute_resell_index_custom의 NumPy 배열 버전.
+    각 인자는 스칼라 또는 브로드캐스트 가능한 배열이며, 프리미엄/할인/임계값 미달 분기를 마스크로 처리합니다.
+    결과는 원소마다 compute_resell_index_custom을 호출한 값과 같습니다.
+
+    Returns:
+      계산된 리셀 지수 배열 (numpy.ndarray)
+    """
+    avg_price = np.asarray(avg_price, dtype=float)
+    total_volume = np.asarray(total_volume, dtype=float)
+    baseline_price = np.asarray(baseline_price, dtype=float)
+    baseline_volume = np.asarray(baseline_volume, dtype=float)
+    alpha = np.asarray(alpha, dtype=float)
+    discount_volume_threshold = np.asarray(discount_volume_threshold, dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 거래량을 기준 거래량으로 정규화 (기준 거래량이 0 이하이면 0)
+        normalized_volume = np.where(baseline_volume > 0, total_volume / baseline_volume, 0)
+        volume_factor = alpha * normalized_volume
+
+        # 프리미엄 케이스: 발매가보다 높거나 같은 경우
+        is_premium = avg_price >= baseline_price
+        normalized_premium = (avg_price - baseline_price) / baseline_price
+        premium_factor = (1 - alpha) * normalized_premium + volume_factor
+
+        # 할인 케이스: 거래량이 임계값 이상일 때만 할인 효과 반영
+        discount_rate = (baseline_price - avg_price) / baseline_price
+        discount_factor = (1 - alpha) * (-discount_rate) + volume_factor
+        is_counted_discount = total_volume >= discount_volume_threshold
+
+        combined_factor = np.where(
+            is_premium,
+            premium_factor,
+            np.where(is_counted_discount, discount_factor, volume_factor)
+        )
+
+        return (avg_price / baseline_price) * (1 + combined_factor) * 100
+
 def compute_resell_index_laspeyres(avg_price, baseline_price, baseline_volume):
     """
     @internal
@@ -87,21 +129,22 @@ def calculate_product_resell_index_laspeyres(transactions, product_meta, product
 
     특정 상품 ID에 대해 거래량을 고정한 리셀 지수를 계산하는 함수.
     """
-    transactions.loc[:, 'date_created'] = pd.to_datetime(transactions['date_created'])
-    product_data = transactions[(transactions["product_id"] == product_id) & (transactions["date_created"] >= baseline_date)]
+    date_created = as_datetime(transactions['date_created'])
+    selected = (transactions["product_id"] == product_id) & (date_created >= baseline_date)
+    product_data = transactions[selected]
     
     if product_data.empty:
         return pd.DataFrame(columns=["date_created", "avg_price", "resell_index"])
 
     # 날짜별 평균 가격 및 거래량 계산
-    product_resell_index = product_data.groupby(product_data["date_created"].dt.date).agg(
+    product_resell_index = product_data.groupby(date_created[selected].dt.date.rename("date_created")).agg(
         avg_price=("price", "mean"),
         total_volume=("price", "count")
     ).reset_index()
 
     # 기준 시점 가격 설정 (없으면 보정값 사용)
-    baseline_price = product_meta.loc[product_meta["product_id"] == product_id, "original_price"].values
-    baseline_price = baseline_price[0] if len(baseline_price) > 0 else get_adjusted_baseline_price(product_resell_index, baseline_date, product_id)
+    catalog = ProductCatalog.from_meta(product_meta)
+    baseline_price = catalog.get_original_price(product_id) if product_id in catalog else get_adjusted_baseline_price(product_resell_index, baseline_date, product_id)
 
     if pd.isna(baseline_price) or baseline_price <= 0:
         baseline_price = 10  # 기본값 설정하여 0 나누기 방지
@@ -131,6 +174,7 @@ def calculate_product_resell_index_laspeyres(transactions, product_meta, product
 
     return product_resell_index
 
+@traced()
 def normalize_index(df, index_column="resell_index", baseline_date=None):
     """
     DataFrame의 지수를 기준일(또는 첫 행의 값)으로 정규화하여 기준일의 값이 100이 되도록 조정합니다.
@@ -162,6 +206,7 @@ def normalize_index(df, index_column="resell_index", baseline_date=None):
     df[index_column] = df[index_column] / base_value * 100
     return df
 
+@traced()
 def get_discount_volume_threshold(df, baseline_price, quantile=0.5, default_threshold=1):
     """
     특정 상품의 거래 데이터(df)에서 할인 거래량 임계값을 계산합니다.
@@ -175,16 +220,15 @@ def get_discount_volume_threshold(df, baseline_price, quantile=0.5, default_thre
     Returns:
       할인 거래량 임계값 (최소 거래 건수)
     """
-    df.loc[:, 'date_created'] = pd.to_datetime(df['date_created'])
-    discount_df = df[df['price'] < baseline_price]
-    if discount_df.empty:
+    # 이미 datetime이면 다시 변환하지 않음, df는 수정하지 않음 (실시간 갱신에는 discount_threshold.DiscountVolumeThreshold 사용)
+    date_created = as_datetime(df['date_created'])
+    is_discount = df['price'] < baseline_price
+    if not is_discount.any():
         return default_threshold
-    discount_volume_by_day = discount_df.groupby(discount_df['date_created'].dt.date).size()
+    discount_volume_by_day = date_created[is_discount].dt.date.value_counts(sort=False)
     threshold = discount_volume_by_day.quantile(quantile)
     return threshold if threshold > 0 else default_threshold
 
-meta_df = pd.read_csv('../source/meta/product_meta_data.csv')
-
 def analyze_alpha_sensitivity(df, baseline_volume, discount_volume_quantile, alpha_values):
     """
     @deprecated: not used anymore
@@ -203,12 +247,12 @@ def analyze_alpha_sensitivity(df, baseline_volume, discount_volume_quantile, alp
     results = {}
     
     # 전체 할인 거래량 분포 분석 (상품별 요약 통계)
-    baseline_price_lookup = {row['product_id']: row['original_price'] for _, row in meta_df.iterrows()}
-    discount_stats = analyze_discount_volume_distribution(df, baseline_price_lookup)
+    catalog = load_product_catalog()
+    discount_stats = analyze_discount_volume_distribution(df, catalog)
 
     for product_id, group in df.groupby('product_id'):
         # 발매가 정보 가져오기
-        baseline_price = meta_df.loc[meta_df['product_id'] == product_id, 'original_price'].values[0]
+        baseline_price = catalog.get_original_price(product_id)
         avg_price = group['price'].mean()
         total_volume = len(group)
 
@@ -228,7 +272,7 @@ def analyze_alpha_sensitivity(df, baseline_volume, discount_volume_quantile, alp
 
     return results
 
-def analyze_discount_volume_distribution(df, baseline_price_lookup):
+def analyze_discount_volume_distribution(df, catalog):
     """
     @deprecated: not used anymore
 
@@ -236,21 +280,21 @@ def analyze_discount_volume_distribution(df, baseline_price_lookup):
     통계 요약(descriptive statistics)을 반환합니다.
     
     Parameters:
-      transactions_file: 거래 데이터 CSV 파일 경로 (예: "36.csv")
-      baseline_price: 발매가 (예: 139000)
+      df: 거래 데이터 DataFrame (product_id, price, date_created 포함)
+      catalog: 발매가를 조회할 ProductCatalog
       
     Returns:
       할인 거래 건수의 날짜별 분포에 대한 요약 통계 (pandas Series의 describe() 결과)
     """
-    # 날짜 형식 변환
-    df.loc[:, 'date_created'] = pd.to_datetime(df['date_created'])
+    # 날짜 형식 변환 (df는 수정하지 않음)
+    days = as_datetime(df['date_created']).dt.date
     results = {}
     for product_id, group in df.groupby('product_id'):
-        baseline_price = baseline_price_lookup.get(product_id)
-        if baseline_price is None:
+        if product_id not in catalog:
             continue
-        discount_df = group[group['price'] < baseline_price]
+        baseline_price = catalog.get_original_price(product_id)
+        discount_days = days.loc[group.index[(group['price'] < baseline_price).to_numpy()]]
         # 상품별 날짜별 할인 거래 건수 집계
-        discount_volume_by_day = discount_df.groupby(discount_df['date_created'].dt.date).size()
+        discount_volume_by_day = discount_days.groupby(discount_days).size()
         results[product_id] = discount_volume_by_day.describe()  # 또는 원하는 방식으로 저장
     return results
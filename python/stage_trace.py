@@ -0,0 +1,305 @@
+#stage_trace.py
+#파이프라인 단계별 실행 시간, 호출 횟수, 입출력 행 수, 메모리 변화를 기록하는 선택형(opt-in) 계측 도구
+#
+# 사용법
+# - 환경 변수: RESELL_TRACE=output/trace/run.json python main.py  (값이 "1"이면 기본 경로에 저장)
+#              RESELL_PROFILE=build_bucket_cube 를 함께 지정하면 해당 단계에 cProfile 적용
+# - CLI: python main.py --trace [경로] --profile 단계명
+# 계측을 켜지 않으면 각 단계는 enabled 확인 한 번만 하고 바로 실행됩니다.
+import atexit
+import cProfile
+import functools
+import inspect
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+TRACE_ENV = "RESELL_TRACE"
+PROFILE_ENV = "RESELL_PROFILE"
+
+# trace 파일 기본 저장 경로 (python/output 폴더에 저장)
+TRACE_DIR = os.path.join("output", "trace")
+
+class StageTracer:
+    """
+    단계(stage) 실행 기록을 모아 두었다가 JSON trace 파일로 저장합니다.
+
+    - events: 단계 호출마다 name, product_id, start, wall_time, rows_in, rows_out, rss_delta_mb, products
+      (상품별 실행 시간은 상품 하나씩 호출되는 단계(product_id)에만 있음,
+       여러 상품을 한 번에 처리하는 단계의 products는 상품별 출력 행 수이며 실행 시간은 단계 전체 값)
+    - 다른 프로세스에서 실행한 단계(그래프 렌더링 등)는 record로 실행 시간을 받아 기록
+    - summary: 단계별 호출 횟수, 총/최대 실행 시간, 총 입출력 행 수, 메모리 변화 합계
+      (실행 시간은 안쪽 단계를 포함한 시간)
+    - profile_stage를 지정하면 해당 단계의 모든 호출을 하나의 cProfile 결과로 모아 <trace 경로>.<단계명>.prof에 저장
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self.profile_stage = None
+        self.events = []
+        self._profiler = None
+        self._started = None
+        self._depth = 0
+
+    def enable(self, trace_path=None, profile_stage=None):
+        if trace_path is None:
+            trace_path = os.path.join(TRACE_DIR, f"trace_{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}.json")
+
+        if not self.enabled:
+            atexit.register(self.write)
+
+        self.enabled = True
+        self.trace_path = trace_path
+        self.profile_stage = profile_stage
+        self._started = time.perf_counter()
+        if profile_stage is not None and self._profiler is None:
+            self._profiler = cProfile.Profile()
+
+    def disable(self):
+        self.enabled = False
+
+    def stage(self, name, rows_in=None, product_id=None):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows_in, product_id)
+
+    def record(self, name, wall_time, start=None, rows_in=None, rows_out=None, rss_delta_mb=None, product_id=None, products=None, error=None):
+        """
+        단계 실행 기록 하나를 추가합니다. (start는 계측 시작 이후 경과 시간, 없으면 현재 시각에서 wall_time을 뺀 값)
+        """
+        if start is None:
+            start = time.perf_counter() - self._started - wall_time
+        self.events.append({
+            "name": name,
+            "product_id": product_id,
+            "start": start,
+            "wall_time": wall_time,
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+            "rss_delta_mb": rss_delta_mb,
+            "products": products,
+            "error": error,
+        })
+
+    def summary(self):
+        """
+        단계별 통계를 총 실행 시간이 긴 순서로 반환합니다.
+        """
+        stages = {}
+        for event in self.events:
+            stats = stages.setdefault(event["name"], {
+                "calls": 0,
+                "wall_time": 0.0,
+                "max_wall_time": 0.0,
+                "rows_in": 0,
+                "rows_out": 0,
+                "rss_delta_mb": 0.0,
+                "products": 0,
+            })
+            stats["calls"] += 1
+            stats["wall_time"] += event["wall_time"]
+            stats["max_wall_time"] = max(stats["max_wall_time"], event["wall_time"])
+            stats["rows_in"] += event["rows_in"] or 0
+            stats["rows_out"] += event["rows_out"] or 0
+            stats["rss_delta_mb"] += event["rss_delta_mb"] or 0.0
+            stats["products"] += len(event["products"]) if event["products"] else int(event["product_id"] is not None)
+
+        return dict(sorted(stages.items(), key=lambda item: item[1]["wall_time"], reverse=True))
+
+    def write(self, trace_path=None):
+        """
+        기록된 단계를 JSON trace 파일로 저장합니다. (계측을 켜면 프로그램 종료 시 자동 호출)
+        """
+        trace_path = trace_path or self.trace_path
+        if trace_path is None or not self.events:
+            return None
+
+        summary = self.summary()
+        trace = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "total_wall_time": time.perf_counter() - self._started,
+            "peak_rss_mb": peak_rss_mb(),
+            "hottest_stage": next(iter(summary), None),
+            "summary": summary,
+            "events": self.events,
+        }
+
+        os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+        with open(trace_path, "w") as f:
+            json.dump(trace, f, indent=2, ensure_ascii=False, default=str)
+
+        if self._profiler is not None:
+            profile_path = f"{os.path.splitext(trace_path)[0]}.{self.profile_stage}.prof"
+            self._profiler.dump_stats(profile_path)
+            print(f"✅ {self.profile_stage} 단계 cProfile 결과가 {profile_path} 파일에 저장되었습니다!")
+
+        print(f"✅ 단계별 실행 기록이 {trace_path} 파일에 저장되었습니다! (가장 오래 걸린 단계: {trace['hottest_stage']})")
+        self.events = []
+        return trace_path
+
+class _Stage:
+    def __init__(self, tracer, name, rows_in, product_id):
+        self.tracer = tracer
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.product_id = product_id
+        self.products = None
+        self._profiling = False
+
+    def set_rows_out(self, rows_out):
+        self.rows_out = rows_out
+
+    def set_product_rows(self, product_ids):
+        """
+        한 번에 여러 상품을 처리하는 단계에서 상품별 출력 행 수를 기록합니다. (실행 시간은 상품별로 나누지 않음)
+        """
+        self.products = {str(product_id): int(count) for product_id, count in pd.Series(product_ids).value_counts(sort=False).items()}
+
+    def __enter__(self):
+        tracer = self.tracer
+        self._rss = current_rss_mb()
+        self._offset = time.perf_counter() - tracer._started
+
+        # 중첩 호출 시 profiler를 다시 켜지 않음
+        if self.name == tracer.profile_stage and tracer._depth == 0:
+            self._profiling = True
+            tracer._profiler.enable()
+        if self.name == tracer.profile_stage:
+            tracer._depth += 1
+
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_time = time.perf_counter() - self._start
+        tracer = self.tracer
+
+        if self.name == tracer.profile_stage:
+            tracer._depth -= 1
+        if self._profiling:
+            tracer._profiler.disable()
+
+        rss = current_rss_mb()
+        tracer.record(
+            self.name,
+            wall_time,
+            start=self._offset,
+            rows_in=self.rows_in,
+            rows_out=self.rows_out,
+            rss_delta_mb=rss - self._rss if rss is not None and self._rss is not None else None,
+            product_id=self.product_id,
+            products=self.products,
+            error=exc_type.__name__ if exc_type is not None else None,
+        )
+        return False
+
+class _NullStage:
+    def set_rows_out(self, rows_out):
+        pass
+
+    def set_product_rows(self, product_ids):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+tracer = StageTracer()
+
+def enable_tracing(trace_path=None, profile_stage=None):
+    tracer.enable(trace_path, profile_stage)
+
+def trace_stage(name, rows_in=None, product_id=None):
+    """
+    with 문으로 단계를 계측합니다.
+
+        with trace_stage("merge", rows_in=len(transactions)) as stage:
+            ...
+            stage.set_rows_out(len(merged))
+    """
+    return tracer.stage(name, rows_in, product_id)
+
+def traced(name=None):
+    """
+    함수 전체를 하나의 단계로 계측하는 데코레이터.
+    첫 번째 인자와 반환값이 DataFrame(또는 DataFrame 리스트의 첫 원소)이면 행 수를 입출력 행 수로 기록하고,
+    함수에 product_id 인자가 있으면 상품 ID를(상품별 실행 시간), 반환값에 product_id 컬럼이 있으면 상품별 출력 행 수를 함께 기록합니다.
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+        signature = inspect.signature(func)
+        takes_product_id = "product_id" in signature.parameters
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+
+            rows_in = _row_count(args[0]) if args else None
+            product_id = signature.bind_partial(*args, **kwargs).arguments.get("product_id") if takes_product_id else None
+            with tracer.stage(stage_name, rows_in, product_id) as stage:
+                result = func(*args, **kwargs)
+                stage.set_rows_out(_row_count(result))
+                # 여러 상품을 한 번에 처리한 결과면 상품별 행 수도 기록
+                if isinstance(result, pd.DataFrame) and "product_id" in result.columns:
+                    stage.set_product_rows(result["product_id"])
+            return result
+
+        return wrapper
+    return decorator
+
+def _row_count(value):
+    if isinstance(value, (list, tuple)) and value:
+        value = value[0]
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(value) if np.ndim(value) else 1
+    return None
+
+def current_rss_mb():
+    # /proc가 없거나 os.sysconf가 없는 환경(Windows 등)에서는 None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, AttributeError, ValueError):
+        return None
+
+def peak_rss_mb():
+    # Linux는 현재 주소 공간의 최대 RSS(VmHWM) 사용
+    # (ru_maxrss는 exec 이전 프로세스의 값까지 이어받으므로 spawn으로 만든 자식 프로세스에서도 부모의 최대값이 남음)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+
+    # resource 모듈은 Unix 전용이므로 없는 환경(Windows 등)에서는 None
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # ru_maxrss 단위: Linux는 KB, macOS는 byte
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1024 / 1024 if platform.system() == "Darwin" else max_rss / 1024
+
+# 환경 변수로 계측 켜기
+if os.environ.get(TRACE_ENV):
+    enable_tracing(
+        None if os.environ[TRACE_ENV] == "1" else os.environ[TRACE_ENV],
+        os.environ.get(PROFILE_ENV) or None
+    )
@@ -0,0 +1,32 @@
+#test_chart_queue.py
+#ChartQueue 워커에서 그린 그래프의 렌더링 시간이 부모 프로세스의 단계 기록(stage_trace)에 남는지 확인
+import time
+
+import pandas as pd
+import pytest
+
+from chart_queue import ChartQueue
+from stage_trace import tracer
+
+def fake_plot(data, product_id, save=False, show=False):
+    # 워커에서 실행되는 plot 함수 대신 사용 (모듈 최상위 함수여야 워커로 전달 가능)
+    time.sleep(0.05)
+
+@pytest.fixture
+def tracing(tmp_path):
+    tracer.enable(str(tmp_path / "trace.json"))
+    yield tracer
+    tracer.disable()
+    tracer.events = []
+
+def test_worker_render_time_is_traced(tracing):
+    data = pd.DataFrame({"resell_index": [100.0, 101.0, 102.0]})
+
+    with ChartQueue(max_workers=1) as charts:
+        charts.submit(fake_plot, data, 123, save=True)
+        charts.submit(fake_plot, data, 456, save=True)
+
+    events = [event for event in tracing.events if event["name"] == "fake_plot"]
+    assert [event["product_id"] for event in events] == [123, 456]
+    assert all(event["rows_in"] == 3 and event["wall_time"] >= 0.05 for event in events)
+    assert tracing.summary()["fake_plot"]["calls"] == 2
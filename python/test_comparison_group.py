@@ -0,0 +1,54 @@
+#test_comparison_group.py
+#compare_with_benchmarks의 이동 상관계수, 베타, 변동성 비율이 pandas rolling으로 계산한 값과 같은지 확인
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils
+from comparison_group import compare_with_benchmarks
+
+def _write_stock_index(path, days, closes):
+    # 원본 파일과 같은 형식 (BOM 한글 헤더, 최신순, "2025- 02- 14" 날짜, 천 단위 구분 종가)
+    rows = [
+        f'"{day:%Y- %m- %d}","{close:,.2f}","{close:,.2f}","{close:,.2f}","{close:,.2f}","1.00M","0.00%"'
+        for day, close in zip(days[::-1], closes[::-1])
+    ]
+    path.write_text('"날짜","종가","시가","고가","저가","거래량","변동 %"\n' + "\n".join(rows) + "\n", encoding="utf-8-sig")
+
+@pytest.fixture
+def benchmarks(tmp_path, monkeypatch):
+    # 주말이 빠진 평일 종가 두 개를 임시 폴더에 저장
+    monkeypatch.setattr(utils, "STOCK_INDEX_PATH", str(tmp_path))
+    rng = np.random.default_rng(11)
+    days = pd.bdate_range("2025-01-10", "2025-02-14")
+    for name in ("kospi", "snp500"):
+        closes = np.round(2500 * np.cumprod(1 + rng.normal(0, 0.01, len(days))), 2)
+        _write_stock_index(tmp_path / f"{name}.csv", days, closes)
+    return ["kospi", "snp500"]
+
+def test_rolling_statistics_match_pandas(benchmarks):
+    rng = np.random.default_rng(3)
+    days = pd.date_range("2025-01-15", "2025-02-14", freq="D", tz="UTC")
+    levels = 100 * np.cumprod(1 + rng.normal(0, 0.02, len(days)))
+    # 지수가 없는 시점: 앞뒤 수익률이 NaN이 되어 그 시점을 포함한 window는 NaN
+    levels[12] = np.nan
+    resell_index = pd.DataFrame({"date_created": days, "market_resell_index": levels})
+
+    [aligned, comparison] = compare_with_benchmarks(resell_index, benchmarks, windows=(5, 10))
+
+    resell_return = pd.Series(levels).pct_change(fill_method=None)
+    for benchmark in benchmarks:
+        benchmark_return = aligned[benchmark].pct_change(fill_method=None)
+        np.testing.assert_allclose(aligned[f"{benchmark}_return"], benchmark_return)
+
+        for window in (5, 10):
+            rows = comparison[(comparison["benchmark"] == benchmark) & (comparison["window"] == window)]
+            rolling_x = benchmark_return.rolling(window)
+            expected_correlation = resell_return.rolling(window).corr(benchmark_return)
+            expected_beta = resell_return.rolling(window).cov(benchmark_return) / rolling_x.var()
+            expected_ratio = resell_return.rolling(window).std() / rolling_x.std()
+
+            assert rows["correlation"].notna().sum() > 0 and rows["correlation"].isna().sum() > window
+            np.testing.assert_allclose(rows["correlation"], expected_correlation, rtol=1e-7, atol=1e-10)
+            np.testing.assert_allclose(rows["beta"], expected_beta, rtol=1e-7, atol=1e-10)
+            np.testing.assert_allclose(rows["volatility_ratio"], expected_ratio, rtol=1e-7, atol=1e-10)
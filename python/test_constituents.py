@@ -0,0 +1,52 @@
+#test_constituents.py
+#리밸런싱 날짜에 제수를 조정하여 편입 상품이 바뀌어도 지수 수준이 이어지는지 확인
+import numpy as np
+import pandas as pd
+import pytest
+
+from constituents import ConstituentSelector, calculate_rebalanced_market_index
+
+DAYS = pd.date_range("2025-01-15", periods=10, freq="D")
+
+@pytest.fixture
+def selector():
+    # 1월 15일에는 상품 1, 2가, 1월 20일에는 상품 2, 3이 거래량 상위 2개
+    volumes = np.ones((len(DAYS), 3), dtype="int64")
+    volumes[0] = [9, 8, 1]
+    volumes[5] = [1, 8, 9]
+    return ConstituentSelector([1, 2, 3], DAYS.to_numpy().astype("datetime64[D]"), volumes)
+
+@pytest.fixture
+def products_index():
+    levels = {
+        1: np.linspace(100, 118, len(DAYS)),
+        2: np.linspace(100, 91, len(DAYS)),
+        3: np.linspace(140, 185, len(DAYS)),
+    }
+    return pd.concat([
+        pd.DataFrame({"date_created": DAYS, "resell_index": product_levels, "product_id": product_id})
+        for product_id, product_levels in levels.items()
+    ], ignore_index=True)
+
+def test_divisor_keeps_level_continuous_across_rebalance(selector, products_index):
+    [index, constituents] = calculate_rebalanced_market_index(products_index, selector, ["2025-01-15", "2025-01-20"], k=2)
+
+    assert [sorted(product_ids) for _, product_ids in constituents] == [[1, 2], [2, 3]]
+    levels = products_index.pivot(index="date_created", columns="product_id", values="resell_index")
+    old_raw = levels[[1, 2]].mean(axis=1).to_numpy()
+    new_raw = levels[[2, 3]].mean(axis=1).to_numpy()
+    market = index["market_resell_index"].to_numpy()
+    divisors = index["divisor"].to_numpy()
+    switch = 5
+
+    # 첫 구간은 기준일 평균이 100
+    assert market[0] == pytest.approx(100)
+    np.testing.assert_allclose(market[:switch], old_raw[:switch] / old_raw[0] * 100)
+
+    # 리밸런싱 날짜의 지수는 이전 편입 상품으로 계산한 값과 같고, 제수만 바뀜
+    assert market[switch] == pytest.approx(old_raw[switch] / divisors[0])
+    assert divisors[switch] == pytest.approx(divisors[0] * new_raw[switch] / old_raw[switch])
+    assert np.all(divisors[:switch] == divisors[0]) and np.all(divisors[switch:] == divisors[switch])
+
+    # 이후 변화율은 새 편입 상품 평균의 변화율을 따름
+    np.testing.assert_allclose(market[switch:] / market[switch], new_raw[switch:] / new_raw[switch])
@@ -0,0 +1,25 @@
+#test_data_processing.py
+#기준일 보정(get_adjusted_baselines)의 가장 가까운 거래일 선택과 보간 기록 확인
+import pandas as pd
+
+from data_processing import get_adjusted_baselines
+
+BASELINE_DATE = "2025-01-15T00:00:00Z"
+
+def test_closest_trading_day_logs_only_adjusted_products():
+    # 상품 1은 기준일에 거래가 있고, 상품 2는 기준일 이틀 뒤부터 거래됨
+    bucket_data = pd.DataFrame({
+        "product_id": [1, 1, 2, 2],
+        "date_created": pd.to_datetime(["2025-01-15 01:00", "2025-01-16 01:00", "2025-01-17 01:00", "2025-01-18 01:00"], utc=True),
+        "avg_price": [100.0, 110.0, 200.0, 210.0],
+        "total_volume": [1.0, 2.0, 3.0, 4.0],
+    })
+
+    baselines, logs = get_adjusted_baselines(bucket_data, BASELINE_DATE)
+
+    assert list(baselines["closest_date"]) == [pd.Timestamp("2025-01-15"), pd.Timestamp("2025-01-17")]
+    assert list(baselines["baseline_price"]) == [100.0, 200.0]
+    assert [(log["product_id"], log["column"], log["new_value"]) for log in logs] == [
+        (2, "baseline_price", 200.0),
+        (2, "baseline_volume", 3.0),
+    ]
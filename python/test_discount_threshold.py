@@ -0,0 +1,73 @@
+#test_discount_threshold.py
+#DiscountVolumeThreshold가 get_discount_volume_threshold와 같은 임계값을 유지하고, window_days 구간이 마지막 거래일 기준으로 이동하는지 확인
+import numpy as np
+import pandas as pd
+import pytest
+
+from discount_threshold import DiscountVolumeThreshold
+from resell_utils import get_discount_volume_threshold
+
+BASELINE_PRICES = {1: 100000, 2: 200000}
+
+def _trades(rows):
+    return pd.DataFrame(rows, columns=["product_id", "price", "date_created"]).assign(
+        date_created=lambda df: pd.to_datetime(df["date_created"], utc=True)
+    )
+
+@pytest.fixture
+def trades():
+    rng = np.random.default_rng(7)
+    days = pd.date_range("2025-01-15", periods=40, freq="D", tz="UTC")
+    rows = [
+        (product_id, int(BASELINE_PRICES[product_id] * rng.uniform(0.7, 1.3)), day + pd.Timedelta(hours=int(rng.integers(24))))
+        for day in days
+        for product_id in BASELINE_PRICES
+        for _ in range(int(rng.integers(0, 6)))
+    ]
+    return _trades(rows)
+
+def test_matches_get_discount_volume_threshold(trades):
+    thresholds = DiscountVolumeThreshold(BASELINE_PRICES)
+    thresholds.add_trades(trades)
+
+    for product_id, baseline_price in BASELINE_PRICES.items():
+        expected = get_discount_volume_threshold(trades[trades["product_id"] == product_id], baseline_price)
+        assert thresholds.threshold(product_id) == pytest.approx(expected)
+
+def test_window_matches_recent_days(trades):
+    # 거래를 하나씩 넣어도, 한 번에 넣어도 마지막 거래일 기준 최근 7일의 할인 거래만 반영
+    batch = DiscountVolumeThreshold(BASELINE_PRICES, window_days=7)
+    batch.add_trades(trades)
+    single = DiscountVolumeThreshold(BASELINE_PRICES, window_days=7)
+    for row in trades.sort_values("date_created").itertuples():
+        single.add_trade(row.product_id, row.price, row.date_created)
+
+    for product_id, baseline_price in BASELINE_PRICES.items():
+        product_trades = trades[trades["product_id"] == product_id]
+        last_day = product_trades["date_created"].max().normalize()
+        recent = product_trades[product_trades["date_created"] > last_day - pd.Timedelta(days=6)]
+        expected = get_discount_volume_threshold(recent, baseline_price)
+        assert batch.threshold(product_id) == pytest.approx(expected)
+        assert single.threshold(product_id) == pytest.approx(expected)
+
+def test_window_expires_with_non_discount_trades():
+    # 할인 거래가 많은 7일 뒤 100일 동안 할인 거래가 아닌 거래만 들어온 경우
+    discount_days = _trades([(1, 80000, f"2025-01-{day:02d}T10:00:00") for day in range(1, 8) for _ in range(day + 2)])
+    later_days = _trades([(1, 120000, day) for day in pd.date_range("2025-01-08T10:00:00", periods=100, freq="D")])
+
+    batch = DiscountVolumeThreshold(BASELINE_PRICES, window_days=7)
+    batch.add_trades(discount_days)
+    assert batch.threshold(1) == 6
+
+    batch.add_trades(later_days)
+    assert batch.threshold(1) == batch.default_threshold
+    assert not batch._daily_counts[1]
+
+    single = DiscountVolumeThreshold(BASELINE_PRICES, window_days=7)
+    single.add_trades(discount_days)
+    single.add_trade(1, 120000, pd.Timestamp("2025-01-20T10:00:00Z"))
+    assert single.threshold(1) == single.default_threshold
+
+    # 구간 밖으로 밀려난 날짜에 늦게 도착한 할인 거래는 무시
+    single.add_trade(1, 80000, pd.Timestamp("2025-01-05T10:00:00Z"))
+    assert single.threshold(1) == single.default_threshold
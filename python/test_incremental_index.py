@@ -0,0 +1,127 @@
+#test_incremental_index.py
+#체크포인트 이후 늦게 도착한 거래가 select_new_transactions로 선택되고, 영향받은 구간만 다시 계산되는지 확인
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing import interpolation_logs
+from incremental_index import build_index_state, select_new_transactions, update_index_state
+
+BASELINE_DATE = "2025-01-15T00:00:00Z"
+
+PRODUCT_META = pd.DataFrame({
+    "product_id": [1, 2],
+    "name": ["product 1", "product 2"],
+    "original_price": [100000, 200000],
+    "brand": ["brand", "brand"],
+})
+
+def _transactions(rows):
+    return pd.DataFrame(rows, columns=["product_id", "price", "option", "date_created"]).assign(
+        date_created=lambda df: pd.to_datetime(df["date_created"], utc=True)
+    )
+
+@pytest.fixture
+def trades():
+    # 두 상품 모두 매일 01시, 05시, 09시에 프리미엄 거래 (할인 거래량 임계값이 바뀌지 않도록)
+    rows = []
+    for day in pd.date_range("2025-01-15", "2025-01-18", freq="D"):
+        for hour in (1, 5, 9):
+            timestamp = (day + pd.Timedelta(hours=hour)).isoformat()
+            rows.append((1, 110000 + hour * 1000 + day.day * 100, "260", timestamp))
+            rows.append((2, 230000 + hour * 1000 + day.day * 100, "270", timestamp))
+    return _transactions(rows)
+
+@pytest.fixture
+def late_trades():
+    return _transactions([
+        # 체크포인트보다 이전 시각에 늦게 도착한 거래
+        (1, 150000, "260", "2025-01-16T05:30:00"),
+        # 체크포인트(마지막 거래 시각)와 같은 시각에 늦게 도착한 거래
+        (1, 140000, "265", "2025-01-18T09:00:00"),
+    ])
+
+def test_select_new_transactions_includes_late_trades(trades, late_trades):
+    state = build_index_state(trades, PRODUCT_META, [1, 2], BASELINE_DATE)
+    assert state["last_processed"] == pd.Timestamp("2025-01-18T09:00:00Z")
+
+    transactions = pd.concat([trades, late_trades], ignore_index=True)
+    selected = select_new_transactions(transactions, state)
+    pd.testing.assert_frame_equal(selected.reset_index(drop=True), late_trades)
+
+    update_index_state(state, selected)
+    assert select_new_transactions(transactions, state).empty
+
+def test_select_new_transactions_counts_identical_trades(trades):
+    state = build_index_state(trades, PRODUCT_META, [1, 2], BASELINE_DATE)
+
+    # 이미 반영한 거래와 값이 모두 같은 거래가 한 건 더 들어온 경우
+    duplicate = trades.iloc[[4]]
+    selected = select_new_transactions(pd.concat([trades, duplicate], ignore_index=True), state)
+    assert len(selected) == 1
+
+def test_late_trade_emits_only_affected_buckets(trades, late_trades):
+    state = build_index_state(trades, PRODUCT_META, [1, 2], BASELINE_DATE)
+    transactions = pd.concat([trades, late_trades], ignore_index=True)
+
+    emitted = update_index_state(state, select_new_transactions(transactions, state))
+
+    assert emitted["24h"]["date_created"].tolist() == [pd.Timestamp("2025-01-16"), pd.Timestamp("2025-01-18")]
+    assert emitted["4h"]["date_created"].tolist() == [pd.Timestamp("2025-01-16T04:00:00Z"), pd.Timestamp("2025-01-18T08:00:00Z")]
+
+    # 늦게 도착한 거래를 반영한 결과는 전체 재계산과 같음
+    rebuilt = build_index_state(transactions, PRODUCT_META, [1, 2], BASELINE_DATE)
+    for granularity in ("24h", "4h"):
+        pd.testing.assert_frame_equal(state["series"][granularity], rebuilt["series"][granularity], check_dtype=False)
+
+def test_24h_base_follows_updated_discount_threshold():
+    # 상품 1의 기준일 할인 거래(1건)는 처음에는 임계값(1) 이상이지만,
+    # 이후 할인 거래가 많은 날이 들어오면 임계값이 올라가 기준일 지수 값이 바뀜
+    first = _transactions([
+        (1, 90000, "260", "2025-01-15T01:00:00"),
+        (2, 230000, "270", "2025-01-15T02:00:00"),
+    ])
+    later = _transactions(
+        [(1, 80000, "260", f"2025-01-{day}T0{hour}:00:00") for day in (16, 17) for hour in (1, 2, 3)]
+        + [(2, 240000, "270", f"2025-01-{day}T02:00:00") for day in (16, 17)]
+    )
+    transactions = pd.concat([first, later], ignore_index=True)
+
+    state = build_index_state(first, PRODUCT_META, [1, 2], BASELINE_DATE)
+    emitted = update_index_state(state, select_new_transactions(transactions, state))
+    rebuilt = build_index_state(transactions, PRODUCT_META, [1, 2], BASELINE_DATE)
+
+    series = state["series"]["24h"]
+    assert series["market_resell_index"].iloc[0] == pytest.approx(100)
+    pd.testing.assert_frame_equal(series, rebuilt["series"]["24h"], check_dtype=False)
+
+    # 기준값이 바뀌었으므로 기준일을 포함한 전체 24시간 구간을 다시 반환
+    assert emitted["24h"]["date_created"].tolist() == series["date_created"].tolist()
+
+def test_baseline_day_split_across_updates_matches_rebuild():
+    # 상품 2는 발매가가 없어 4시간 지수의 기준 가격을 첫 거래일 구간 평균 가격으로 보정
+    product_meta = PRODUCT_META.assign(original_price=[100000, np.nan])
+    rows = []
+    for day in pd.date_range("2025-01-15", "2025-01-17", freq="D"):
+        for hour in (1, 2, 5, 6, 7, 9, 13):
+            timestamp = (day + pd.Timedelta(hours=hour)).isoformat()
+            rows.append((1, 90000 + hour * 3000 + day.day * 500, "260", timestamp))
+            if hour % 2:
+                rows.append((2, 180000 + hour * 4000 - day.day * 700, "270", timestamp))
+    transactions = _transactions(rows)
+
+    with interpolation_logs.capture():
+        # 기준일 05시에 상태를 만든 뒤, 기준일 나머지 거래와 이후 거래를 두 번에 나누어 반영
+        state = build_index_state(transactions[transactions["date_created"] < "2025-01-15T05:00:00Z"], product_meta, [1, 2], BASELINE_DATE)
+        for cutoff in ("2025-01-16T00:00:00Z", "2025-01-18T00:00:00Z"):
+            update_index_state(state, select_new_transactions(transactions[transactions["date_created"] < cutoff], state))
+        rebuilt = build_index_state(transactions, product_meta, [1, 2], BASELINE_DATE)
+
+    for granularity in ("24h", "4h"):
+        pd.testing.assert_frame_equal(
+            state["baselines"][granularity][["baseline_price", "baseline_volume"]],
+            rebuilt["baselines"][granularity][["baseline_price", "baseline_volume"]].loc[state["baselines"][granularity].index]
+        )
+        pd.testing.assert_frame_equal(state["series"][granularity], rebuilt["series"][granularity], check_dtype=False)
+
+    assert state["baselines"]["24h"].loc[1, "baseline_volume"] == 7
@@ -0,0 +1,146 @@
+#test_resell_market_index.py
+#상품 × 구간 집계(큐브) 경로가 상품별로 거래를 직접 계산하던 방식과 같은 값을 내는지 확인
+import numpy as np
+import pandas as pd
+import pytest
+
+from resell_index import calculate_product_resell_index, calculate_products_resell_index
+from resell_market_index import aggregate_product_4h_data, calculate_resell_market_index_4h, compute_product_resell_index_4h, rebase_market_index
+from resell_utils import get_discount_volume_threshold
+from data_processing import get_adjusted_baselines, interpolation_logs
+
+BASELINE_DATE = "2025-01-15T00:00:00Z"
+
+@pytest.fixture(autouse=True)
+def captured_interpolation_logs():
+    # 보간 기록을 output/interpolation_log.csv에 쓰지 않도록 테스트 안에서만 모음
+    with interpolation_logs.capture() as captured:
+        yield captured
+
+@pytest.fixture
+def product_meta():
+    # 상품 2는 발매가가 없어 보정 가격(기준일 평균 가격)을 기준 가격으로 사용
+    return pd.DataFrame({
+        "product_id": [1, 2],
+        "name": ["product 1", "product 2"],
+        "original_price": [100000, np.nan],
+        "brand": ["brand", "brand"],
+    })
+
+@pytest.fixture
+def transactions():
+    rows = []
+    prices = {
+        1: [90000, 95000, 120000, 80000, 85000, 130000],
+        # 기준일 평균 가격(200000)보다 낮은 거래가 날마다 다른 건수로 있음
+        2: [200000, 210000, 190000, 150000, 160000, 170000],
+    }
+    for day_offset in range(4):
+        day = pd.Timestamp("2025-01-15", tz="UTC") + pd.Timedelta(days=day_offset)
+        for product_id, product_prices in prices.items():
+            count = 2 + day_offset if product_id == 1 else 3
+            for position in range(count):
+                price = product_prices[(position + day_offset * product_id) % len(product_prices)]
+                rows.append((product_id, price, "260", day + pd.Timedelta(hours=1 + position * 3)))
+    return pd.DataFrame(rows, columns=["product_id", "price", "option", "date_created"])
+
+def test_4h_threshold_uses_adjusted_price_for_products_without_original_price(transactions, product_meta):
+    product_data_4h = aggregate_product_4h_data(transactions, product_meta, [1, 2], BASELINE_DATE)
+    thresholds = product_data_4h.drop_duplicates("product_id").set_index("product_id")
+
+    adjusted_price = get_adjusted_baselines(product_data_4h[product_data_4h["product_id"] == 2], BASELINE_DATE, log_columns=())[0].loc[2, "baseline_price"]
+    assert thresholds.loc[2, "baseline_price"] == pytest.approx(adjusted_price)
+
+    for product_id, baseline_price in ((1, 100000), (2, adjusted_price)):
+        expected = get_discount_volume_threshold(transactions[transactions["product_id"] == product_id], baseline_price)
+        assert thresholds.loc[product_id, "discount_volume_threshold"] == pytest.approx(expected)
+
+    # 보정 가격 기준 할인 거래가 있으므로 기본 임계값(1)이 아님
+    assert thresholds.loc[2, "discount_volume_threshold"] > 1
+
+def test_24h_batch_matches_per_product(transactions, product_meta):
+    batch = calculate_products_resell_index(transactions, product_meta, [1, 2], BASELINE_DATE, 0.3)
+
+    for product_id in (1, 2):
+        expected = calculate_product_resell_index(transactions, product_meta, product_id, BASELINE_DATE, 0.3)
+        actual = batch[batch["product_id"] == product_id]
+        np.testing.assert_allclose(actual["resell_index"].to_numpy(dtype=float), expected["resell_index"].to_numpy(dtype=float), rtol=1e-12)
+
+def test_weighted_4h_renormalizes_over_products_with_index():
+    product_meta = pd.DataFrame({
+        "product_id": [1, 2],
+        "name": ["product 1", "product 2"],
+        "original_price": [100000, 200000],
+        "brand": ["brand", "brand"],
+    })
+    transactions = pd.DataFrame([
+        (1, 110000, "260", "2025-01-15T01:00:00Z"),
+        (2, 220000, "270", "2025-01-15T02:00:00Z"),
+        # 04시 구간: 상품 2는 거래 없음
+        (1, 120000, "260", "2025-01-15T05:00:00Z"),
+        # 08시 구간: 두 상품 모두 거래 없음
+        (1, 130000, "260", "2025-01-15T13:00:00Z"),
+        (2, 240000, "270", "2025-01-15T14:00:00Z"),
+    ], columns=["product_id", "price", "option", "date_created"]).assign(date_created=lambda df: pd.to_datetime(df["date_created"]))
+
+    product_data_4h = aggregate_product_4h_data(transactions, product_meta, [1, 2], BASELINE_DATE)
+    product_index = product_data_4h.assign(resell_index=compute_product_resell_index_4h(product_data_4h, [0.1]).iloc[:, 0].to_numpy())
+    product_index = product_index.pivot(index="date_created", columns="product_id", values="resell_index")
+    bucket_04, bucket_08 = pd.Timestamp("2025-01-15T04:00:00Z"), pd.Timestamp("2025-01-15T08:00:00Z")
+
+    markets = {
+        weighting: calculate_resell_market_index_4h(transactions, product_meta, [1, 2], BASELINE_DATE, weighting=weighting).set_index("date_created")["market_resell_index"]
+        for weighting in ("mean", "volume", "laspeyres", "paasche")
+    }
+
+    # 거래량 가중: 거래가 없는 상품 2는 가중치 0, 거래한 상품 1만으로 다시 정규화
+    assert markets["volume"][bucket_04] == pytest.approx(product_index.loc[bucket_04, 1])
+    assert markets["paasche"][bucket_04] == pytest.approx(product_index.loc[bucket_04, 1])
+
+    # 라스파이레스: 기준 가중치는 그대로, 상품 2는 보정된 지수로 포함 (단순 평균과 같은 결측 처리)
+    weights = np.array([100000 * 1, 200000 * 1])
+    assert markets["laspeyres"][bucket_04] == pytest.approx(np.average(product_index.loc[bucket_04, [1, 2]], weights=weights))
+
+    # 모든 상품의 가중치가 0인 구간은 0이 아니라 단순 평균과 같음
+    for weighting in ("volume", "paasche"):
+        assert markets[weighting][bucket_08] == pytest.approx(markets["mean"][bucket_08])
+        assert markets[weighting][bucket_08] > 0
+
+def test_4h_workers_match_serial_and_merge_interpolation_logs(transactions, product_meta, captured_interpolation_logs):
+    # 상품 2는 기준일 다음 날부터 거래되어 가장 가까운 거래일로 기준 가격을 보정함
+    transactions = transactions[(transactions["product_id"] != 2) | (transactions["date_created"] >= "2025-01-16")]
+
+    serial = calculate_resell_market_index_4h(transactions, product_meta, [1, 2], BASELINE_DATE)
+    serial_logs = list(captured_interpolation_logs)
+    captured_interpolation_logs.clear()
+
+    parallel = calculate_resell_market_index_4h(transactions, product_meta, [1, 2], BASELINE_DATE, workers=2)
+
+    pd.testing.assert_frame_equal(parallel, serial)
+    # 상품 2의 보정 기준 가격 기록은 워커에서 만들어져 부모 프로세스의 interpolation_logs로 합쳐짐
+    assert serial_logs and list(captured_interpolation_logs) == serial_logs
+
+def test_rebase_to_dates_missing_from_the_index():
+    # 1월 16일 시점이 빠진 4시간 간격 지수 (기준일이 없으면 이전 마지막 시점의 값을 기준으로 사용)
+    date_created = pd.date_range("2025-01-15", periods=12, freq="4h", tz="UTC").delete(range(6, 12)).append(
+        pd.date_range("2025-01-17", periods=3, freq="4h", tz="UTC"))
+    values = np.array([100.0, 110.0, 120.0, 130.0, 140.0, 150.0, 0.0, 160.0, 200.0])
+    resell_market_index = pd.DataFrame({"date_created": date_created, "market_resell_index": values})
+
+    baseline_dates = [
+        "2025-01-15T04:00:00Z",  # 같은 시점 → 110
+        "2025-01-15T06:00:00Z",  # 시점 사이 → 04:00의 110
+        "2025-01-16T12:00:00Z",  # 빠진 날 → 1월 15일 20:00의 150
+        "2025-01-14T00:00:00Z",  # 첫 시점 이전 → 첫 시점의 100
+        "2025-01-17T00:00:00Z",  # 기준값이 0 → 100
+        "2025-01-17T09:00:00+09:00",  # 다른 시간대 (UTC 00:00) → 0이므로 100
+    ]
+    rebased = rebase_market_index(resell_market_index, baseline_dates)
+
+    assert [baseline_date for baseline_date, _ in rebased] == baseline_dates
+    for (baseline_date, rebased_index), base_value in zip(rebased, [110.0, 110.0, 150.0, 100.0, 100.0, 100.0]):
+        np.testing.assert_allclose(rebased_index["market_resell_index"], values / base_value * 100, err_msg=baseline_date)
+        pd.testing.assert_series_equal(rebased_index["date_created"], resell_market_index["date_created"])
+
+    # 원본 지수는 바뀌지 않음
+    assert resell_market_index["market_resell_index"].tolist() == values.tolist()
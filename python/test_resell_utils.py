@@ -0,0 +1,42 @@
+#test_resell_utils.py
+#compute_resell_index_custom_vectorized가 원소마다 compute_resell_index_custom을 호출한 값과 같은지 확인
+import numpy as np
+import pytest
+
+from resell_utils import compute_resell_index_custom, compute_resell_index_custom_vectorized
+
+# (avg_price, total_volume, baseline_price, baseline_volume, alpha, discount_volume_threshold)
+CASES = {
+    "premium": (150000, 12, 100000, 10, 0.3, 2),
+    "premium_equal_price": (100000, 3, 100000, 10, 0.3, 2),
+    "counted_discount": (80000, 5, 100000, 10, 0.3, 2),
+    "discount_at_threshold": (80000, 2, 100000, 10, 0.3, 2),
+    "below_threshold_discount": (80000, 1, 100000, 10, 0.3, 2),
+    "zero_baseline_volume_premium": (150000, 12, 100000, 0, 0.3, 2),
+    "zero_baseline_volume_discount": (80000, 5, 100000, 0, 0.3, 2),
+    "nan_price": (np.nan, 5, 100000, 10, 0.3, 2),
+}
+
+def _assert_same(expected, actual):
+    np.testing.assert_allclose(actual, expected, rtol=1e-12, equal_nan=True)
+
+@pytest.mark.parametrize("case", CASES.values(), ids=CASES.keys())
+def test_vectorized_matches_scalar(case):
+    expected = compute_resell_index_custom(*case)
+    actual = compute_resell_index_custom_vectorized(*case)
+    _assert_same(expected, actual)
+
+def test_vectorized_matches_scalar_elementwise():
+    # 모든 분기가 섞인 배열을 한 번에 계산해도 원소별 결과와 같아야 함
+    columns = [np.array(values, dtype=float) for values in zip(*CASES.values())]
+    expected = [compute_resell_index_custom(*case) for case in CASES.values()]
+    actual = compute_resell_index_custom_vectorized(*columns)
+
+    assert actual.shape == (len(CASES),)
+    _assert_same(expected, actual)
+
+def test_vectorized_broadcasts_scalar_baselines():
+    avg_price = np.array([150000, 80000, 80000, np.nan])
+    total_volume = np.array([12, 5, 1, 5])
+    expected = [compute_resell_index_custom(price, volume, 100000, 0, 0.1, 2) for price, volume in zip(avg_price, total_volume)]
+    _assert_same(expected, compute_resell_index_custom_vectorized(avg_price, total_volume, 100000, 0, 0.1, 2))
@@ -0,0 +1,87 @@
+#test_transaction_store.py
+#read_only_frame으로 공유한 거래 데이터가 모든 쓰기 경로에서 ValueError를 발생시키고, 파생 결과는 일반 DataFrame인지 확인
+import numpy as np
+import pandas as pd
+import pytest
+
+from transaction_store import READ_ONLY_INPLACE_METHODS, ReadOnlyFrame, read_only_frame
+
+@pytest.fixture
+def frame():
+    return read_only_frame(pd.DataFrame({
+        "product_id": [1, 2, 2],
+        "price": [100000.0, np.nan, 120000.0],
+        "option": pd.Categorical(["260", "270", "260"]),
+        "date_created": ["2025-01-15T01:00:00Z", "2025-01-16T01:00:00Z", "2025-01-17T01:00:00Z"],
+    }))
+
+WRITES = {
+    "setitem": lambda df: df.__setitem__("price", 0.0),
+    "setitem_new_column": lambda df: df.__setitem__("volume", 1),
+    "delitem": lambda df: df.__delitem__("price"),
+    "loc": lambda df: df.loc.__setitem__((0, "price"), 0.0),
+    "loc_new_column": lambda df: df.loc.__setitem__((slice(None), "volume"), 1),
+    "iloc": lambda df: df.iloc.__setitem__((0, 1), 0.0),
+    "at": lambda df: df.at.__setitem__((0, "price"), 0.0),
+    "iat": lambda df: df.iat.__setitem__((0, 1), 0.0),
+    "insert": lambda df: df.insert(0, "volume", 1),
+    "pop": lambda df: df.pop("price"),
+    "update": lambda df: df.update(pd.DataFrame({"price": [0.0]})),
+    "fillna": lambda df: df.fillna({"price": 0.0}, inplace=True),
+    "replace": lambda df: df.replace(100000.0, 0.0, inplace=True),
+    "where": lambda df: df.where(df["product_id"] > 1, inplace=True),
+    "sort_values": lambda df: df.sort_values("price", inplace=True),
+    "sort_index": lambda df: df.sort_index(inplace=True),
+    "drop_duplicates": lambda df: df.drop_duplicates(inplace=True),
+    "clip": lambda df: df.clip(lower=0, inplace=True),
+    "drop": lambda df: df.drop(columns="price", inplace=True),
+    "dropna": lambda df: df.dropna(inplace=True),
+    "reset_index": lambda df: df.reset_index(inplace=True),
+    "set_index": lambda df: df.set_index("product_id", inplace=True),
+    "rename": lambda df: df.rename(columns={"price": "avg_price"}, inplace=True),
+    "rename_axis": lambda df: df.rename_axis("row", inplace=True),
+    "columns": lambda df: setattr(df, "columns", ["a", "b", "c", "d"]),
+    "index": lambda df: setattr(df, "index", [10, 11, 12]),
+    "iadd": lambda df: df.__iadd__(1),
+    "numpy": lambda df: df["price"].to_numpy().__setitem__(0, 0.0),
+    "category_codes": lambda df: df["option"].cat.codes.to_numpy().__setitem__(0, 1),
+}
+
+@pytest.mark.parametrize("write", WRITES.values(), ids=WRITES.keys())
+def test_writes_raise_and_leave_frame_unchanged(frame, write):
+    expected = frame.copy()
+
+    with pytest.raises(ValueError):
+        write(frame)
+
+    pd.testing.assert_frame_equal(pd.DataFrame(frame), expected)
+
+def test_inplace_methods_are_guarded():
+    # 설치된 pandas 버전에서 inplace 인자가 있는 공개 메서드를 찾아 모두 막음
+    assert {"fillna", "replace", "where", "sort_values", "rename", "reset_index", "set_index", "drop"} <= set(READ_ONLY_INPLACE_METHODS)
+    for name in READ_ONLY_INPLACE_METHODS:
+        assert getattr(ReadOnlyFrame, name) is not getattr(pd.DataFrame, name), name
+
+def test_reads_and_derived_frames(frame):
+    assert isinstance(frame, ReadOnlyFrame)
+    assert frame["date_created"].dtype == "datetime64[ns, UTC]"
+    assert frame.loc[0, "price"] == 100000.0 and frame.iloc[2, 1] == 120000.0
+
+    derived = {
+        "filter": frame[frame["product_id"] == 2],
+        "columns": frame[["product_id", "price"]],
+        "copy": frame.copy(),
+        "assign": frame.assign(volume=1),
+        "rename": frame.rename(columns={"price": "avg_price"}),
+        "sort_values": frame.sort_values("price"),
+        "fillna": frame.fillna({"price": 0.0}),
+        "groupby": frame.groupby("product_id", observed=True)[["price"]].mean(),
+        "merge": frame.merge(frame, on="product_id"),
+    }
+    for name, result in derived.items():
+        assert type(result) is pd.DataFrame, name
+
+    # 파생 결과는 자유롭게 수정 가능
+    result = derived["filter"].copy()
+    result["price"] = 0.0
+    assert frame["price"].iloc[2] == 120000.0
@@ -0,0 +1,87 @@
+#test_utils.py
+#load_transaction_data_window가 저장소와 CSV 청크 읽기 모두에서 구간 안의 거래만 빠짐없이 읽는지,
+#load_stock_index가 원본 주가 지수 CSV 형식을 타입이 지정된 값으로 바꾸는지 확인
+import numpy as np
+import pandas as pd
+import pytest
+
+import transaction_store
+import utils
+from utils import load_stock_index, load_transaction_data_window
+
+BASELINE_DATE = "2025-01-15T00:00:00Z"
+ENDLINE_DATE = "2025-01-20T00:00:00Z"
+
+def _write_trades(path, product_id, dates):
+    pd.DataFrame({
+        "product_id": product_id,
+        "price": [100000 + position for position in range(len(dates))],
+        "option": "260",
+        "date_created": dates,
+        "is_immediate_delivery_item": False,
+    }).to_csv(path, index=False)
+
+@pytest.fixture
+def source_dir(tmp_path, monkeypatch):
+    # ../source 대신 임시 폴더의 trading, store 폴더를 사용
+    monkeypatch.setattr(utils, "DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(transaction_store, "DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(transaction_store, "STORE_PATH", str(tmp_path / "store"))
+    trading_path = tmp_path / "trading"
+    trading_path.mkdir()
+    return trading_path
+
+def _expected(trading_path, product_ids):
+    frames = [transaction_store.read_transaction_csv(trading_path / f"{product_id}.csv") for product_id in product_ids]
+    transactions = pd.concat(frames, ignore_index=True)
+    in_window = (transactions["date_created"] >= BASELINE_DATE) & (transactions["date_created"] < ENDLINE_DATE)
+    return transactions[in_window]
+
+def _normalize(transactions):
+    return transactions.assign(option=transactions["option"].astype(str)).sort_values(["product_id", "date_created"]).reset_index(drop=True)
+
+def test_store_and_csv_windows_match_full_read(source_dir):
+    # 상품 1은 최신순, 상품 2는 청크 경계에서 순서가 어긋난 파일 (두 번째 청크 뒤에 구간 안 거래가 다시 나옴)
+    _write_trades(source_dir / "1.csv", 1, [f"2025-01-{day:02d}T10:00:00Z" for day in range(25, 5, -1)])
+    _write_trades(source_dir / "2.csv", 2, [
+        "2025-01-18T10:00:00Z", "2025-01-16T10:00:00Z",
+        "2025-01-19T10:00:00Z", "2025-01-10T10:00:00Z",
+        "2025-01-17T10:00:00Z", "2025-01-15T00:00:00Z",
+    ])
+    expected = _normalize(_expected(source_dir, [1, 2]))
+
+    from_store = load_transaction_data_window(BASELINE_DATE, ENDLINE_DATE, [1, 2])
+    from_csv = load_transaction_data_window(BASELINE_DATE, ENDLINE_DATE, [1, 2], chunksize=2, use_store=False)
+
+    pd.testing.assert_frame_equal(_normalize(from_store), expected)
+    pd.testing.assert_frame_equal(_normalize(from_csv), expected)
+    assert len(expected) == 5 + 5
+
+def test_csv_window_stops_after_newest_first_prefix(source_dir):
+    # 최신순 파일에서 구간 이전 거래 이후의 행은 읽지 않음 (읽으면 날짜 변환에서 실패하는 행)
+    _write_trades(source_dir / "1.csv", 1, ["2025-01-17T10:00:00Z", "2025-01-15T10:00:00Z", "2025-01-14T10:00:00Z", "2025-01-13T10:00:00Z", "not a date"])
+
+    transactions = load_transaction_data_window(BASELINE_DATE, ENDLINE_DATE, [1], chunksize=2, use_store=False)
+    assert transactions["date_created"].tolist() == [pd.Timestamp("2025-01-17T10:00:00Z"), pd.Timestamp("2025-01-15T10:00:00Z")]
+
+def test_load_stock_index_parses_investing_csv(tmp_path):
+    # 원본 파일과 같은 형식: BOM이 붙은 한글 헤더, 최신순, "2025- 02- 14" 날짜, 접미사 거래량, % 변동률
+    path = tmp_path / "kospi.csv"
+    path.write_text(
+        '"날짜","종가","시가","고가","저가","거래량","변동 %"\n'
+        '"2025- 02- 14","2,591.05","2,588.20","2,600.57","2,582.84","499.36M","0.31%"\n'
+        '"2025- 02- 13","2,583.17","2,558.95","2,583.74","2,555.98","680.34K","-1.36%"\n'
+        '"2025- 02- 12","2,548.39","2,540.00","2,550.00","2,530.00","1.2B",""\n',
+        encoding="utf-8-sig",
+    )
+
+    stock_index = load_stock_index(str(path))
+
+    assert list(stock_index.columns) == ["date", "close", "open", "high", "low", "volume", "change_pct"]
+    assert list(stock_index["date"]) == list(pd.to_datetime(["2025-02-12", "2025-02-13", "2025-02-14"]))
+    assert stock_index["close"].dtype == "float64" and stock_index["close"].tolist() == [2548.39, 2583.17, 2591.05]
+    np.testing.assert_allclose(stock_index["volume"], [1.2e9, 680340.0, 499360000.0])
+    np.testing.assert_allclose(stock_index["change_pct"], [np.nan, -1.36, 0.31])
+
+    korean = load_stock_index(str(path), english=False)
+    assert list(korean.columns) == ["날짜", "종가", "시가", "고가", "저가", "거래량", "변동 %"]
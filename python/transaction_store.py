@@ -0,0 +1,412 @@
+#transaction_store.py
+#거래 CSV 디렉터리를 타입이 지정된 상품별 파티션 저장소로 컴파일
+import argparse
+import functools
+import inspect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from stage_trace import traced
+
+# 데이터 경로 설정
+DATA_PATH = os.path.join('..', 'source')
+STORE_PATH = os.path.join(DATA_PATH, 'store')
+
+MANIFEST_FILENAME = "manifest.json"
+PARTITION_SUFFIX = ".pkl"
+
+# 저장소 포맷이 바뀌면 올려서 기존 파티션을 모두 다시 만들도록 함
+STORE_VERSION = 1
+
+TRANSACTION_COLUMNS = ["product_id", "price", "option", "date_created", "is_immediate_delivery_item"]
+
+def get_store_dir(source_dir):
+    return os.path.join(STORE_PATH, source_dir)
+
+def read_transaction_csv(file_path):
+    """
+    거래 CSV 파일 하나를 읽어 타입이 지정된 DataFrame으로 변환합니다.
+
+    - product_id: int64
+    - price: int32 (범위를 벗어나면 int64)
+    - option: category
+    - date_created: datetime64[ns, UTC]
+    - is_immediate_delivery_item: bool
+    """
+    df = pd.read_csv(
+        file_path,
+        dtype={"product_id": "int64", "price": "int64", "option": "str", "is_immediate_delivery_item": "bool"},
+    )
+    return to_typed_frame(df)
+
+def to_typed_frame(df):
+    """
+    거래 데이터 DataFrame의 컬럼 타입을 저장소 스키마에 맞게 변환합니다.
+    """
+    df = df[TRANSACTION_COLUMNS].copy()
+    df["product_id"] = df["product_id"].astype("int64")
+
+    price = df["price"].astype("int64")
+    if price.empty or (price.min() >= -2**31 and price.max() < 2**31):
+        price = price.astype("int32")
+    df["price"] = price
+
+    df["option"] = df["option"].astype("str").astype("category")
+    df["date_created"] = pd.to_datetime(df["date_created"], utc=True, format="ISO8601")
+    df["is_immediate_delivery_item"] = df["is_immediate_delivery_item"].astype("bool")
+    return df
+
+def to_compact_frame(df):
+    """
+    거래 데이터를 메모리를 적게 쓰는 스키마로 변환합니다. (compact 모드)
+
+    - product_id: int32 (범위를 벗어나면 int64 유지)
+    - price: uint32 (음수이거나 범위를 벗어나면 int32/int64 유지)
+    - option: category
+    - date_created: datetime64[ns, UTC] (내부 표현이 int64 epoch이므로 행당 8바이트, 파이프라인에서 그대로 사용)
+    - is_immediate_delivery_item: bool
+    - original_price 등 상품 단위 값은 행마다 두지 않고 ProductCatalog에서 조회
+    """
+    df = to_typed_frame(df) if not _is_typed(df) else df[TRANSACTION_COLUMNS].copy()
+
+    product_id = df["product_id"]
+    if product_id.empty or (product_id.min() >= -2**31 and product_id.max() < 2**31):
+        df["product_id"] = product_id.astype("int32")
+
+    price = df["price"]
+    if price.empty or (price.min() >= 0 and price.max() < 2**32):
+        df["price"] = price.astype("uint32")
+
+    return df
+
+def _is_typed(df):
+    return (
+        list(df.columns[:len(TRANSACTION_COLUMNS)]) == TRANSACTION_COLUMNS
+        and isinstance(df["date_created"].dtype, pd.DatetimeTZDtype)
+        and isinstance(df["option"].dtype, pd.CategoricalDtype)
+    )
+
+def memory_report(frames):
+    """
+    같은 거래 데이터를 여러 스키마로 읽은 DataFrame들의 컬럼별 메모리 사용량(MB)을 비교합니다.
+
+    Parameters:
+        frames (dict): {스키마 이름: DataFrame}
+
+    Returns:
+        pandas.DataFrame: 행은 컬럼과 total, 열은 스키마 이름 (문자열 등 object 컬럼은 실제 객체 크기 포함)
+    """
+    report = pd.DataFrame({
+        name: frame.memory_usage(index=False, deep=True) / 1024 / 1024
+        for name, frame in frames.items()
+    })
+    report.loc["total"] = report.sum()
+    return report
+
+class ReadOnlyFrame(pd.DataFrame):
+    """
+    여러 단계가 함께 읽는 거래 데이터 DataFrame. (read_only_frame으로 생성)
+
+    - 컬럼 추가/교체/삭제, .loc/.iloc/.at/.iat 쓰기, index/columns 할당, inplace=True 메서드, update, 복합 대입(+= 등)은 ValueError를 발생시킵니다.
+      (pandas 내부 메서드가 아닌 공개 메서드와 속성에서 값을 바꾸기 전에 막음)
+    - 숫자/카테고리 컬럼 값 배열도 쓰기 불가능하므로 to_numpy()나 컬럼 선택 뷰를 통한 수정도 실패합니다.
+    - 필터링, 정렬, groupby 등으로 만든 결과는 일반 DataFrame이므로 각 단계는 자신이 만든 결과만 수정합니다.
+      (수정이 필요하면 copy()로 복사본을 만들어 사용)
+    """
+
+    @property
+    def _constructor(self):
+        # pandas 하위 클래스 확장 방식: 파생 결과는 일반 DataFrame으로 만듦
+        return pd.DataFrame
+
+    def __setitem__(self, key, value):
+        _raise_read_only(f"컬럼 {key!r} 할당")
+
+    def __delitem__(self, key):
+        _raise_read_only(f"컬럼 {key!r} 삭제")
+
+    def insert(self, loc, column, value, allow_duplicates=False):
+        _raise_read_only(f"컬럼 {column!r} 추가")
+
+    def isetitem(self, loc, value):
+        _raise_read_only(f"{loc}번째 컬럼 할당")
+
+    def pop(self, item):
+        _raise_read_only(f"컬럼 {item!r} 삭제")
+
+    def update(self, other, *args, **kwargs):
+        _raise_read_only("update")
+
+    @property
+    def index(self):
+        return pd.DataFrame.index.__get__(self, type(self))
+
+    @index.setter
+    def index(self, labels):
+        _raise_read_only("인덱스 할당")
+
+    @property
+    def columns(self):
+        return pd.DataFrame.columns.__get__(self, type(self))
+
+    @columns.setter
+    def columns(self, labels):
+        _raise_read_only("컬럼 이름 할당")
+
+    @property
+    def loc(self):
+        return _ReadOnlyIndexer(super().loc, "loc")
+
+    @property
+    def iloc(self):
+        return _ReadOnlyIndexer(super().iloc, "iloc")
+
+    @property
+    def at(self):
+        return _ReadOnlyIndexer(super().at, "at")
+
+    @property
+    def iat(self):
+        return _ReadOnlyIndexer(super().iat, "iat")
+
+def _read_only_method(name):
+    # inplace 인자가 참이면 pandas 메서드를 호출하기 전에 막음
+    method = getattr(pd.DataFrame, name)
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if signature.bind(self, *args, **kwargs).arguments.get("inplace"):
+            _raise_read_only(f"{name}(inplace=True)")
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+def _read_only_operator(name):
+    def wrapper(self, other):
+        _raise_read_only(f"복합 대입({name})")
+
+    wrapper.__name__ = name
+    return wrapper
+
+# inplace 인자가 있는 공개 메서드 (fillna, sort_values, rename, reset_index 등, 설치된 pandas 버전에서 찾음)
+READ_ONLY_INPLACE_METHODS = [
+    name for name, member in inspect.getmembers(pd.DataFrame, inspect.isfunction)
+    if not name.startswith("_") and "inplace" in inspect.signature(member).parameters
+]
+for _name in READ_ONLY_INPLACE_METHODS:
+    setattr(ReadOnlyFrame, _name, _read_only_method(_name))
+
+for _name in ["__iadd__", "__isub__", "__imul__", "__itruediv__", "__ifloordiv__", "__imod__", "__ipow__", "__iand__", "__ior__", "__ixor__"]:
+    setattr(ReadOnlyFrame, _name, _read_only_operator(_name))
+
+class _ReadOnlyIndexer:
+    # 읽기는 pandas 인덱서에 그대로 위임하고 쓰기만 막음
+
+    def __init__(self, indexer, name):
+        self._indexer = indexer
+        self._name = name
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    def __setitem__(self, key, value):
+        _raise_read_only(f".{self._name}[...] 할당")
+
+    def __call__(self, axis=None):
+        return _ReadOnlyIndexer(self._indexer(axis), self._name)
+
+    def __getattr__(self, name):
+        return getattr(self._indexer, name)
+
+def _raise_read_only(operation):
+    raise ValueError(f"공유 거래 데이터는 읽기 전용입니다: {operation} 대신 필요한 값만 따로 계산하거나 copy()한 뒤 수정하세요.")
+
+def _read_only_values(series):
+    # 컬럼 값 배열을 복사하지 않고 쓰기 불가능으로 표시 (여러 컬럼을 묶은 2차원 블록이 아닌 컬럼별 배열을 잠금)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # cat.codes는 원래 코드 배열의 읽기 전용 뷰
+        return pd.Categorical.from_codes(series.cat.codes.to_numpy(), dtype=series.dtype, validate=False)
+
+    if isinstance(series.dtype, np.dtype):
+        values = series.to_numpy()
+        values.flags.writeable = False
+        return values
+
+    # datetime(시간대 포함) 등 확장 배열은 내부 배열이 있으면 잠그고 그대로 사용
+    values = series.array
+    if isinstance(getattr(values, "_ndarray", None), np.ndarray):
+        values._ndarray.flags.writeable = False
+    return values
+
+def read_only_frame(df):
+    """
+    거래 데이터를 파이프라인 전체가 복사 없이 공유하는 읽기 전용 DataFrame으로 바꿉니다.
+
+    date_created는 여기서 한 번만 datetime64[ns, UTC]로 맞추고(이미 맞으면 그대로),
+    이후 단계는 변환하거나 컬럼을 다시 쓰지 않고 그대로 읽습니다.
+    컬럼 값 배열은 복사하지 않고 쓰기 불가능으로 표시하므로, 원래 df도 더 이상 수정하지 않아야 합니다.
+    """
+    if isinstance(df, ReadOnlyFrame):
+        return df
+
+    if not isinstance(df["date_created"].dtype, pd.DatetimeTZDtype):
+        df = df.assign(date_created=pd.to_datetime(df["date_created"], utc=True, format="ISO8601"))
+
+    return ReadOnlyFrame({column: _read_only_values(df[column]) for column in df.columns}, index=df.index, copy=False)
+
+def as_datetime(values):
+    """
+    날짜 컬럼을 datetime으로 반환합니다. 이미 datetime 타입이면 복사 없이 그대로 반환하고,
+    문자열 등이면 변환한 새 Series를 반환합니다. (입력 DataFrame의 컬럼은 바꾸지 않음)
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values)
+
+def _read_manifest(store_dir):
+    manifest_path = os.path.join(store_dir, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return {"version": STORE_VERSION, "files": {}}
+
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+
+    # 포맷 버전이 다르면 빈 manifest로 취급하여 전체 재생성
+    if manifest.get("version") != STORE_VERSION:
+        return {"version": STORE_VERSION, "files": {}}
+    return manifest
+
+def _write_manifest(store_dir, manifest):
+    manifest_path = os.path.join(store_dir, MANIFEST_FILENAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def _file_signature(file_path):
+    stat = os.stat(file_path)
+    return {"mtime": stat.st_mtime_ns, "size": stat.st_size}
+
+@traced()
+def build_transaction_store(source_dir="trading", force=False):
+    """
+    source/<source_dir> 의 CSV 파일들을 상품별 파티션 저장소로 컴파일합니다.
+    원본 CSV의 mtime 또는 크기가 바뀐 파일만 다시 변환합니다.
+
+    Parameters:
+        source_dir (str): source 폴더 아래의 거래 데이터 폴더명 (예: "trading", "all-trading")
+        force (bool): True면 변경 여부와 관계없이 모든 파티션을 다시 생성
+
+    Returns:
+        list: 다시 생성된 파티션의 CSV 파일명 목록
+    """
+    trading_path = os.path.join(DATA_PATH, source_dir)
+    store_dir = get_store_dir(source_dir)
+    os.makedirs(store_dir, exist_ok=True)
+
+    manifest = {"version": STORE_VERSION, "files": {}} if force else _read_manifest(store_dir)
+    entries = manifest["files"]
+
+    csv_files = sorted(filename for filename in os.listdir(trading_path) if filename.endswith(".csv"))
+    rebuilt = []
+
+    for filename in csv_files:
+        file_path = os.path.join(trading_path, filename)
+        signature = _file_signature(file_path)
+        partition = os.path.splitext(filename)[0] + PARTITION_SUFFIX
+        partition_path = os.path.join(store_dir, partition)
+
+        entry = entries.get(filename)
+        if (
+            entry is not None
+            and entry["mtime"] == signature["mtime"]
+            and entry["size"] == signature["size"]
+            and os.path.exists(partition_path)
+        ):
+            continue
+
+        read_transaction_csv(file_path).to_pickle(partition_path)
+        entries[filename] = {**signature, "partition": partition}
+        rebuilt.append(filename)
+
+    # 원본 CSV가 삭제된 파티션 정리
+    for filename in set(entries) - set(csv_files):
+        partition_path = os.path.join(store_dir, entries[filename]["partition"])
+        if os.path.exists(partition_path):
+            os.remove(partition_path)
+        del entries[filename]
+        rebuilt.append(filename)
+
+    if rebuilt:
+        _write_manifest(store_dir, manifest)
+
+    return rebuilt
+
+@traced()
+def read_transaction_store(source_dir="trading", product_ids=None, compact=False, start=None, end=None):
+    """
+    저장소에서 거래 데이터를 읽어 하나의 DataFrame으로 반환합니다.
+
+    Parameters:
+        source_dir (str): 거래 데이터 폴더명
+        product_ids (list | None): 지정하면 해당 상품의 파티션만 읽음
+        compact (bool): True면 파티션마다 to_compact_frame 스키마로 변환한 뒤 합침
+        start, end (pandas.Timestamp | None): 지정하면 파티션을 읽을 때마다 start <= date_created < end 거래만 남김
+                                              (메모리 사용량은 전체 이력이 아니라 가장 큰 파티션과 구간 크기에 비례)
+    """
+    store_dir = get_store_dir(source_dir)
+    entries = _read_manifest(store_dir)["files"]
+
+    partitions = sorted(entry["partition"] for entry in entries.values())
+    if product_ids is not None:
+        wanted = {f"{product_id}{PARTITION_SUFFIX}" for product_id in product_ids}
+        partitions = [partition for partition in partitions if partition in wanted]
+
+    frames = [_select_dates(pd.read_pickle(os.path.join(store_dir, partition)), start, end) for partition in partitions]
+    if compact:
+        frames = [to_compact_frame(frame) for frame in frames]
+    if not frames:
+        empty = to_typed_frame(pd.DataFrame(columns=TRANSACTION_COLUMNS))
+        return to_compact_frame(empty) if compact else empty
+
+    df = pd.concat(frames, ignore_index=True)
+    # 파티션마다 카테고리가 달라 concat 후 object가 되므로 다시 category로 변환
+    df["option"] = df["option"].astype("category")
+    return df
+
+def _select_dates(frame, start, end):
+    if start is None and end is None:
+        return frame
+
+    mask = np.ones(len(frame), dtype=bool)
+    if start is not None:
+        mask &= (frame["date_created"] >= start).to_numpy()
+    if end is not None:
+        mask &= (frame["date_created"] < end).to_numpy()
+    return frame[mask]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="거래 CSV를 상품별 파티션 저장소로 컴파일")
+    parser.add_argument("source_dirs", nargs="*", default=["trading"], help="source 폴더 아래의 거래 데이터 폴더명")
+    parser.add_argument("--force", action="store_true", help="모든 파티션을 다시 생성")
+    parser.add_argument("--memory-report", action="store_true", help="CSV 기본 타입, 저장소 스키마, compact 스키마의 메모리 사용량 비교")
+    args = parser.parse_args()
+
+    for source_dir in args.source_dirs:
+        rebuilt = build_transaction_store(source_dir, force=args.force)
+        print(f"✅ {source_dir}: {len(rebuilt)}개 파티션 갱신 → {get_store_dir(source_dir)}")
+
+        if args.memory_report:
+            trading_path = os.path.join(DATA_PATH, source_dir)
+            csv_frame = pd.concat([pd.read_csv(os.path.join(trading_path, filename)) for filename in sorted(os.listdir(trading_path)) if filename.endswith(".csv")], ignore_index=True)
+            report = memory_report({
+                "csv": csv_frame,
+                "store": read_transaction_store(source_dir),
+                "compact": read_transaction_store(source_dir, compact=True),
+            })
+            print(f"\n{source_dir} 메모리 사용량 (MB, {len(csv_frame)}행):")
+            print(report.round(3))
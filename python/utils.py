@@ -2,23 +2,197 @@
 import pandas as pd
 import os
 
+from transaction_store import TRANSACTION_COLUMNS, build_transaction_store, read_transaction_store, to_compact_frame, to_typed_frame
+from stage_trace import traced
+
 # 데이터 경로 설정 (javascript/output 폴더에서 CSV 파일 로드)
 DATA_PATH = os.path.join('..', 'source')
+STOCK_INDEX_PATH = os.path.join(DATA_PATH, 'stock-index')
+
+# 주가 지수 CSV의 한글 헤더 → 영문 컬럼명
+STOCK_INDEX_COLUMNS = {
+    "날짜": "date",
+    "종가": "close",
+    "시가": "open",
+    "고가": "high",
+    "저가": "low",
+    "거래량": "volume",
+    "변동 %": "change_pct",
+}
+# 거래량 접미사 배수 ("499.36M" → 499360000)
+VOLUME_SUFFIXES = {"K": 1e3, "M": 1e6, "B": 1e9}
+
+# {경로: (mtime, DataFrame)} 파일이 바뀌지 않았으면 다시 파싱하지 않음
+_stock_index_cache = {}
+
+@traced()
+def load_transaction_data(source_dir='trading', use_store=True, product_ids=None, compact=False):
+    """
+    거래 데이터를 불러옵니다.
+
+    use_store가 True면 transaction_store의 상품별 파티션 저장소에서 읽고,
+    원본 CSV의 mtime 또는 크기가 바뀐 파일만 다시 컴파일합니다.
+    저장소를 사용할 수 없으면 CSV 파일을 직접 읽습니다.
+    product_ids를 지정하면 해당 상품의 파일(파티션)만 읽습니다.
+    compact가 True면 transaction_store.to_compact_frame 스키마(int32 상품 ID, uint32 가격 등)로 반환합니다.
+    """
+    if use_store:
+        try:
+            build_transaction_store(source_dir)
+            return read_transaction_store(source_dir, product_ids, compact=compact)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 거래 데이터 저장소 사용 실패({e}) → CSV 파일에서 직접 로드")
 
-def load_transaction_data():
     all_transactions = []
 
-    trading_path = os.path.join(DATA_PATH, 'trading')
+    trading_path = os.path.join(DATA_PATH, source_dir)
+    wanted = {f"{product_id}.csv" for product_id in product_ids} if product_ids is not None else None
 
     # output 폴더 내의 모든 .csv 파일을 불러오기
     for filename in os.listdir(trading_path):
-        if filename.endswith(".csv"):  # 메타데이터 파일 제외
+        if filename.endswith(".csv") and (wanted is None or filename in wanted):  # 메타데이터 파일 제외
             file_path = os.path.join(trading_path, filename)
             df = pd.read_csv(file_path)
-            all_transactions.append(df)
+            all_transactions.append(to_compact_frame(df) if compact else df)
 
     # 모든 데이터를 하나의 DataFrame으로 병합
-    return pd.concat(all_transactions, ignore_index=True)
+    transactions = pd.concat(all_transactions, ignore_index=True)
+    if compact:
+        # 파일마다 카테고리가 달라 concat 후 object가 되므로 다시 category로 변환
+        transactions["option"] = transactions["option"].astype("category")
+    return transactions
+
+@traced()
+def load_transaction_data_window(baseline_date, endline_date=None, product_ids=None, source_dir='trading', chunksize=2000, compact=False, use_store=True):
+    """
+    baseline_date <= date_created < endline_date 구간의 거래만 읽어 옵니다.
+
+    use_store가 True면 load_transaction_data와 같이 transaction_store의 상품별 파티션 저장소
+    (product_ids 상품의 파티션만)에서 읽으며, 파티션마다 읽는 즉시 구간을 적용합니다. 원본 CSV는 바뀐 파일만 다시 컴파일합니다.
+
+    저장소를 사용할 수 없으면 CSV 파일을 chunksize 행씩 읽으면서 구간과 상품 ID 목록(product_ids)을 바로 적용하므로,
+    메모리 사용량은 전체 거래 이력이 아니라 구간 크기에 비례합니다.
+    거래 파일은 최신순으로 저장되므로, 지금까지 읽은 부분이 청크 경계를 포함해 최신순이고(청크 간 최솟값 추적)
+    현재 청크가 baseline_date 이전에서 끝나면 파일의 나머지는 읽지 않습니다.
+
+    Returns:
+        pandas.DataFrame: transaction_store와 같은 타입의 거래 데이터 (compact가 True면 to_compact_frame 스키마)
+    """
+    start = _to_utc_timestamp(baseline_date)
+    end = _to_utc_timestamp(endline_date) if endline_date is not None else None
+
+    if use_store:
+        try:
+            build_transaction_store(source_dir)
+            return read_transaction_store(source_dir, product_ids, compact=compact, start=start, end=end)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 거래 데이터 저장소 사용 실패({e}) → CSV 파일에서 직접 로드")
+
+    allowed_product_ids = set(product_ids) if product_ids is not None else None
+
+    trading_path = os.path.join(DATA_PATH, source_dir)
+    window_transactions = []
+
+    for filename in sorted(os.listdir(trading_path)):
+        if not filename.endswith(".csv"):
+            continue
+
+        # 파일명이 상품 ID이므로 목록에 없는 상품 파일은 열지 않음
+        stem = os.path.splitext(filename)[0]
+        if allowed_product_ids is not None and stem.isdigit() and int(stem) not in allowed_product_ids:
+            continue
+
+        file_path = os.path.join(trading_path, filename)
+        newest_first = True
+        running_min = None
+        for chunk in pd.read_csv(file_path, chunksize=chunksize, dtype={"option": "str"}):
+            date_created = pd.to_datetime(chunk["date_created"], utc=True, format="ISO8601")
+
+            selected = _select_window(chunk, date_created, start, end, allowed_product_ids)
+            if not selected.empty:
+                window_transactions.append(selected.assign(date_created=date_created[selected.index]))
+
+            # 청크 안의 순서와 이전 청크까지의 최솟값으로 지금까지 읽은 부분이 최신순인지 확인
+            if newest_first:
+                newest_first = date_created.is_monotonic_decreasing and (running_min is None or date_created.iloc[0] <= running_min)
+            running_min = date_created.min() if running_min is None else min(running_min, date_created.min())
+
+            # 최신순 파일에서 구간 시작 이전 거래가 나오면 나머지도 모두 구간 이전이므로 중단
+            if newest_first and date_created.iloc[-1] < start:
+                break
+
+    to_frame = to_compact_frame if compact else to_typed_frame
+    if not window_transactions:
+        return to_frame(pd.DataFrame(columns=TRANSACTION_COLUMNS))
+
+    return to_frame(pd.concat(window_transactions, ignore_index=True))
+
+def _select_window(transactions, date_created, start, end, product_ids):
+    mask = date_created >= start
+    if end is not None:
+        mask &= date_created < end
+    if product_ids is not None:
+        mask &= transactions["product_id"].isin(product_ids)
+    return transactions[mask]
+
+def _to_utc_timestamp(value):
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize("UTC") if timestamp.tz is None else timestamp.tz_convert("UTC")
+
+@traced()
+def load_stock_index(index_name, english=True):
+    """
+    주가 지수 CSV(source/stock-index/{index_name}.csv)를 읽어 타입이 지정된 DataFrame으로 반환합니다.
+
+    - BOM이 붙은 한글 헤더를 읽고, "2025- 02- 14" 형식 날짜를 datetime으로 변환
+    - "2,591.05" 같은 천 단위 구분 숫자, "499.36M" 같은 접미사 거래량, "0.31%" 변동률을 float64로 변환
+      (변동률은 % 단위 그대로, 빈 값은 NaN)
+    - 날짜 오름차순으로 정렬 (원본 파일은 최신순)
+    - 파일의 mtime이 바뀌지 않았으면 이전에 파싱한 결과의 복사본을 반환
+
+    Parameters:
+        index_name (str): "kospi", "snp500" 같은 파일 이름 또는 CSV 파일 경로
+        english (bool): True면 STOCK_INDEX_COLUMNS의 영문 컬럼명, False면 원본 한글 컬럼명 사용
+
+    Returns:
+        pandas.DataFrame: date(datetime64), close, open, high, low, volume, change_pct(float64)
+    """
+    path = index_name if index_name.endswith(".csv") else os.path.join(STOCK_INDEX_PATH, f"{index_name}.csv")
+
+    mtime = os.stat(path).st_mtime_ns
+    cached = _stock_index_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, _parse_stock_index(path))
+        _stock_index_cache[path] = cached
+
+    stock_index = cached[1].copy()
+    if not english:
+        stock_index = stock_index.rename(columns={english_name: korean_name for korean_name, english_name in STOCK_INDEX_COLUMNS.items()})
+    return stock_index
+
+def _parse_stock_index(path):
+    raw = pd.read_csv(path, encoding="utf-8-sig", dtype=str)
+    raw = raw.rename(columns=lambda column: STOCK_INDEX_COLUMNS.get(column.strip(), column.strip()))
+
+    stock_index = pd.DataFrame(index=raw.index)
+    stock_index["date"] = pd.to_datetime(raw["date"].str.replace(" ", "", regex=False), format="%Y-%m-%d")
+
+    for column in ("close", "open", "high", "low"):
+        if column in raw.columns:
+            stock_index[column] = _to_float(raw[column])
+
+    if "volume" in raw.columns:
+        volume = raw["volume"].str.replace(",", "", regex=False).str.strip()
+        multiplier = volume.str[-1:].str.upper().map(VOLUME_SUFFIXES).fillna(1.0)
+        stock_index["volume"] = pd.to_numeric(volume.str.rstrip("KMBkmb"), errors="coerce") * multiplier
+
+    if "change_pct" in raw.columns:
+        stock_index["change_pct"] = _to_float(raw["change_pct"].str.rstrip("%"))
+
+    return stock_index.sort_values("date", kind="stable").reset_index(drop=True)
+
+def _to_float(values):
+    return pd.to_numeric(values.str.replace(",", "", regex=False).str.strip(), errors="coerce").astype("float64")
 
 def load_csv(file_path):
     joined_path = os.path.join(DATA_PATH, file_path)
@@ -1,13 +1,22 @@
 #visualization.py
 from datetime import datetime
-import matplotlib.pyplot as plt
+import hashlib
+import json
 import pandas as pd
 import os
 
 from utils import save_csv
+from stage_trace import traced
+from product_catalog import ProductCatalog
 
 color_list = ['b', 'g', 'r', 'c', 'm', 'k', 'w']
 
+def _pyplot():
+    # matplotlib은 그래프를 그릴 때만 불러옴 (지수 계산만 하는 실행은 matplotlib 로드 시간이 들지 않음)
+    import matplotlib.pyplot as plt
+    return plt
+
+@traced()
 def plot_resell_index(
     resell_index_data, 
     output_dir, 
@@ -26,6 +35,7 @@ def plot_resell_index(
     Returns:
     - None
     """
+    plt = _pyplot()
     plt.figure(figsize=(10, 5))
     plt.plot(resell_index_data["date_created"], resell_index_data["market_resell_index"], marker='o', linestyle='-', color='b', label="Resell Index")
 
@@ -46,6 +56,7 @@ def plot_resell_index(
     plt.close()
 
 
+@traced()
 def plot_single_resell_index(
     data,
     product_id,
@@ -53,6 +64,8 @@ def plot_single_resell_index(
     title="resell",
     save=False,
     show=False ):
+    plt = _pyplot()
+
     plt.figure(figsize=(10, 5))
     plt.plot(
         data["date_created"], 
@@ -74,7 +87,7 @@ def plot_single_resell_index(
         save_csv(data, f"{output_dir}/{title}_{product_id}.csv")
         filename = f'output/{output_dir}/{title}_{product_id}.png'
 
-        if filename not in os.listdir(f"output/{output_dir}"):
+        if not os.path.exists(filename):
             plt.savefig(filename, dpi=300, bbox_inches='tight')
 
     if show:
@@ -83,6 +96,149 @@ def plot_single_resell_index(
     plt.close()
 
 
+@traced()
+def export_single_resell_indexes(
+    products_data,
+    output_dir,
+    product_meta=None,
+    title="resell",
+    pdf=False,
+    grid=None,
+    dpi=300,
+    force=False ):
+    """
+    여러 상품의 리셀 지수 그래프(PNG)와 CSV를 한 번에 저장하는 함수.
+    plot_single_resell_index를 상품마다 호출하는 것과 같은 파일을 만들지만,
+    figure와 axes를 하나만 만들어 선 데이터만 바꿔 가며 저장합니다.
+
+    - 상품별 데이터 해시를 output/{output_dir}/{title}_hashes.json에 기록하여,
+      지난 저장 이후 데이터가 바뀌지 않은 상품은 다시 그리지 않음 (force=True면 모두 저장)
+    - pdf=True면 전체 상품을 한 페이지씩 담은 {title}.pdf를 함께 저장
+    - grid=(rows, cols)를 지정하면 상품 rows*cols개씩 한 장에 모은 {title}_grid_{page}.png를 함께 저장
+
+    Parameters:
+    - products_data: df ["date_created", "resell_index", "product_id"] (calculate_products_resell_index 결과)
+    - output_dir: str
+    - product_meta: ProductCatalog | df (상품명 조회, 없으면 products_data의 name 컬럼 사용)
+    - title: str
+    - pdf: bool
+    - grid: tuple(int, int) | None
+    - dpi: int
+    - force: bool
+
+    Returns:
+    - dict: {"saved": 새로 저장한 상품 수, "skipped": 변경이 없어 건너뛴 상품 수}
+    """
+    from matplotlib.figure import Figure
+    import matplotlib.dates as mdates
+
+    os.makedirs(f"output/{output_dir}", exist_ok=True)
+
+    catalog = ProductCatalog.from_meta(product_meta) if product_meta is not None else None
+    hash_path = f"output/{output_dir}/{title}_hashes.json"
+    hashes = {}
+    if os.path.exists(hash_path):
+        with open(hash_path, encoding="utf-8") as f:
+            hashes = json.load(f)
+
+    # 모든 상품이 같이 쓰는 figure와 선 하나
+    fig = Figure(figsize=(10, 5))
+    ax = fig.add_subplot()
+    line, = ax.plot([], [], marker='o', linestyle='-', color='b')
+    ax.set_xlabel("Date")
+    ax.set_xticks([])
+    ax.set_ylabel("Price")
+    ax.grid(True)
+
+    pages = None
+    if pdf:
+        from matplotlib.backends.backend_pdf import PdfPages
+        pages = PdfPages(f"output/{output_dir}/{title}.pdf")
+
+    saved = skipped = 0
+    panels = []
+    try:
+        for product_id, data in products_data.groupby("product_id", sort=False):
+            data = data.reset_index(drop=True)
+            name = catalog.get_name(product_id, "Unknown") if catalog is not None else data["name"][0]
+            data["name"] = name
+
+            x = mdates.date2num(pd.to_datetime(data["date_created"]))
+            y = pd.to_numeric(data["resell_index"], errors="coerce").to_numpy(dtype=float)
+            panels.append((product_id, name, x, y))
+
+            digest = hashlib.sha1(pd.util.hash_pandas_object(data[["date_created", "resell_index", "name"]].astype(str), index=False).to_numpy().tobytes()).hexdigest()
+            filename = f'output/{output_dir}/{title}_{product_id}.png'
+            changed = force or hashes.get(str(product_id)) != digest or not os.path.exists(filename)
+
+            if not changed and pages is None:
+                skipped += 1
+                continue
+
+            line.set_data(x, y)
+            line.set_label(name)
+            ax.set_title(f"{title} (Product ID: {product_id})")
+            ax.legend()
+            ax.relim()
+            ax.autoscale_view()
+
+            if changed:
+                save_csv(data, f"{output_dir}/{title}_{product_id}.csv")
+                fig.savefig(filename, dpi=dpi, bbox_inches='tight')
+                hashes[str(product_id)] = digest
+                saved += 1
+            else:
+                skipped += 1
+
+            if pages is not None:
+                pages.savefig(fig)
+    finally:
+        if pages is not None:
+            pages.close()
+
+    if grid is not None:
+        _export_resell_index_grid(panels, output_dir, title, grid, dpi)
+
+    with open(hash_path, "w", encoding="utf-8") as f:
+        json.dump(hashes, f)
+
+    print(f"✅ 상품별 리셀 지수 그래프 {saved}개 저장, 변경 없는 {skipped}개 건너뜀 (output/{output_dir})")
+    return {"saved": saved, "skipped": skipped}
+
+
+def _export_resell_index_grid(panels, output_dir, title, grid, dpi):
+    """
+    (product_id, name, x, y) 목록을 rows*cols개씩 한 장에 모아 저장합니다.
+    페이지마다 같은 figure를 쓰고 각 칸의 선 데이터만 바꿉니다.
+    """
+    from matplotlib.figure import Figure
+
+    rows, cols = grid
+    fig = Figure(figsize=(cols * 3, rows * 2))
+    axes = fig.subplots(rows, cols, squeeze=False).ravel()
+    lines = []
+    for ax in axes:
+        lines.append(ax.plot([], [], linestyle='-', color='b', linewidth=1)[0])
+        ax.set_xticks([])
+        ax.tick_params(labelsize=6)
+    fig.tight_layout()
+
+    per_page = rows * cols
+    for page, start in enumerate(range(0, len(panels), per_page), start=1):
+        for ax, line, panel in zip(axes, lines, panels[start:start + per_page] + [None] * per_page):
+            ax.set_visible(panel is not None)
+            if panel is None:
+                continue
+            product_id, name, x, y = panel
+            line.set_data(x, y)
+            ax.set_title(f"{product_id} {name}"[:30], fontsize=7)
+            ax.relim()
+            ax.autoscale_view()
+
+        fig.savefig(f'output/{output_dir}/{title}_grid_{page}.png', dpi=dpi, bbox_inches='tight')
+
+
+@traced()
 def plot_premium_with_resell_index(
     resell_index_data, 
     premium_data_list, 
@@ -98,6 +254,7 @@ def plot_premium_with_resell_index(
     :param save:
     :return:
     """
+    plt = _pyplot()
 
     plt.figure(figsize=(15, 5))
 
@@ -174,6 +331,7 @@ def plot_premium_with_resell_index(
     plt.close()
 
 
+@traced()
 def plot_resell_index_for_alpha(
     resell_index_data_with_alpha, 
     output_dir, 
@@ -186,6 +344,7 @@ def plot_resell_index_for_alpha(
 
     :params resell_index_data_with_alpha: list(df)["alpha", "date_created", "market_resell_index"]
     """
+    plt = _pyplot()
     plt.figure(figsize=(10, 5))
 
     for idx, values in enumerate(resell_index_data_with_alpha):
@@ -210,6 +369,7 @@ def plot_resell_index_for_alpha(
 
     plt.close()
 
+@traced()
 def plot_stock_index(
     stock_index_data,
     output_dir,
@@ -224,6 +384,7 @@ def plot_stock_index(
     - save: bool
     - show: bool
     """
+    plt = _pyplot()
 
     stock_index_data["날짜"] = pd.to_datetime(stock_index_data["날짜"])
     plt.figure(figsize=(10, 5))